@@ -0,0 +1,341 @@
+# activos.py
+"""
+Archivos estáticos: vendorizado, huellas y variantes precomprimidas.
+
+`python manage.py assets`:
+  1. Baja a static/vendor/ Bootstrap (CSS y JS) y las fuentes de Google
+     (solo los subsets latin y latin-ext, en woff2) si todavía no están.
+     Con --actualizar los vuelve a bajar.
+  2. Copia cada archivo de static/ a static/dist/ con un hash del contenido
+     en el nombre (logo.png -> logo.3f9a1c2b.png), reescribe las url(...)
+     de los CSS a los nombres con hash y escribe static/dist/manifest.json.
+  3. Genera .gz y .br de los archivos de texto y variantes WebP del logo en
+     varios anchos. `brotli` y Pillow están en requirements.txt; si falta
+     alguno el comando falla, salvo con --parcial (arma sin esas variantes).
+
+En las plantillas:
+  static_url("vendor/bootstrap.min.css")  nombre con hash según el manifest;
+      si no se corrió el build, la URL del CDN (vendor) o /static/<nombre>.
+  static_srcset("logo.png")  srcset de las variantes WebP ("" si no hay).
+
+StaticActivos sirve /static: lo de static/dist/ con Cache-Control immutable
+(el nombre cambia si cambia el contenido) y, si el navegador lo acepta, la
+variante .br o .gz ya comprimida. El resto se revalida con ETag.
+"""
+import gzip
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import urllib.request
+from mimetypes import guess_type
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.staticfiles import StaticFiles
+
+try:
+    import brotli
+except ImportError:  # opcional: solo se generan .gz
+    brotli = None
+
+try:
+    from PIL import Image
+except ImportError:  # opcional: sin variantes WebP
+    Image = None
+
+DIRECTORIO = "static"
+DIST = "dist"
+MANIFIESTO = os.path.join(DIRECTORIO, DIST, "manifest.json")
+
+# nombre lógico (relativo a static/) -> URL original, usada también como respaldo
+VENDOR = {
+    "vendor/bootstrap.min.css": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/css/bootstrap.min.css",
+    "vendor/bootstrap.bundle.min.js": "https://cdn.jsdelivr.net/npm/bootstrap@5.3.2/dist/js/bootstrap.bundle.min.js",
+    "vendor/fuentes.css": (
+        "https://fonts.googleapis.com/css2?family=Playfair+Display:wght@500;600"
+        "&family=Inter:wght@300;400;500;600&display=swap"
+    ),
+}
+SUBSETS_FUENTES = ("latin", "latin-ext")
+
+# Anchos (px) de las variantes WebP de cada imagen
+VARIANTES_WEBP = {"logo.png": (48, 96, 128, 256)}
+
+COMPRIMIBLES = (".css", ".js", ".svg", ".json", ".txt", ".map")
+CACHE_INMUTABLE = "public, max-age=31536000, immutable"
+
+
+# =========================
+# EN LAS PLANTILLAS
+# =========================
+
+_manifiesto: dict[str, str] | None = None
+
+
+def manifiesto() -> dict[str, str]:
+    global _manifiesto
+    if _manifiesto is None:
+        try:
+            with open(MANIFIESTO, encoding="utf-8") as f:
+                _manifiesto = json.load(f)
+        except (OSError, ValueError):
+            _manifiesto = {}
+    return _manifiesto
+
+
+def static_url(nombre: str) -> str:
+    ruta = manifiesto().get(nombre)
+    if ruta:
+        return f"/static/{DIST}/{ruta}"
+    if nombre in VENDOR and not os.path.exists(os.path.join(DIRECTORIO, nombre)):
+        return VENDOR[nombre]
+    return f"/static/{nombre}"
+
+
+def static_srcset(nombre: str) -> str:
+    raiz = os.path.splitext(nombre)[0]
+    partes = []
+    for ancho in VARIANTES_WEBP.get(nombre, ()):
+        ruta = manifiesto().get(f"{raiz}-{ancho}.webp")
+        if ruta:
+            partes.append(f"/static/{DIST}/{ruta} {ancho}w")
+    return ", ".join(partes)
+
+
+# =========================
+# VENDORIZADO
+# =========================
+
+# Con este User-Agent Google Fonts responde woff2
+_UA = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36"
+
+
+def _bajar(url: str) -> bytes:
+    pedido = urllib.request.Request(url, headers={"User-Agent": _UA})
+    with urllib.request.urlopen(pedido, timeout=30) as respuesta:
+        return respuesta.read()
+
+
+def _vendorizar_fuentes(destino: str) -> list[str]:
+    """Baja el CSS de Google Fonts y sus woff2; las url() quedan relativas."""
+    css = _bajar(VENDOR["vendor/fuentes.css"]).decode("utf-8")
+    carpeta = os.path.join(os.path.dirname(destino), "fuentes")
+    os.makedirs(carpeta, exist_ok=True)
+
+    # Cada @font-face viene precedido de un comentario con el subset: /* latin */
+    bloques = re.findall(r"/\* ([\w-]+) \*/\s*(@font-face \{.*?\})", css, re.S)
+    salida, bajados = [], []
+    for subset, bloque in bloques:
+        if subset not in SUBSETS_FUENTES:
+            continue
+        for url in re.findall(r"url\((https://[^)]+)\)", bloque):
+            archivo = hashlib.sha1(url.encode()).hexdigest()[:12] + ".woff2"
+            datos = _bajar(url)
+            with open(os.path.join(carpeta, archivo), "wb") as f:
+                f.write(datos)
+            bajados.append(f"vendor/fuentes/{archivo}")
+            bloque = bloque.replace(url, f"fuentes/{archivo}")
+        salida.append(f"/* {subset} */\n{bloque}")
+
+    with open(destino, "w", encoding="utf-8") as f:
+        f.write("\n".join(salida) + "\n")
+    return bajados
+
+
+def vendorizar(actualizar: bool = False) -> list[str]:
+    """Baja lo que falte de VENDOR a static/vendor/. Devuelve lo bajado."""
+    bajados = []
+    for nombre, url in VENDOR.items():
+        destino = os.path.join(DIRECTORIO, nombre)
+        if os.path.exists(destino) and not actualizar:
+            continue
+        os.makedirs(os.path.dirname(destino), exist_ok=True)
+        if nombre == "vendor/fuentes.css":
+            bajados += _vendorizar_fuentes(destino)
+        else:
+            # Bajar antes de abrir: si falla no queda un archivo vacío
+            datos = _bajar(url)
+            with open(destino, "wb") as f:
+                f.write(datos)
+        bajados.append(nombre)
+    return bajados
+
+
+# =========================
+# BUILD
+# =========================
+
+def _con_huella(nombre: str, datos: bytes) -> str:
+    raiz, ext = os.path.splitext(nombre)
+    return f"{raiz}.{hashlib.sha256(datos).hexdigest()[:8]}{ext}"
+
+
+def _fuentes_del_build() -> list[str]:
+    """Archivos de static/ (sin dist/), los CSS al final para reescribir sus url()."""
+    nombres = []
+    for carpeta, subcarpetas, archivos in os.walk(DIRECTORIO):
+        relativa = os.path.relpath(carpeta, DIRECTORIO)
+        if relativa == DIST or relativa.startswith(DIST + os.sep):
+            subcarpetas.clear()
+            continue
+        for archivo in archivos:
+            nombres.append(os.path.normpath(os.path.join(relativa, archivo)).replace(os.sep, "/"))
+    return sorted(nombres, key=lambda n: (n.endswith(".css"), n))
+
+
+def _reescribir_urls(nombre: str, css: str, mapa: dict[str, str]) -> str:
+    carpeta = os.path.dirname(nombre)
+
+    def reemplazo(m):
+        url = m.group(2)
+        if re.match(r"^(data:|https?:|/|#)", url):
+            return m.group(0)
+        limpia = url.split("?")[0].split("#")[0]
+        logico = os.path.normpath(os.path.join(carpeta, limpia)).replace(os.sep, "/")
+        if logico not in mapa:
+            return m.group(0)
+        nueva = os.path.relpath(mapa[logico], carpeta or ".").replace(os.sep, "/")
+        return f"url({m.group(1)}{nueva}{m.group(1)})"
+
+    return re.sub(r"""url\((['"]?)([^'")]+)\1\)""", reemplazo, css)
+
+
+def _comprimir(ruta: str, datos: bytes) -> list[str]:
+    generados = []
+    comprimido = gzip.compress(datos, 9, mtime=0)
+    if len(comprimido) < len(datos):
+        with open(ruta + ".gz", "wb") as f:
+            f.write(comprimido)
+        generados.append(ruta + ".gz")
+    if brotli is not None:
+        comprimido = brotli.compress(datos, quality=11)
+        if len(comprimido) < len(datos):
+            with open(ruta + ".br", "wb") as f:
+                f.write(comprimido)
+            generados.append(ruta + ".br")
+    return generados
+
+
+def _variantes_webp(nombre: str, origen: str) -> dict[str, bytes]:
+    raiz = os.path.splitext(nombre)[0]
+    variantes = {}
+    with Image.open(origen) as imagen:
+        for ancho in VARIANTES_WEBP[nombre]:
+            alto = round(imagen.height * ancho / imagen.width)
+            salida = io.BytesIO()
+            imagen.resize((ancho, alto), Image.LANCZOS).save(salida, "WEBP", quality=85, method=6)
+            variantes[f"{raiz}-{ancho}.webp"] = salida.getvalue()
+    return variantes
+
+
+def construir() -> dict:
+    """Regenera static/dist/ y su manifest. Devuelve un resumen."""
+    global _manifiesto
+    dist = os.path.join(DIRECTORIO, DIST)
+    shutil.rmtree(dist, ignore_errors=True)
+
+    mapa: dict[str, str] = {}
+    resumen = {"archivos": 0, "bytes": 0, "comprimidos": 0, "webp": 0}
+
+    def escribir(nombre: str, datos: bytes):
+        destino = _con_huella(nombre, datos)
+        ruta = os.path.join(dist, destino)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        with open(ruta, "wb") as f:
+            f.write(datos)
+        mapa[nombre] = destino
+        resumen["archivos"] += 1
+        resumen["bytes"] += len(datos)
+        if nombre.endswith(COMPRIMIBLES):
+            resumen["comprimidos"] += len(_comprimir(ruta, datos))
+
+    for nombre in _fuentes_del_build():
+        origen = os.path.join(DIRECTORIO, nombre)
+        with open(origen, "rb") as f:
+            datos = f.read()
+        if nombre.endswith(".css"):
+            datos = _reescribir_urls(nombre, datos.decode("utf-8"), mapa).encode("utf-8")
+        escribir(nombre, datos)
+
+        if nombre in VARIANTES_WEBP and Image is not None:
+            for variante, webp in _variantes_webp(nombre, origen).items():
+                escribir(variante, webp)
+                resumen["webp"] += 1
+
+    with open(MANIFIESTO, "w", encoding="utf-8") as f:
+        json.dump(mapa, f, indent=2, sort_keys=True)
+    _manifiesto = mapa
+    return resumen
+
+
+# =========================
+# SERVIDOR
+# =========================
+
+def _codificaciones_aceptadas(accept_encoding: str) -> list[str]:
+    """
+    "br" y/o "gzip" según Accept-Encoding, de mayor a menor q (a igual q,
+    br primero). Las que vienen con q=0 quedan afuera; "*" cubre las no
+    nombradas.
+    """
+    pesos: dict[str, float] = {}
+    for parte in accept_encoding.split(","):
+        nombre, *parametros = [p.strip() for p in parte.split(";")]
+        if not nombre:
+            continue
+        q = 1.0
+        for parametro in parametros:
+            clave, _, valor = parametro.partition("=")
+            if clave.strip().lower() == "q":
+                try:
+                    q = float(valor)
+                except ValueError:
+                    q = 0.0
+        pesos[nombre.lower()] = q
+
+    comodin = pesos.get("*", 0.0)
+    candidatas = [(pesos.get(c, comodin), -i, c) for i, c in enumerate(("br", "gzip"))]
+    return [c for q, _, c in sorted(candidatas, reverse=True) if q > 0]
+
+
+class StaticActivos(StaticFiles):
+    """StaticFiles que sirve las variantes precomprimidas y cachea lo que tiene huella."""
+
+    async def get_response(self, path, scope):
+        con_huella = path.startswith(DIST + "/") and not path.endswith("manifest.json")
+        if con_huella and path.endswith(COMPRIMIBLES):
+            aceptadas = _codificaciones_aceptadas(Headers(scope=scope).get("accept-encoding", ""))
+            for codificacion in aceptadas:
+                extension = ".br" if codificacion == "br" else ".gz"
+                ruta, stat = await anyio.to_thread.run_sync(self.lookup_path, path + extension)
+                if stat is None:
+                    continue
+                respuesta = self.file_response(ruta, stat, scope)
+                tipo = guess_type(path)[0] or "application/octet-stream"
+                if tipo.startswith("text/"):
+                    tipo += "; charset=utf-8"
+                respuesta.headers["content-type"] = tipo
+                respuesta.headers["content-encoding"] = codificacion
+                respuesta.headers["vary"] = "Accept-Encoding"
+                respuesta.headers["cache-control"] = CACHE_INMUTABLE
+                return respuesta
+
+        respuesta = await super().get_response(path, scope)
+        if respuesta.status_code in (200, 304):
+            respuesta.headers["cache-control"] = CACHE_INMUTABLE if con_huella else "no-cache"
+            if con_huella and path.endswith(COMPRIMIBLES):
+                respuesta.headers["vary"] = "Accept-Encoding"
+        return respuesta
+
+
+class GZipDinamico(GZipMiddleware):
+    """Gzip para las respuestas de la app; /static ya viene comprimido del build."""
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"].startswith("/static/"):
+            return await self.app(scope, receive, send)
+        return await super().__call__(scope, receive, send)
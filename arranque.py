@@ -0,0 +1,129 @@
+# arranque.py
+"""
+Inicialización de la base y medición del arranque.
+
+Importar main.py ya no toca la base: crear tablas, aplicar migraciones y
+asegurar el usuario admin se hace con `python manage.py init-db` (en el paso
+de build/release) o en el lifespan de la app, solo si:
+  - la base es el SQLite local (la instalación offline se arma sola), o
+  - INIT_DB_AL_ARRANCAR=1.
+Así un arranque en frío o un ciclo de --reload no hace idas y vueltas a
+Supabase antes de aceptar requests.
+
+Se miden el import de main, el arranque (lifespan) y el primer request
+desde que empezó el import; si el arranque pasa de ARRANQUE_PRESUPUESTO_MS
+se avisa por consola.
+"""
+import hashlib
+import os
+import time
+
+# Referencia de tiempo: este módulo es lo primero que importa main.py
+T0 = time.perf_counter()
+
+PRESUPUESTO_MS = float(os.getenv("ARRANQUE_PRESUPUESTO_MS", "1500"))
+
+_tiempos: dict[str, float] = {}
+
+
+# =========================
+# BASE DE DATOS
+# =========================
+
+def hash_password(password: str) -> str:
+    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+
+
+def init_al_arrancar() -> bool:
+    from database import ES_SQLITE
+
+    valor = os.getenv("INIT_DB_AL_ARRANCAR")
+    if valor is None:
+        return ES_SQLITE
+    return valor.strip().lower() in ("1", "true", "si", "sí", "yes")
+
+
+def preparar_esquema() -> list[str]:
+    """Crea las tablas que falten y aplica las migraciones pendientes."""
+    from database import Base, engine
+    from migraciones import aplicar_migraciones
+    import models  # noqa: F401  (registra los modelos en Base.metadata)
+
+    Base.metadata.create_all(bind=engine)
+    return aplicar_migraciones(engine)
+
+
+def ensure_admin_user():
+    """Crea el usuario admin por defecto si no existe."""
+    from database import SessionLocal
+    from models import Usuario
+
+    db = SessionLocal()
+    try:
+        admin = db.query(Usuario).filter(Usuario.username == "admin").first()
+        if not admin:
+            admin = Usuario(
+                username="admin",
+                nombre="Administrador",
+                es_admin=True,
+                password_hash=hash_password("sda2025"),
+                activo=True,
+            )
+            db.add(admin)
+            db.commit()
+    finally:
+        db.close()
+
+
+def inicializar_base() -> list[str]:
+    """Esquema + migraciones + usuario admin. Devuelve las migraciones aplicadas."""
+    aplicadas = preparar_esquema()
+    ensure_admin_user()
+    return aplicadas
+
+
+# =========================
+# TIEMPOS DE ARRANQUE
+# =========================
+
+def _desde_t0_ms() -> float:
+    return (time.perf_counter() - T0) * 1000
+
+
+def fin_import():
+    """Llamar al final de main.py."""
+    _tiempos["import_ms"] = _desde_t0_ms()
+
+
+def fin_arranque(init_db_ms: float | None = None):
+    """Llamar al terminar el lifespan de inicio."""
+    _tiempos["arranque_ms"] = _desde_t0_ms()
+    if init_db_ms is not None:
+        _tiempos["init_db_ms"] = init_db_ms
+
+    detalle = ", ".join(f"{k}={v:.0f}" for k, v in _tiempos.items())
+    print(f"Arranque listo en {_tiempos['arranque_ms']:.0f} ms ({detalle})")
+    if _tiempos["arranque_ms"] > PRESUPUESTO_MS:
+        print(f"AVISO: el arranque superó el presupuesto de {PRESUPUESTO_MS:.0f} ms")
+
+
+def tiempos() -> dict[str, float]:
+    return {k: round(v, 1) for k, v in _tiempos.items()}
+
+
+class MedirPrimerRequest:
+    """Middleware ASGI que anota cuándo terminó el primer request HTTP."""
+
+    def __init__(self, app):
+        self.app = app
+        self.pendiente = True
+
+    async def __call__(self, scope, receive, send):
+        if not self.pendiente or scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        self.pendiente = False
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _tiempos["primer_request_ms"] = _desde_t0_ms()
+            print(f"Primer request respondido a los {_tiempos['primer_request_ms']:.0f} ms")
@@ -0,0 +1,406 @@
+# benchmark.py
+"""
+Benchmark en proceso de todas las rutas de main.py, sin red.
+
+    python benchmark.py --escala 10 --salida bench-10x.json
+    python benchmark.py --escala 10 --comparar bench-10x.json
+
+Usa una base SQLite propia por escala y semilla (en el directorio temporal
+salvo --base), llenada con datos_prueba.py la primera vez y reutilizada
+después (--regenerar para volver a armarla). La app corre con su lifespan y
+se le pega con httpx.ASGITransport, logueado como admin.
+
+Por ruta informa p50/p95/p99 de latencia, consultas SQL por request (eventos
+del engine) y pico de memoria de Python (tracemalloc, en una pasada aparte
+para no inflar las latencias). Las rutas sin escenario se listan en
+"sin_cubrir"; las que no tiene sentido medir, en EXCLUIDAS.
+
+Requiere httpx (requirements-dev.txt).
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, datetime
+
+# Rutas que no se miden: (método, ruta) -> motivo
+EXCLUIDAS = {
+    ("GET", "/pedidos/tablero/eventos"): "stream SSE sin fin",
+    ("GET", "/admin/perfiles/{nombre}/{formato}"): "necesita una captura guardada (PERFILADOR=1)",
+}
+
+USUARIO, CLAVE = "admin", "sda2025"
+
+
+# =========================
+# BASE DE PRUEBA
+# =========================
+
+def _preparar_entorno(args):
+    """Apunta la app a la base del benchmark. Antes de importar database/main."""
+    ruta = args.base or os.path.join(
+        tempfile.gettempdir(), f"sabor_bench_{args.escala:g}x_s{args.semilla}.db"
+    )
+    if args.regenerar:
+        for sufijo in ("", "-wal", "-shm"):
+            if os.path.exists(ruta + sufijo):
+                os.remove(ruta + sufijo)
+    os.environ["DATABASE_URL"] = f"sqlite:///{ruta}"
+    os.environ.pop("READ_DATABASE_URL", None)
+    os.environ["INIT_DB_AL_ARRANCAR"] = "0"  # la base se prepara acá
+    return ruta
+
+
+def _preparar_base(args) -> dict:
+    import arranque
+    import datos_prueba
+    from database import SessionLocal
+    from models import Pedido
+    from sqlalchemy import func, select
+
+    arranque.inicializar_base()
+    db = SessionLocal()
+    try:
+        if db.scalar(select(func.count()).select_from(Pedido)):
+            return {"reutilizada": True}
+        inicio = time.perf_counter()
+        cantidades = datos_prueba.generar(db, args.escala, args.semilla, args.hasta)
+        cantidades["generada_en_seg"] = round(time.perf_counter() - inicio, 1)
+        return cantidades
+    finally:
+        db.close()
+
+
+class _Contexto:
+    """Ids de la base para armar las URLs y preparar los escenarios de escritura."""
+
+    def __init__(self):
+        from database import SessionLocal
+        from models import Cliente, EstadoPedido, MovimientoCtaCte, Pedido, Producto, Usuario
+        from sqlalchemy import func, select
+
+        self.SessionLocal = SessionLocal
+        with SessionLocal() as db:
+            self.producto_id = db.scalar(select(func.min(Producto.id)).where(Producto.activo == True))
+            # El cliente con más movimientos: la cta cte más pesada
+            self.cliente_id = db.scalar(
+                select(MovimientoCtaCte.cliente_id)
+                .group_by(MovimientoCtaCte.cliente_id)
+                .order_by(func.count().desc(), MovimientoCtaCte.cliente_id)
+                .limit(1)
+            )
+            self.pedido_id = db.scalar(
+                select(func.max(Pedido.id)).where(Pedido.estado == EstadoPedido.pendiente)
+            ) or db.scalar(select(func.max(Pedido.id)))
+            self.usuario_id = db.scalar(select(Usuario.id).where(Usuario.username == USUARIO))
+            self.nombre_cliente = db.scalar(select(Cliente.nombre).where(Cliente.id == self.cliente_id))
+
+    def pedido_nuevo(self) -> int:
+        """Pedido pendiente recién creado, para entregar o eliminar sin agotar los datos."""
+        import servicio_pedidos
+        from models import Pedido
+
+        with self.SessionLocal() as db:
+            lineas = servicio_pedidos.armar_lineas(db, [self.producto_id], [""], [1], [1000.0])
+            pedido = servicio_pedidos.crear_pedido(
+                db, Pedido(cliente_id=self.cliente_id, fecha_pedido=datetime.utcnow()), lineas
+            )
+            db.commit()
+            return pedido.id
+
+    def usuario_bench(self) -> int:
+        """Usuario de prueba para editar (nunca el admin)."""
+        from arranque import hash_password
+        from models import Usuario
+        from sqlalchemy import select
+
+        with self.SessionLocal() as db:
+            usuario_id = db.scalar(select(Usuario.id).where(Usuario.username == "bench_editado"))
+            if usuario_id is None:
+                usuario = Usuario(username="bench_editado", nombre="Bench", password_hash=hash_password("x"))
+                db.add(usuario)
+                db.commit()
+                usuario_id = usuario.id
+            return usuario_id
+
+
+def _form_pedido(ctx: _Contexto, lineas: int = 3) -> dict:
+    return {
+        "cliente_id": ctx.cliente_id,
+        "descuento": "5",
+        "producto_id": [ctx.producto_id] * lineas,
+        "descripcion_item": [""] * lineas,
+        "cantidad": [str(i + 1) for i in range(lineas)],
+        "precio_unitario": ["1000"] * lineas,
+    }
+
+
+# =========================
+# ESCENARIOS
+# =========================
+# (método, ruta de main.py) -> función(ctx, i) que devuelve los argumentos
+# del request. Primero se miden las lecturas y después las escrituras.
+
+ESCENARIOS = {
+    ("GET", "/login"): lambda ctx, i: {"url": "/login", "sin_sesion": True},
+    ("GET", "/"): lambda ctx, i: {"url": "/"},
+    ("GET", "/productos"): lambda ctx, i: {"url": "/productos"},
+    ("GET", "/productos/nuevo"): lambda ctx, i: {"url": "/productos/nuevo"},
+    ("GET", "/productos/editar/{producto_id}"): lambda ctx, i: {"url": f"/productos/editar/{ctx.producto_id}"},
+    ("GET", "/clientes"): lambda ctx, i: {"url": "/clientes"},
+    ("GET", "/clientes/nuevo"): lambda ctx, i: {"url": "/clientes/nuevo"},
+    ("GET", "/clientes/editar/{cliente_id}"): lambda ctx, i: {"url": f"/clientes/editar/{ctx.cliente_id}"},
+    ("GET", "/clientes/{cliente_id}/cta-cte"): lambda ctx, i: {"url": f"/clientes/{ctx.cliente_id}/cta-cte"},
+    ("GET", "/pedidos"): lambda ctx, i: {"url": "/pedidos"},
+    ("GET", "/pedidos/tablero"): lambda ctx, i: {"url": "/pedidos/tablero"},
+    ("GET", "/pedidos/tablero/entregados"): lambda ctx, i: {"url": "/pedidos/tablero/entregados"},
+    ("GET", "/pedidos/tablero/tarjeta/{pedido_id}"): lambda ctx, i: {"url": f"/pedidos/tablero/tarjeta/{ctx.pedido_id}"},
+    ("GET", "/pedidos/nuevo"): lambda ctx, i: {"url": "/pedidos/nuevo"},
+    ("GET", "/pedidos/editar/{pedido_id}"): lambda ctx, i: {"url": f"/pedidos/editar/{ctx.pedido_id}"},
+    ("GET", "/pedidos/ver/{pedido_id}"): lambda ctx, i: {"url": f"/pedidos/ver/{ctx.pedido_id}"},
+    ("GET", "/usuarios"): lambda ctx, i: {"url": "/usuarios"},
+    ("GET", "/usuarios/nuevo"): lambda ctx, i: {"url": "/usuarios/nuevo"},
+    ("GET", "/usuarios/editar/{usuario_id}"): lambda ctx, i: {"url": f"/usuarios/editar/{ctx.usuario_id}"},
+    ("GET", "/reportes"): lambda ctx, i: {"url": "/reportes"},
+    ("GET", "/reportes/exportar"): lambda ctx, i: {"url": "/reportes/exportar"},
+    ("GET", "/admin/pool"): lambda ctx, i: {"url": "/admin/pool"},
+    ("GET", "/admin/plantillas"): lambda ctx, i: {"url": "/admin/plantillas"},
+    ("GET", "/admin/rendimiento"): lambda ctx, i: {"url": "/admin/rendimiento"},
+    ("GET", "/admin/perfiles"): lambda ctx, i: {"url": "/admin/perfiles"},
+    ("GET", "/metrics"): lambda ctx, i: {"url": "/metrics"},
+
+    ("POST", "/login"): lambda ctx, i: {"url": "/login", "data": {"username": USUARIO, "password": CLAVE}},
+    ("POST", "/productos/guardar"): lambda ctx, i: {
+        "url": "/productos/guardar",
+        "data": {"nombre": f"Bench producto {i}", "precio_compra": "100", "precio_venta": "180"},
+    },
+    ("POST", "/productos/actualizar/{producto_id}"): lambda ctx, i: {
+        "url": f"/productos/actualizar/{ctx.producto_id}",
+        "data": {"nombre": f"Producto {ctx.producto_id}", "precio_compra": "100", "precio_venta": "180"},
+    },
+    ("POST", "/clientes/guardar"): lambda ctx, i: {
+        "url": "/clientes/guardar",
+        "data": {"nombre": f"Bench cliente {i}", "telefono": f"11 5555-{i:04d}"},
+    },
+    ("POST", "/clientes/actualizar/{cliente_id}"): lambda ctx, i: {
+        "url": f"/clientes/actualizar/{ctx.cliente_id}",
+        "data": {"nombre": ctx.nombre_cliente},
+    },
+    ("POST", "/clientes/{cliente_id}/registrar-pago"): lambda ctx, i: {
+        "url": f"/clientes/{ctx.cliente_id}/registrar-pago",
+        "data": {"monto": "1"},
+    },
+    ("POST", "/pedidos/guardar"): lambda ctx, i: {"url": "/pedidos/guardar", "data": _form_pedido(ctx)},
+    ("POST", "/pedidos/actualizar/{pedido_id}"): lambda ctx, i: {
+        "url": f"/pedidos/actualizar/{ctx.pedido_id}",
+        "data": _form_pedido(ctx, 2 + i % 3),
+    },
+    ("POST", "/pedidos/{pedido_id}/marcar-entregado"): lambda ctx, i: {
+        "url": f"/pedidos/{ctx.pedido_nuevo()}/marcar-entregado",
+    },
+    ("POST", "/pedidos/{pedido_id}/eliminar"): lambda ctx, i: {
+        "url": f"/pedidos/{ctx.pedido_nuevo()}/eliminar",
+    },
+    ("POST", "/usuarios/guardar"): lambda ctx, i: {
+        "url": "/usuarios/guardar",
+        "data": {"username": f"bench_{i}_{time.time_ns()}", "nombre": "Bench", "password": "x"},
+    },
+    ("POST", "/usuarios/actualizar/{usuario_id}"): lambda ctx, i: {
+        "url": f"/usuarios/actualizar/{ctx.usuario_bench()}",
+        "data": {"username": "bench_editado", "nombre": "Bench editado"},
+    },
+    # Al final: cierra la sesión del cliente (se vuelve a loguear en cada repetición)
+    ("GET", "/logout"): lambda ctx, i: {"url": "/logout", "relogin": True},
+}
+
+
+# =========================
+# MEDICIÓN
+# =========================
+
+class _ContadorConsultas:
+    def __init__(self):
+        from sqlalchemy import event
+
+        from database import async_engine, engine, read_engine
+
+        self.total = 0
+        motores = {id(m): m for m in (engine, read_engine, async_engine.sync_engine)}
+        for motor in motores.values():
+            event.listen(motor, "before_cursor_execute", self._contar)
+
+    def _contar(self, *args):
+        self.total += 1
+
+
+def _percentil(muestras: list[float], p: float) -> float:
+    """Percentil por rango más cercano (muestras ordenadas)."""
+    if not muestras:
+        return 0.0
+    indice = max(0, min(len(muestras) - 1, round(p / 100 * len(muestras) + 0.5) - 1))
+    return muestras[indice]
+
+
+async def _medir(args, ctx: _Contexto, rutas: list[tuple[str, str]]) -> dict:
+    import httpx
+
+    import main
+
+    contador = _ContadorConsultas()
+    resultados = {}
+
+    transporte = httpx.ASGITransport(app=main.app)
+    async with main.app.router.lifespan_context(main.app):
+        async with (
+            httpx.AsyncClient(transport=transporte, base_url="http://bench") as cliente,
+            httpx.AsyncClient(transport=transporte, base_url="http://bench") as anonimo,
+        ):
+
+            async def login():
+                r = await cliente.post("/login", data={"username": USUARIO, "password": CLAVE})
+                assert r.status_code == 303, f"login falló: {r.status_code}"
+
+            async def pedir(metodo, escenario, i):
+                pedido = escenario(ctx, i)
+                quien = anonimo if pedido.get("sin_sesion") else cliente
+                consultas_antes = contador.total
+                inicio = time.perf_counter()
+                r = await quien.request(metodo, pedido["url"], data=pedido.get("data"))
+                await r.aread()
+                duracion = time.perf_counter() - inicio
+                if pedido.get("relogin"):
+                    await login()
+                return r.status_code, duracion, contador.total - consultas_antes
+
+            await login()
+            # Calentamiento: plantillas, caches y conexiones
+            for metodo, ruta in rutas:
+                if metodo == "GET":
+                    await pedir(metodo, ESCENARIOS[(metodo, ruta)], 0)
+
+            for metodo, ruta in rutas:
+                escenario = ESCENARIOS[(metodo, ruta)]
+                tiempos, consultas, estados = [], [], set()
+                for i in range(args.repeticiones):
+                    estado, duracion, n = await pedir(metodo, escenario, i)
+                    tiempos.append(duracion)
+                    consultas.append(n)
+                    estados.add(estado)
+
+                # Pasada aparte con tracemalloc (inflaría las latencias)
+                tracemalloc.start()
+                tracemalloc.reset_peak()
+                await pedir(metodo, escenario, args.repeticiones)
+                pico = tracemalloc.get_traced_memory()[1]
+                tracemalloc.stop()
+
+                tiempos.sort()
+                resultados[f"{metodo} {ruta}"] = r = {
+                    "p50_ms": round(_percentil(tiempos, 50) * 1000, 3),
+                    "p95_ms": round(_percentil(tiempos, 95) * 1000, 3),
+                    "p99_ms": round(_percentil(tiempos, 99) * 1000, 3),
+                    "promedio_ms": round(sum(tiempos) / len(tiempos) * 1000, 3),
+                    "max_ms": round(tiempos[-1] * 1000, 3),
+                    "consultas": round(sum(consultas) / len(consultas), 1),
+                    "pico_memoria_kb": round(pico / 1024, 1),
+                    "estados": sorted(estados),
+                }
+                print(f"  {metodo:4} {ruta:45} p50 {r['p50_ms']:9.2f} ms  p95 {r['p95_ms']:9.2f} ms"
+                      f"  {r['consultas']:6.1f} q", flush=True)
+    return resultados
+
+
+def _rutas_de_la_app() -> tuple[list[tuple[str, str]], list[str]]:
+    """(rutas con escenario en orden de medición, rutas sin escenario)."""
+    from fastapi.routing import APIRoute
+
+    import main
+
+    en_app = set()
+    for ruta in main.app.routes:
+        if isinstance(ruta, APIRoute):
+            for metodo in ruta.methods:
+                en_app.add((metodo, ruta.path))
+
+    sin_cubrir = sorted(f"{m} {r}" for m, r in en_app - set(ESCENARIOS) - set(EXCLUIDAS))
+    medibles = [clave for clave in ESCENARIOS if clave in en_app]
+    return medibles, sin_cubrir
+
+
+# =========================
+# SALIDA
+# =========================
+
+def _comparar(anterior: dict, actual: dict):
+    print(f"\n{'ruta':52} {'p95 antes':>10} {'p95 ahora':>10} {'Δ%':>7} {'q antes':>8} {'q ahora':>8}")
+    for clave, ahora in actual["rutas"].items():
+        antes = anterior.get("rutas", {}).get(clave)
+        if not antes:
+            print(f"{clave:52} {'-':>10} {ahora['p95_ms']:10.2f}")
+            continue
+        delta = (ahora["p95_ms"] - antes["p95_ms"]) / antes["p95_ms"] * 100 if antes["p95_ms"] else 0.0
+        print(f"{clave:52} {antes['p95_ms']:10.2f} {ahora['p95_ms']:10.2f} {delta:+7.1f} "
+              f"{antes['consultas']:8.1f} {ahora['consultas']:8.1f}")
+
+
+def _fecha(valor: str) -> date:
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sabor de Autor - benchmark de rutas")
+    parser.add_argument("--escala", type=float, default=1, help="Volumen respecto de producción (1, 10, 100)")
+    parser.add_argument("--semilla", type=int, default=2025)
+    parser.add_argument("--hasta", type=_fecha, default=None, help="Último día de datos (defecto: hoy)")
+    parser.add_argument("--repeticiones", type=int, default=20, help="Requests por ruta")
+    parser.add_argument("--base", help="Archivo SQLite a usar (defecto: uno por escala en el temporal)")
+    parser.add_argument("--regenerar", action="store_true", help="Borra y vuelve a generar la base")
+    parser.add_argument("--salida", help="Archivo JSON con los resultados")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior para comparar")
+    args = parser.parse_args(argv)
+
+    ruta_base = _preparar_entorno(args)
+    print(f"Base: {ruta_base}")
+    datos = _preparar_base(args)
+    print(f"Datos: {datos}")
+
+    rutas, sin_cubrir = _rutas_de_la_app()
+    ctx = _Contexto()
+    resultados = asyncio.run(_medir(args, ctx, rutas))
+
+    import sqlalchemy
+
+    salida = {
+        "meta": {
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "escala": args.escala,
+            "semilla": args.semilla,
+            "repeticiones": args.repeticiones,
+            "datos": datos,
+            "python": platform.python_version(),
+            "sqlalchemy": sqlalchemy.__version__,
+        },
+        "rutas": resultados,
+        "sin_cubrir": sin_cubrir,
+        "excluidas": {f"{m} {r}": motivo for (m, r), motivo in EXCLUIDAS.items()},
+    }
+
+    if sin_cubrir:
+        print(f"\nRutas sin escenario: {', '.join(sin_cubrir)}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(salida, f, indent=2, ensure_ascii=False)
+        print(f"\nResultados en {args.salida}")
+    if args.comparar:
+        with open(args.comparar, encoding="utf-8") as f:
+            _comparar(json.load(f), salida)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
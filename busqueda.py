@@ -0,0 +1,137 @@
+# busqueda.py
+"""
+Búsqueda de clientes por nombre o teléfono, sin distinguir acentos ni
+mayúsculas ("munoz" encuentra "Muñoz").
+
+Se busca sobre las columnas normalizadas clientes.nombre_norm y
+clientes.telefono_norm, con el índice que corresponda a cada motor:
+  - SQLite: tabla FTS5 clientes_fts con tokenizer trigram (orden por bm25)
+  - PostgreSQL: índices GIN pg_trgm (orden por similarity)
+Si el índice no está disponible se cae a LIKE sobre las columnas normalizadas.
+Los términos de menos de MIN_TRIGRAMA caracteres no entran en un índice de
+trigramas: las palabras cortas filtran los resultados del índice y los
+dígitos cortos se buscan con LIKE (nunca se descartan).
+Los índices se crean en las migraciones 3 y 7 (migraciones.py).
+"""
+from sqlalchemy import and_, column, func, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from models import Cliente
+from normalizacion import normalizar_telefono, normalizar_texto
+
+# Largo mínimo de término que puede resolver un índice de trigramas
+MIN_TRIGRAMA = 3
+
+# Resultados máximos en el listado de clientes
+LIMITE_RESULTADOS = 200
+
+# Tabla virtual FTS5 (solo SQLite); rowid = clientes.id
+clientes_fts = table("clientes_fts", column("rowid"))
+
+# Cache por URL de base: ¿existe clientes_fts? (evita consultar sqlite_master siempre)
+_fts_disponible: dict[str, bool] = {}
+
+
+def _terminos(q: str) -> tuple[list[str], str]:
+    palabras = [p for p in normalizar_texto(q).split(" ") if p]
+    return palabras, normalizar_telefono(q)
+
+
+def _hay_fts(db: Session) -> bool:
+    bind = db.get_bind()
+    clave = str(bind.url)
+    if clave not in _fts_disponible:
+        _fts_disponible[clave] = db.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'clientes_fts'")
+        ).first() is not None
+    return _fts_disponible[clave]
+
+
+def _frase_fts(termino: str) -> str:
+    return '"' + termino.replace('"', '""') + '"'
+
+
+def _condicion_like(palabras: list[str], digitos: str):
+    por_nombre = and_(*[Cliente.nombre_norm.contains(p, autoescape=True) for p in palabras])
+    condiciones = [por_nombre] if palabras else []
+    if digitos:
+        condiciones.append(Cliente.telefono_norm.contains(digitos, autoescape=True))
+    return or_(*condiciones)
+
+
+def consulta_ids(db: Session, q: str):
+    """
+    SELECT (id, rank) de los clientes que coinciden, para usar como
+    subconsulta. Menor rank = mejor coincidencia. None si no hay términos.
+    """
+    palabras, digitos = _terminos(q)
+    if not palabras and not digitos:
+        return None
+
+    dialecto = db.get_bind().dialect.name
+
+    # FTS5 no puede buscar 1-2 dígitos en el teléfono: en ese caso va todo por LIKE
+    if dialecto == "sqlite" and _hay_fts(db) and (not digitos or len(digitos) >= MIN_TRIGRAMA):
+        largas = [p for p in palabras if len(p) >= MIN_TRIGRAMA]
+        cortas = [p for p in palabras if len(p) < MIN_TRIGRAMA]
+
+        if largas or digitos:
+            partes = []
+            if largas:
+                partes.append(
+                    "(" + " AND ".join(f"nombre_norm : {_frase_fts(p)}" for p in largas) + ")"
+                )
+            if digitos:
+                partes.append(f"telefono_norm : {_frase_fts(digitos)}")
+
+            tabla_fts = literal_column("clientes_fts")
+            stmt = select(
+                clientes_fts.c.rowid.label("id"),
+                func.bm25(tabla_fts).label("rank"),
+            ).where(tabla_fts.op("MATCH")(" OR ".join(partes)))
+
+            if cortas:
+                # Términos de 1-2 letras: se filtran sobre los ya encontrados
+                condiciones = [
+                    and_(*[Cliente.nombre_norm.contains(p, autoescape=True) for p in cortas])
+                ]
+                if digitos:
+                    condiciones.append(Cliente.telefono_norm.contains(digitos, autoescape=True))
+                stmt = stmt.join(Cliente, Cliente.id == clientes_fts.c.rowid).where(or_(*condiciones))
+            return stmt
+
+    if dialecto == "postgresql":
+        rank = -func.greatest(
+            func.similarity(Cliente.nombre_norm, " ".join(palabras)),
+            func.similarity(Cliente.telefono_norm, digitos) if digitos else 0.0,
+        )
+    else:
+        rank = literal_column("0")
+
+    return select(Cliente.id.label("id"), rank.label("rank")).where(
+        _condicion_like(palabras, digitos)
+    )
+
+
+def buscar_clientes(db: Session, q: str, limite: int = LIMITE_RESULTADOS) -> list[Cliente]:
+    """Clientes que coinciden con `q`, de mejor a peor coincidencia."""
+    ids = consulta_ids(db, q)
+    if ids is None:
+        return []
+
+    ids = ids.subquery("coincidencias")
+    return (
+        db.query(Cliente)
+        .join(ids, ids.c.id == Cliente.id)
+        .order_by(ids.c.rank, Cliente.nombre)
+        .limit(limite)
+        .all()
+    )
+
+
+def filtro_cliente(db: Session, q: str, columna_cliente_id):
+    """Condición `columna_cliente_id IN (clientes que coinciden)` para otros listados."""
+    ids = consulta_ids(db, q)
+    if ids is None:
+        return True
+    return columna_cliente_id.in_(select(ids.subquery("coincidencias").c.id))
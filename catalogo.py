@@ -0,0 +1,103 @@
+# catalogo.py
+"""
+Cache en memoria de los datos de referencia de los formularios de pedido
+(productos activos y clientes).
+
+Cada foto se guarda junto con la versión de su tabla (ver versiones.py).
+Para saber si sigue vigente se relee la versión, como mucho una vez cada
+CATALOGO_CHEQUEO_SEG segundos: es una consulta por clave primaria, mucho más
+barata que volver a traer todas las filas. Así un cambio hecho desde otro
+proceso se ve, a lo sumo, con ese retraso. En el mismo proceso, invalidar()
+fuerza la relectura inmediata (también de los ETags, que usan las mismas
+versiones).
+
+Configuración por variables de entorno:
+  CATALOGO_TTL_SEG       vida máxima de una foto aunque la versión no cambie (300)
+  CATALOGO_CHEQUEO_SEG   cada cuánto se relee la versión de la tabla (5)
+  CATALOGO_MAX_ENTRADAS  fotos guardadas como máximo; se descarta la menos usada (8)
+"""
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from sqlalchemy import asc, select
+from sqlalchemy.orm import Session
+
+import versiones
+from metricas import Aciertos
+from models import Cliente, Producto
+
+TTL_SEG = float(os.getenv("CATALOGO_TTL_SEG", "300"))
+CHEQUEO_SEG = float(os.getenv("CATALOGO_CHEQUEO_SEG", "5"))
+MAX_ENTRADAS = int(os.getenv("CATALOGO_MAX_ENTRADAS", "8"))
+
+# Filas livianas e inmutables: se comparten entre requests
+ProductoCatalogo = namedtuple("ProductoCatalogo", "id nombre precio_venta precio_compra")
+ClienteCatalogo = namedtuple("ClienteCatalogo", "id nombre")
+
+_lock = threading.Lock()
+# (nombre, version) -> (creado_en, filas), en orden de uso
+_fotos: OrderedDict = OrderedDict()
+aciertos = Aciertos()
+
+
+def _version(db: Session, tabla: str) -> int:
+    return versiones.recientes((tabla,), CHEQUEO_SEG, db)[tabla][0]
+
+
+def _foto(db: Session, nombre: str, tabla: str, cargar):
+    version = _version(db, tabla)
+    clave = (nombre, version)
+    ahora = time.monotonic()
+
+    with _lock:
+        entrada = _fotos.get(clave)
+        if entrada and ahora - entrada[0] < TTL_SEG:
+            _fotos.move_to_end(clave)
+            aciertos.anotar(True)
+            return entrada[1]
+
+    aciertos.anotar(False)
+    filas = cargar(db)
+
+    with _lock:
+        # Las fotos de versiones anteriores ya no sirven
+        for vieja in [c for c in _fotos if c[0] == nombre and c[1] != version]:
+            del _fotos[vieja]
+        _fotos[clave] = (ahora, filas)
+        _fotos.move_to_end(clave)
+        while len(_fotos) > MAX_ENTRADAS:
+            _fotos.popitem(last=False)
+    return filas
+
+
+def _cargar_productos(db: Session) -> tuple:
+    return tuple(
+        ProductoCatalogo(*f)
+        for f in db.execute(
+            select(Producto.id, Producto.nombre, Producto.precio_venta, Producto.precio_compra)
+            .where(Producto.activo == True)
+            .order_by(asc(Producto.nombre))
+        )
+    )
+
+
+def _cargar_clientes(db: Session) -> tuple:
+    return tuple(
+        ClienteCatalogo(*f)
+        for f in db.execute(select(Cliente.id, Cliente.nombre).order_by(asc(Cliente.nombre)))
+    )
+
+
+def productos_activos(db: Session) -> tuple:
+    return _foto(db, "productos_activos", "productos", _cargar_productos)
+
+
+def clientes(db: Session) -> tuple:
+    return _foto(db, "clientes", "clientes", _cargar_clientes)
+
+
+def invalidar(*tablas: str):
+    """Olvida la versión conocida de las tablas (todas si no se indica ninguna)."""
+    versiones.olvidar(*tablas)
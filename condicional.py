@@ -0,0 +1,175 @@
+# condicional.py
+"""
+GET condicional (ETag / Last-Modified) para las pantallas que se dejan
+abiertas y se refrescan todo el tiempo: /productos, /clientes y
+/pedidos/tablero.
+
+El ETag sale de las versiones de las tablas que muestra cada ruta (ver
+versiones.py), la query string, el usuario (el layout muestra su nombre y el
+menú depende del rol) y la versión del código y las plantillas. Si el
+navegador manda el mismo ETag se responde 304 sin abrir sesión del ORM ni
+renderizar: con las versiones en memoria es una comparación de strings.
+
+Las versiones se releen de la base como mucho cada CONDICIONAL_CHEQUEO_SEG
+segundos (1 por defecto); los cambios del mismo proceso se ven enseguida
+porque los handlers llaman a versiones.olvidar() después del commit.
+
+Las versiones se leen ANTES de renderizar: si algo cambia en el medio, la
+página sale más nueva que su ETag y el próximo refresco la vuelve a pedir.
+"""
+import hashlib
+import os
+from datetime import date, datetime, time, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+import activos
+import versiones
+from database import leer_del_primario
+from metricas import Aciertos
+
+CHEQUEO_SEG = float(os.getenv("CONDICIONAL_CHEQUEO_SEG", "1"))
+
+# ruta -> tablas de las que depende lo que muestra
+RUTAS = {
+    "/productos": ("productos",),
+    "/clientes": ("clientes",),
+    "/pedidos/tablero": ("pedidos", "clientes"),
+}
+# Rutas cuyo contenido cambia con el día aunque no cambien los datos
+POR_DIA = {"/pedidos/tablero"}
+
+# Acierto = 304 (el navegador ya tenía la página)
+aciertos = Aciertos()
+
+
+def _version_codigo() -> str:
+    """Huella de los .py, las plantillas y el manifest de estáticos: un deploy invalida los ETags viejos."""
+    huella = hashlib.sha1()
+    for raiz in (".", "templates"):
+        for carpeta, subcarpetas, archivos in os.walk(raiz):
+            if raiz == ".":
+                subcarpetas.clear()
+            for nombre in sorted(archivos):
+                if nombre.endswith((".py", ".html")):
+                    info = os.stat(os.path.join(carpeta, nombre))
+                    huella.update(f"{carpeta}/{nombre}:{info.st_size}:{info.st_mtime_ns}".encode())
+    if os.path.exists(activos.MANIFIESTO):
+        with open(activos.MANIFIESTO, "rb") as f:
+            huella.update(f.read())
+    return huella.hexdigest()[:8]
+
+
+VERSION_CODIGO = _version_codigo()
+
+
+# =========================
+# VALIDADORES
+# =========================
+
+def validadores(ruta: str, query: str, usuario: dict, vigentes: dict) -> tuple[str, datetime | None]:
+    """(ETag, Last-Modified) de la respuesta para esas versiones."""
+    partes = [VERSION_CODIGO, ruta, query]
+    partes += [f"{t}={vigentes[t][0]}" for t in RUTAS[ruta]]
+    partes += [str(usuario.get("id")), str(usuario.get("nombre")), str(bool(usuario.get("es_admin")))]
+
+    fechas = [f for _, f in vigentes.values() if f is not None]
+    ultima = max(fechas).replace(tzinfo=timezone.utc) if fechas else None
+
+    if ruta in POR_DIA:
+        hoy = date.today()
+        partes.append(hoy.isoformat())
+        inicio_hoy = datetime.combine(hoy, time.min).astimezone(timezone.utc)
+        ultima = max(ultima, inicio_hoy) if ultima else inicio_hoy
+
+    etag = 'W/"' + hashlib.sha1("|".join(partes).encode()).hexdigest()[:20] + '"'
+    return etag, ultima
+
+
+def _coincide_etag(if_none_match: str, etag: str) -> bool:
+    # Comparación débil: se ignora el prefijo W/
+    if if_none_match.strip() == "*":
+        return True
+    nuestro = etag.removeprefix("W/")
+    return any(e.strip().removeprefix("W/") == nuestro for e in if_none_match.split(","))
+
+
+def no_modificado(headers: dict, etag: str, ultima: datetime | None) -> bool:
+    if_none_match = headers.get("if-none-match")
+    if if_none_match is not None:
+        # Si viene If-None-Match, If-Modified-Since se ignora (RFC 9110)
+        return _coincide_etag(if_none_match, etag)
+
+    if_modified_since = headers.get("if-modified-since")
+    if if_modified_since and ultima is not None:
+        try:
+            desde = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        return ultima.replace(microsecond=0) <= desde
+    return False
+
+
+def _cabeceras(etag: str, ultima: datetime | None) -> list[tuple[bytes, bytes]]:
+    cabeceras = [
+        (b"etag", etag.encode()),
+        # El navegador puede guardar la página pero tiene que revalidar siempre
+        (b"cache-control", b"private, no-cache"),
+        (b"vary", b"Cookie"),
+    ]
+    if ultima is not None:
+        cabeceras.append((b"last-modified", format_datetime(ultima, usegmt=True).encode()))
+    return cabeceras
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+
+class GetCondicional:
+    """
+    Middleware ASGI. Va adentro de SessionMiddleware (necesita la sesión) y
+    del de "leer lo que escribí": mientras un usuario lee del primario no se
+    responden 304 ni se mandan ETags, para no mezclar versiones de la réplica.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["method"] not in ("GET", "HEAD")
+            or scope["path"] not in RUTAS
+        ):
+            return await self.app(scope, receive, send)
+
+        usuario = scope.get("session", {}).get("user")
+        if not usuario or leer_del_primario.get():
+            # Sin sesión el handler redirige al login
+            return await self.app(scope, receive, send)
+
+        ruta = scope["path"]
+        tablas = RUTAS[ruta]
+        vigentes = versiones.en_cache(tablas, CHEQUEO_SEG)
+        if vigentes is None:
+            vigentes = await run_in_threadpool(versiones.recientes, tablas, CHEQUEO_SEG)
+
+        etag, ultima = validadores(ruta, scope.get("query_string", b"").decode("latin-1"), usuario, vigentes)
+        cabeceras = _cabeceras(etag, ultima)
+
+        headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+        coincide = no_modificado(headers, etag, ultima)
+        aciertos.anotar(coincide)
+        if coincide:
+            await send({"type": "http.response.start", "status": 304, "headers": cabeceras})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start" and mensaje["status"] == 200:
+                mensaje = {**mensaje, "headers": list(mensaje.get("headers", [])) + cabeceras}
+            await send(mensaje)
+
+        await self.app(scope, receive, enviar)
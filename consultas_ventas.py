@@ -0,0 +1,275 @@
+# consultas_ventas.py
+"""
+Agregados de ventas calculados directamente en la base (GROUP BY + funciones
+de ventana), sin hidratar pedidos ni ítems.
+
+Replican exactamente las cuentas de los reportes:
+  - subtotal del pedido = suma de subtotales de sus ítems
+  - descuento = subtotal * porcentaje / 100
+  - el descuento se reparte entre los ítems en proporción a su subtotal
+  - ganancia = venta neta - costo
+
+Funcionan igual en SQLite (>= 3.25, por las funciones de ventana) y en
+PostgreSQL. Se usan para reconstruir y verificar el resumen diario.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, Float, case, cast, desc, func, insert, literal, select
+from sqlalchemy.orm import Session
+
+from models import (
+    Cliente,
+    Pedido,
+    PedidoItem,
+    Producto,
+    VentaDiaria,
+    VentaDiariaCliente,
+    VentaDiariaProducto,
+)
+
+
+def _rango(desde_date: date, hasta_date: date):
+    inicio = datetime.combine(desde_date, datetime.min.time())
+    fin = datetime.combine(hasta_date + timedelta(days=1), datetime.min.time())
+    return inicio, fin
+
+
+def _fecha_pedido():
+    # date() existe en ambos motores; en SQLite devuelve texto ISO, que el tipo
+    # Date de SQLAlchemy convierte igual que las columnas Date del modelo.
+    return func.date(Pedido.fecha_pedido, type_=Date)
+
+
+def _filtro_rango(stmt, inicio, fin):
+    if inicio is None:
+        return stmt
+    return stmt.where(Pedido.fecha_pedido >= inicio, Pedido.fecha_pedido < fin)
+
+
+# =========================
+# SUBCONSULTAS BASE
+# =========================
+
+def pedidos_valorizados(inicio=None, fin=None):
+    """
+    Una fila por pedido: fecha, cliente, subtotal, descuento, venta neta,
+    costo y ganancia. Incluye pedidos sin ítems (con todo en cero).
+    """
+    item_sub = func.coalesce(
+        PedidoItem.subtotal, PedidoItem.precio_venta_unitario * PedidoItem.cantidad
+    )
+    item_costo = func.coalesce(PedidoItem.costo_unitario, 0) * PedidoItem.cantidad
+
+    por_pedido = _filtro_rango(
+        select(
+            Pedido.id.label("pedido_id"),
+            _fecha_pedido().label("fecha"),
+            Pedido.cliente_id.label("cliente_id"),
+            func.coalesce(Pedido.descuento, 0.0).label("desc_pct"),
+            cast(func.coalesce(func.sum(item_sub), 0.0), Float).label("subtotal"),
+            cast(func.coalesce(func.sum(item_costo), 0.0), Float).label("costo"),
+        )
+        .select_from(Pedido)
+        .outerjoin(PedidoItem, PedidoItem.pedido_id == Pedido.id)
+        .group_by(Pedido.id, Pedido.fecha_pedido, Pedido.cliente_id, Pedido.descuento),
+        inicio,
+        fin,
+    ).subquery("por_pedido")
+
+    desc_monto = por_pedido.c.subtotal * (por_pedido.c.desc_pct / 100.0)
+    venta_neta = por_pedido.c.subtotal - desc_monto
+
+    return select(
+        por_pedido.c.pedido_id,
+        por_pedido.c.fecha,
+        por_pedido.c.cliente_id,
+        por_pedido.c.subtotal,
+        desc_monto.label("descuentos"),
+        venta_neta.label("ventas"),
+        por_pedido.c.costo,
+        (venta_neta - por_pedido.c.costo).label("ganancia"),
+    ).subquery("pedidos_valorizados")
+
+
+def items_valorizados(inicio=None, fin=None):
+    """
+    Una fila por ítem con su parte del descuento del pedido, repartida en
+    proporción al subtotal del ítem: SUM() OVER (PARTITION BY pedido).
+    """
+    item_sub = func.coalesce(
+        PedidoItem.subtotal, PedidoItem.precio_venta_unitario * PedidoItem.cantidad
+    )
+    base = _filtro_rango(
+        select(
+            PedidoItem.pedido_id,
+            PedidoItem.producto_id,
+            PedidoItem.cantidad,
+            _fecha_pedido().label("fecha"),
+            item_sub.label("item_sub"),
+            (func.coalesce(PedidoItem.costo_unitario, 0) * PedidoItem.cantidad).label("item_costo"),
+            func.coalesce(Pedido.descuento, 0.0).label("desc_pct"),
+            func.sum(item_sub).over(partition_by=PedidoItem.pedido_id).label("pedido_sub"),
+        ).join(Pedido, Pedido.id == PedidoItem.pedido_id),
+        inicio,
+        fin,
+    ).subquery("items_base")
+
+    desc_monto = base.c.pedido_sub * (base.c.desc_pct / 100.0)
+    item_desc = case(
+        (base.c.pedido_sub > 0, desc_monto * base.c.item_sub / base.c.pedido_sub),
+        else_=literal(0.0),
+    )
+    item_venta = base.c.item_sub - item_desc
+
+    return select(
+        base.c.pedido_id,
+        base.c.producto_id,
+        base.c.fecha,
+        base.c.cantidad,
+        item_venta.label("ventas"),
+        (item_venta - base.c.item_costo).label("ganancia"),
+    ).subquery("items_valorizados")
+
+
+# =========================
+# AGREGADOS
+# =========================
+
+def _stmt_por_dia(pv):
+    return (
+        select(
+            pv.c.fecha,
+            func.count().label("pedidos"),
+            func.sum(pv.c.subtotal).label("subtotal"),
+            func.sum(pv.c.descuentos).label("descuentos"),
+            func.sum(pv.c.ventas).label("ventas"),
+            func.sum(pv.c.costo).label("costo"),
+            func.sum(pv.c.ganancia).label("ganancia"),
+        )
+        .group_by(pv.c.fecha)
+    )
+
+
+def _stmt_por_dia_cliente(pv):
+    return (
+        select(
+            pv.c.fecha,
+            pv.c.cliente_id,
+            func.count().label("pedidos"),
+            func.sum(pv.c.ventas).label("ventas"),
+            func.sum(pv.c.ganancia).label("ganancia"),
+        )
+        .group_by(pv.c.fecha, pv.c.cliente_id)
+    )
+
+
+def _stmt_por_dia_producto(iv):
+    return (
+        select(
+            iv.c.fecha,
+            iv.c.producto_id,
+            func.count().label("lineas"),
+            func.sum(iv.c.cantidad).label("unidades"),
+            func.sum(iv.c.ventas).label("ventas"),
+            func.sum(iv.c.ganancia).label("ganancia"),
+        )
+        .group_by(iv.c.fecha, iv.c.producto_id)
+    )
+
+
+def detalle_por_dia(db: Session, desde_date: date, hasta_date: date) -> list[dict]:
+    pv = pedidos_valorizados(*_rango(desde_date, hasta_date))
+    filas = db.execute(_stmt_por_dia(pv).order_by(desc(pv.c.fecha))).all()
+    return [
+        {
+            "fecha": f.fecha,
+            "pedidos": f.pedidos,
+            "ventas": f.ventas,
+            "descuentos": f.descuentos,
+            "ganancia": f.ganancia,
+            "rentabilidad": (f.ganancia / f.ventas * 100.0) if f.ventas > 0 else 0.0,
+        }
+        for f in filas
+    ]
+
+
+def top_clientes(db: Session, desde_date: date, hasta_date: date, limite: int = 5) -> list[dict]:
+    pv = pedidos_valorizados(*_rango(desde_date, hasta_date))
+    ventas = func.sum(pv.c.ventas)
+    filas = db.execute(
+        select(
+            Cliente.nombre,
+            func.count().label("pedidos"),
+            ventas.label("ventas"),
+            func.sum(pv.c.ganancia).label("ganancia"),
+        )
+        .join(Cliente, Cliente.id == pv.c.cliente_id)
+        .group_by(pv.c.cliente_id, Cliente.nombre)
+        .order_by(desc(ventas))
+        .limit(limite)
+    ).all()
+    return [dict(f._mapping) for f in filas]
+
+
+def top_productos(db: Session, desde_date: date, hasta_date: date, limite: int = 5) -> list[dict]:
+    iv = items_valorizados(*_rango(desde_date, hasta_date))
+    ventas = func.sum(iv.c.ventas)
+    filas = db.execute(
+        select(
+            Producto.nombre,
+            func.sum(iv.c.cantidad).label("unidades"),
+            ventas.label("ventas"),
+            func.sum(iv.c.ganancia).label("ganancia"),
+        )
+        .join(Producto, Producto.id == iv.c.producto_id)
+        .group_by(iv.c.producto_id, Producto.nombre)
+        .order_by(desc(ventas))
+        .limit(limite)
+    ).all()
+    return [dict(f._mapping) for f in filas]
+
+
+def resumen(db: Session, desde_date: date, hasta_date: date, top: int = 5) -> dict:
+    """Mismo formato que ventas_diarias.resumen_periodo, calculado sobre los pedidos."""
+    dias = detalle_por_dia(db, desde_date, hasta_date)
+    total_ventas = sum(d["ventas"] for d in dias)
+    total_descuentos = sum(d["descuentos"] for d in dias)
+    total_ganancia = sum(d["ganancia"] for d in dias)
+
+    return {
+        "total_ventas": total_ventas,
+        "total_descuentos": total_descuentos,
+        "total_ganancia": total_ganancia,
+        "rentabilidad_pct": (total_ganancia / total_ventas * 100.0) if total_ventas > 0 else 0.0,
+        "detalle_dias": dias,
+        "top_clientes": top_clientes(db, desde_date, hasta_date, top),
+        "top_productos": top_productos(db, desde_date, hasta_date, top),
+    }
+
+
+# =========================
+# CARGA DEL RESUMEN DIARIO
+# =========================
+
+def insertar_resumen(db: Session):
+    """
+    Llena las tablas ventas_diarias* con INSERT ... SELECT agrupado sobre
+    todos los pedidos. Las tablas tienen que estar vacías; no hace commit.
+    """
+    pv = pedidos_valorizados()
+    iv = items_valorizados()
+
+    dia = _stmt_por_dia(pv)
+    db.execute(insert(VentaDiaria).from_select(
+        ["fecha", "pedidos", "subtotal", "descuentos", "ventas", "costo", "ganancia"], dia
+    ))
+
+    dia_cliente = _stmt_por_dia_cliente(pv)
+    db.execute(insert(VentaDiariaCliente).from_select(
+        ["fecha", "cliente_id", "pedidos", "ventas", "ganancia"], dia_cliente
+    ))
+
+    dia_producto = _stmt_por_dia_producto(iv)
+    db.execute(insert(VentaDiariaProducto).from_select(
+        ["fecha", "producto_id", "lineas", "unidades", "ventas", "ganancia"], dia_producto
+    ))
@@ -0,0 +1,233 @@
+# cta_cte.py
+"""
+Movimientos de cuenta corriente y saldo guardado en clientes.saldo.
+
+Todo alta, cambio o baja de un movimiento pasa por estas funciones, que
+ajustan el saldo del cliente con un UPDATE atómico (saldo = saldo + delta)
+dentro de la misma transacción. Ninguna hace commit.
+"""
+from datetime import datetime
+
+from sqlalchemy import case, desc, func, select, update
+from sqlalchemy.orm import Session
+
+from models import Cliente, MovimientoCtaCte, TipoMovimiento
+from paginacion import codificar_cursor, decodificar_cursor, despues_de
+
+# Cursor del libro: (fecha, id, saldo en el borde)
+CURSOR_LIBRO = (datetime, int, (int, float))
+
+# Diferencia máxima aceptada entre el saldo guardado y el recalculado
+TOLERANCIA = 0.005
+
+
+def delta_saldo(tipo: TipoMovimiento, monto: float) -> float:
+    """Efecto del movimiento en el saldo: los débitos suman, los créditos restan."""
+    return monto if tipo == TipoMovimiento.debito else -monto
+
+
+def ajustar_saldo(db: Session, cliente_id: int, delta: float):
+    if not delta:
+        return
+    db.execute(
+        update(Cliente)
+        .where(Cliente.id == cliente_id)
+        .values(saldo=Cliente.saldo + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def registrar_movimiento(
+    db: Session,
+    cliente_id: int,
+    tipo: TipoMovimiento,
+    monto: float,
+    descripcion: str,
+    pedido_id: int | None = None,
+) -> MovimientoCtaCte:
+    mov = MovimientoCtaCte(
+        cliente_id=cliente_id,
+        tipo=tipo,
+        monto=monto,
+        descripcion=descripcion,
+        pedido_id=pedido_id,
+    )
+    db.add(mov)
+    ajustar_saldo(db, cliente_id, delta_saldo(tipo, monto))
+    return mov
+
+
+def modificar_movimiento(db: Session, mov: MovimientoCtaCte, cliente_id: int, monto: float):
+    """Cambia cliente y/o monto de un movimiento existente."""
+    ajustar_saldo(db, mov.cliente_id, -delta_saldo(mov.tipo, mov.monto))
+    mov.cliente_id = cliente_id
+    mov.monto = monto
+    ajustar_saldo(db, cliente_id, delta_saldo(mov.tipo, monto))
+
+
+def eliminar_movimiento(db: Session, mov: MovimientoCtaCte):
+    ajustar_saldo(db, mov.cliente_id, -delta_saldo(mov.tipo, mov.monto))
+    db.delete(mov)
+
+
+def debitos_de_pedido(db: Session, pedido_id: int) -> list[MovimientoCtaCte]:
+    """Débitos generados por un pedido (búsqueda por índice en pedido_id)."""
+    return (
+        db.query(MovimientoCtaCte)
+        .filter(
+            MovimientoCtaCte.pedido_id == pedido_id,
+            MovimientoCtaCte.tipo == TipoMovimiento.debito,
+        )
+        .order_by(desc(MovimientoCtaCte.fecha), desc(MovimientoCtaCte.id))
+        .all()
+    )
+
+
+# =========================
+# LIBRO PAGINADO
+# =========================
+
+def _saldo_despues_de(db: Session, cliente: Cliente, fecha, mov_id: int) -> float:
+    """Saldo del cliente justo después del movimiento (fecha, id): el actual menos lo posterior."""
+    signo = case((MovimientoCtaCte.tipo == TipoMovimiento.debito, 1.0), else_=-1.0)
+    posterior = db.execute(
+        select(func.coalesce(func.sum(signo * MovimientoCtaCte.monto), 0.0)).where(
+            MovimientoCtaCte.cliente_id == cliente.id,
+            despues_de(MovimientoCtaCte.fecha, MovimientoCtaCte.id, fecha, mov_id, descendente=False),
+        )
+    ).scalar()
+    return (cliente.saldo or 0.0) - posterior
+
+
+def pagina_movimientos(
+    db: Session,
+    cliente: Cliente,
+    cursor: str | None = None,
+    direccion: str = "sig",
+    por_pagina: int = 50,
+) -> dict:
+    """
+    Una página del libro de cuenta corriente, del movimiento más nuevo al
+    más viejo, con el saldo acumulado después de cada movimiento.
+
+    El saldo se arrastra de página en página: la primera parte de
+    clientes.saldo y cada cursor lleva el saldo en su borde, así cualquier
+    página cuesta una consulta por índice de `por_pagina` filas. Al volver
+    hacia los más nuevos ("ant") el saldo del borde no se toma del cursor:
+    se calcula desde clientes.saldo con un SUM por el mismo índice.
+
+    direccion="sig" pide movimientos más viejos que el cursor y "ant" más
+    nuevos. Un cursor mal formado se trata como ausente (primera página).
+    Devuelve {"filas", "cursor_sig", "cursor_ant"}.
+    """
+    clave = decodificar_cursor(cursor, CURSOR_LIBRO)
+    if clave is None:
+        direccion = "sig"
+
+    query = db.query(MovimientoCtaCte).filter(MovimientoCtaCte.cliente_id == cliente.id)
+
+    if direccion == "ant":
+        fecha, mov_id, _ = clave
+        saldo = _saldo_despues_de(db, cliente, fecha, mov_id)
+        movs = (
+            query.filter(despues_de(MovimientoCtaCte.fecha, MovimientoCtaCte.id,
+                                    fecha, mov_id, descendente=False))
+            .order_by(MovimientoCtaCte.fecha, MovimientoCtaCte.id)
+            .limit(por_pagina + 1)
+            .all()
+        )
+        hay_mas_nuevos = len(movs) > por_pagina
+        movs = movs[:por_pagina]
+
+        # Saldo después del movimiento del borde; voy sumando hacia
+        # adelante y después doy vuelta la lista.
+        filas = []
+        for m in movs:
+            saldo += delta_saldo(m.tipo, m.monto)
+            filas.append({"mov": m, "saldo": saldo, "es_debito": m.tipo == TipoMovimiento.debito})
+        filas.reverse()
+        hay_mas_viejos = True
+    else:
+        if clave is None:
+            saldo = cliente.saldo or 0.0
+            hay_mas_nuevos = False
+        else:
+            fecha, mov_id, saldo = clave
+            query = query.filter(despues_de(MovimientoCtaCte.fecha, MovimientoCtaCte.id,
+                                            fecha, mov_id, descendente=True))
+            hay_mas_nuevos = True
+
+        movs = (
+            query.order_by(desc(MovimientoCtaCte.fecha), desc(MovimientoCtaCte.id))
+            .limit(por_pagina + 1)
+            .all()
+        )
+        hay_mas_viejos = len(movs) > por_pagina
+        movs = movs[:por_pagina]
+
+        filas = []
+        for m in movs:
+            filas.append({"mov": m, "saldo": saldo, "es_debito": m.tipo == TipoMovimiento.debito})
+            saldo -= delta_saldo(m.tipo, m.monto)
+
+    cursor_sig = cursor_ant = None
+    if filas:
+        ultima, primera = filas[-1], filas[0]
+        if hay_mas_viejos:
+            # Saldo antes del último movimiento = saldo después del siguiente
+            saldo_borde = ultima["saldo"] - delta_saldo(ultima["mov"].tipo, ultima["mov"].monto)
+            cursor_sig = codificar_cursor(ultima["mov"].fecha, ultima["mov"].id, saldo_borde)
+        if hay_mas_nuevos:
+            cursor_ant = codificar_cursor(primera["mov"].fecha, primera["mov"].id, primera["saldo"])
+
+    return {"filas": filas, "cursor_sig": cursor_sig, "cursor_ant": cursor_ant}
+
+
+# =========================
+# VERIFICACIÓN / REPARACIÓN
+# =========================
+
+def saldos_calculados():
+    """Subconsulta (cliente_id, saldo) sumando todos los movimientos."""
+    signo = case((MovimientoCtaCte.tipo == TipoMovimiento.debito, 1.0), else_=-1.0)
+    return (
+        select(
+            MovimientoCtaCte.cliente_id.label("cliente_id"),
+            func.sum(signo * MovimientoCtaCte.monto).label("saldo"),
+        )
+        .group_by(MovimientoCtaCte.cliente_id)
+        .subquery("saldos_calculados")
+    )
+
+
+def verificar_saldos(db: Session, reparar: bool = False) -> list[dict]:
+    """
+    Compara clientes.saldo contra la suma de sus movimientos.
+
+    Devuelve una lista con los clientes que no coinciden. Con reparar=True
+    además corrige el saldo guardado (no hace commit).
+    """
+    calc = saldos_calculados()
+    esperado = func.coalesce(calc.c.saldo, 0.0)
+    filas = db.execute(
+        select(Cliente.id, Cliente.nombre, Cliente.saldo, esperado.label("esperado"))
+        .outerjoin(calc, calc.c.cliente_id == Cliente.id)
+        .where(func.abs(func.coalesce(Cliente.saldo, 0.0) - esperado) > TOLERANCIA)
+        .order_by(Cliente.id)
+    ).all()
+
+    diferencias = [
+        {"cliente_id": f.id, "nombre": f.nombre, "guardado": f.saldo, "esperado": f.esperado}
+        for f in filas
+    ]
+
+    if reparar:
+        for d in diferencias:
+            db.execute(
+                update(Cliente)
+                .where(Cliente.id == d["cliente_id"])
+                .values(saldo=d["esperado"])
+                .execution_options(synchronize_session=False)
+            )
+
+    return diferencias
@@ -1,7 +1,16 @@
 # database.py
 import os
-from sqlalchemy import create_engine
+import threading
+import time
+from contextvars import ContextVar
+
+from sqlalchemy import create_engine, event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
+
+from metricas import Histograma
 
 # Lee la URL desde una variable de entorno
 DATABASE_URL = os.getenv("DATABASE_URL")
@@ -14,14 +23,193 @@ if not DATABASE_URL:
 if DATABASE_URL.startswith("postgres://"):
     DATABASE_URL = DATABASE_URL.replace("postgres://", "postgresql://", 1)
 
+# =========================
+# POOL DE CONEXIONES
+# =========================
+# Configurable por variables de entorno. Con varios workers, cada uno tiene
+# su pool: el total de conexiones posibles es workers * (tamaño + overflow),
+# que tiene que entrar en el límite de Supabase.
+POOL_TAMANIO = int(os.getenv("DB_POOL_SIZE", "5"))
+POOL_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+POOL_TIMEOUT_SEG = float(os.getenv("DB_POOL_TIMEOUT", "30"))      # espera máxima por una conexión libre
+POOL_RECICLAR_SEG = int(os.getenv("DB_POOL_RECYCLE", "1800"))     # reabrir conexiones más viejas que esto
+CONEXION_TIMEOUT_SEG = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+# Ping antes de usar una conexión solo si estuvo ociosa más de N segundos
+# (0 = siempre, como pool_pre_ping; negativo = nunca)
+PING_OCIOSA_SEG = float(os.getenv("DB_PREPING_SEG", "30"))
+
+
+class MetricasPool:
+    """Tiempos de espera y de checkout de un pool, más contadores de pings."""
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self.espera = Histograma()     # dentro del pool: conexión libre o nueva
+        self.checkout = Histograma()   # total, incluido el ping si lo hubo
+        self.pings = 0
+        self.pings_fallidos = 0
+
+
+class _PoolMedido:
+    """Mixin que mide cuánto tarda el pool en entregar una conexión."""
+
+    metricas: MetricasPool
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            self.metricas.espera.observar(time.perf_counter() - inicio)
+
+    def connect(self):
+        inicio = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            self.metricas.checkout.observar(time.perf_counter() - inicio)
+
+
+class PoolPrincipal(_PoolMedido, QueuePool):
+    metricas = MetricasPool("principal")
+
+
+class PoolAsync(_PoolMedido, AsyncAdaptedQueuePool):
+    metricas = MetricasPool("async")
+
+
+class PoolLectura(_PoolMedido, QueuePool):
+    metricas = MetricasPool("lectura")
+
+
+def _opciones_pool(url, clase_pool) -> dict:
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}  # SQLite en memoria usa su propio pool de una conexión
+    return {
+        "poolclass": clase_pool,
+        "pool_size": POOL_TAMANIO,
+        "max_overflow": POOL_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT_SEG,
+        "pool_recycle": POOL_RECICLAR_SEG,
+    }
+
+
+def _instalar_ping(motor, metricas: MetricasPool):
+    """
+    Ping por tiempo: en lugar de un SELECT 1 en cada checkout, solo se
+    verifica la conexión si estuvo ociosa más de PING_OCIOSA_SEG. Si falla,
+    DisconnectionError hace que el pool la descarte y abra otra.
+    """
+    @event.listens_for(motor, "checkin")
+    def _al_devolver(dbapi_conn, registro):
+        registro.info["ultimo_uso"] = time.monotonic()
+
+    @event.listens_for(motor, "checkout")
+    def _al_tomar(dbapi_conn, registro, proxy):
+        if PING_OCIOSA_SEG < 0:
+            return
+        ultimo_uso = registro.info.get("ultimo_uso")
+        if ultimo_uso is None or time.monotonic() - ultimo_uso < PING_OCIOSA_SEG:
+            return  # recién abierta o usada hace poco
+        metricas.pings += 1
+        try:
+            cursor = dbapi_conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.close()
+        except Exception as e:
+            metricas.pings_fallidos += 1
+            raise exc.DisconnectionError() from e
+
+
+# =========================
+# PERFIL SQLITE (instalación local)
+# =========================
+# Varias cajas escribiendo a la vez: WAL deja leer mientras otro escribe,
+# busy_timeout espera el lock en vez de fallar con "database is locked".
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_MB = int(os.getenv("SQLITE_CACHE_MB", "64"))
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_MANTENIMIENTO_SEG = int(os.getenv("SQLITE_MANTENIMIENTO_SEG", "3600"))
+
+
+def _instalar_pragmas_sqlite(motor, solo_lectura: bool = False):
+    @event.listens_for(motor, "connect")
+    def _al_conectar(dbapi_conn, registro):
+        cursor = dbapi_conn.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")   # seguro con WAL, sin fsync por commit
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{SQLITE_CACHE_MB * 1024}")  # negativo = KiB
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        if solo_lectura:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+
+
+def _es_sqlite_archivo(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+_url = make_url(DATABASE_URL)
+ES_SQLITE = _es_sqlite_archivo(_url)
+
+_connect_args = {}
+if _url.get_backend_name() == "postgresql":
+    _connect_args["connect_timeout"] = CONEXION_TIMEOUT_SEG
+    # _connect_args["sslmode"] = "require"  # descomentar si Supabase lo exigiera
+elif ES_SQLITE:
+    # Timeout del driver en segundos; busy_timeout lo fija igual en cada conexión
+    _connect_args["timeout"] = SQLITE_BUSY_TIMEOUT_MS / 1000
+
 engine = create_engine(
     DATABASE_URL,
-    pool_pre_ping=True,
-    # connect_args={"sslmode": "require"},  # descomentar si Supabase lo exigiera
+    connect_args=_connect_args,
+    **_opciones_pool(_url, PoolPrincipal),
 )
+_instalar_ping(engine, PoolPrincipal.metricas)
+if ES_SQLITE:
+    _instalar_pragmas_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+# Motor de solo lectura para reportes, listados y exportaciones:
+#   - READ_DATABASE_URL definida: otra base (p. ej. una réplica de Postgres),
+#     así los reportes pesados no compiten con la carga de pedidos.
+#   - SQLite local: un pool aparte con query_only=ON; con WAL esas lecturas
+#     largas no bloquean a las cajas que están escribiendo.
+#   - Si no, es el mismo engine.
+READ_DATABASE_URL = os.getenv("READ_DATABASE_URL")
+if READ_DATABASE_URL and READ_DATABASE_URL.startswith("postgres://"):
+    READ_DATABASE_URL = READ_DATABASE_URL.replace("postgres://", "postgresql://", 1)
+
+if READ_DATABASE_URL:
+    _url_lectura = make_url(READ_DATABASE_URL)
+    _connect_args_lectura = {}
+    if _url_lectura.get_backend_name() == "postgresql":
+        _connect_args_lectura["connect_timeout"] = CONEXION_TIMEOUT_SEG
+    read_engine = create_engine(
+        READ_DATABASE_URL,
+        connect_args=_connect_args_lectura,
+        **_opciones_pool(_url_lectura, PoolLectura),
+    )
+    _instalar_ping(read_engine, PoolLectura.metricas)
+    if _es_sqlite_archivo(_url_lectura):
+        _instalar_pragmas_sqlite(read_engine, solo_lectura=True)
+elif ES_SQLITE:
+    read_engine = create_engine(
+        DATABASE_URL,
+        connect_args=_connect_args,
+        **_opciones_pool(_url, PoolLectura),
+    )
+    _instalar_ping(read_engine, PoolLectura.metricas)
+    _instalar_pragmas_sqlite(read_engine, solo_lectura=True)
+else:
+    read_engine = engine
+
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
 Base = declarative_base()
 
 
@@ -31,3 +219,148 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# "Leer lo que escribí": después de un POST el navegador vuelve por GET a
+# un listado; si la réplica todavía no recibió el cambio, el usuario no lo
+# vería. El middleware de main.py marca esos requests y get_read_db usa el
+# primario para ellos.
+LEER_PRIMARIO_SEG = float(os.getenv("LEER_PRIMARIO_SEG", "5"))
+leer_del_primario: ContextVar[bool] = ContextVar("leer_del_primario", default=False)
+
+
+def get_read_db():
+    """Sesión para rutas que solo leen (reportes, listados, exportaciones)."""
+    if read_engine is not engine and leer_del_primario.get():
+        db = SessionLocal()
+    else:
+        db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+
+# =========================
+# SESIÓN ASÍNCRONA
+# =========================
+# Para los handlers `async def`: las consultas esperan sin bloquear el event
+# loop (asyncpg en PostgreSQL, aiosqlite en el SQLite local). Los handlers
+# sincrónicos siguen con get_db en el threadpool.
+
+def _url_async(url: str):
+    """Misma base que DATABASE_URL, con el driver asíncrono que corresponde."""
+    url = make_url(url)
+    connect_args = {}
+
+    if url.get_backend_name() == "postgresql":
+        # asyncpg no entiende sslmode=...; se pasa como ssl=...
+        sslmode = url.query.get("sslmode")
+        url = url.set(drivername="postgresql+asyncpg").difference_update_query(["sslmode"])
+        if sslmode:
+            connect_args["ssl"] = sslmode
+        connect_args["timeout"] = CONEXION_TIMEOUT_SEG
+        # connect_args["statement_cache_size"] = 0  # descomentar si se usa el pooler de Supabase en modo transacción
+    elif url.get_backend_name() == "sqlite":
+        url = url.set(drivername="sqlite+aiosqlite")
+
+    return url, connect_args
+
+
+ASYNC_DATABASE_URL, _async_connect_args = _url_async(DATABASE_URL)
+
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    connect_args=_async_connect_args,
+    **_opciones_pool(ASYNC_DATABASE_URL, PoolAsync),
+)
+_instalar_ping(async_engine.sync_engine, PoolAsync.metricas)
+if ES_SQLITE:
+    _instalar_pragmas_sqlite(async_engine.sync_engine)
+
+# expire_on_commit=False: después del commit los objetos se siguen leyendo
+# sin volver a la base (en async no hay carga perezosa implícita)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, autoflush=False, expire_on_commit=False
+)
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+# =========================
+# ESTADÍSTICAS
+# =========================
+
+def pools() -> list[tuple[str, object]]:
+    """[(nombre, pool)] de cada engine: principal, async y, si es otro, el de lectura."""
+    motores = [("principal", engine), ("async", async_engine.sync_engine)]
+    if read_engine is not engine:
+        motores.append(("lectura", read_engine))
+    return [(nombre, motor.pool) for nombre, motor in motores]
+
+
+def estadisticas_pool() -> dict:
+    """Estado y tiempos de cada pool (principal, async y de lectura)."""
+    salida = {
+        "config": {
+            "pool_size": POOL_TAMANIO,
+            "max_overflow": POOL_OVERFLOW,
+            "pool_timeout": POOL_TIMEOUT_SEG,
+            "pool_recycle": POOL_RECICLAR_SEG,
+            "ping_ociosa_seg": PING_OCIOSA_SEG,
+        },
+    }
+    for nombre, pool in pools():
+        datos = {"clase": type(pool).__name__}
+        if isinstance(pool, QueuePool):
+            datos.update({
+                "tamanio": pool.size(),
+                "en_uso": pool.checkedout(),
+                "libres": pool.checkedin(),
+                "overflow": max(pool.overflow(), 0),
+            })
+        if isinstance(pool, _PoolMedido):
+            m = pool.metricas
+            datos.update({
+                "espera": m.espera.resumen(),
+                "checkout": m.checkout.resumen(),
+                "pings": m.pings,
+                "pings_fallidos": m.pings_fallidos,
+            })
+        salida[nombre] = datos
+    return salida
+
+
+# =========================
+# MANTENIMIENTO SQLITE
+# =========================
+
+_mantenimiento: threading.Thread | None = None
+
+
+def mantenimiento_sqlite():
+    """PRAGMA optimize (estadísticas del planificador) y checkpoint del WAL."""
+    with engine.connect() as conn:
+        conn.exec_driver_sql("PRAGMA optimize")
+        conn.exec_driver_sql("PRAGMA wal_checkpoint(PASSIVE)")
+
+
+def iniciar_mantenimiento_sqlite():
+    """Hilo de fondo que corre mantenimiento_sqlite() cada SQLITE_MANTENIMIENTO_SEG."""
+    global _mantenimiento
+    if not ES_SQLITE or SQLITE_MANTENIMIENTO_SEG <= 0 or _mantenimiento is not None:
+        return
+
+    def _ciclo():
+        while True:
+            time.sleep(SQLITE_MANTENIMIENTO_SEG)
+            try:
+                mantenimiento_sqlite()
+            except Exception as e:
+                print(f"Mantenimiento SQLite falló: {e!r}")
+
+    _mantenimiento = threading.Thread(target=_ciclo, name="mantenimiento-sqlite", daemon=True)
+    _mantenimiento.start()
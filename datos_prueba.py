@@ -0,0 +1,249 @@
+# datos_prueba.py
+"""
+Generador determinístico de datos para pruebas de carga.
+
+Llena clientes, productos, pedidos (con sus ítems) y la cuenta corriente a
+una escala del volumen real del local (VOLUMEN_BASE = 1x). Con la misma
+semilla y la misma fecha `hasta` genera exactamente los mismos datos; las
+fechas son relativas a `hasta` (por defecto hoy) para que el tablero tenga
+pedidos de hoy y atrasados.
+
+Inserta con Core en tandas (executemany) y después recalcula lo derivado:
+saldos de clientes, resumen diario de ventas y versiones de tablas. Exige
+tablas de negocio vacías. Como los ids van explícitos, en PostgreSQL después
+se adelantan las secuencias de esas tablas (si no, el próximo alta desde la
+app chocaría con el id 1).
+
+Uso: `python manage.py datos-prueba --escala 10` sobre la base configurada,
+o indirectamente desde benchmark.py.
+"""
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func, insert, select, text
+from sqlalchemy.orm import Session
+
+import cta_cte
+import ventas_diarias
+import versiones
+from models import (
+    Cliente,
+    EstadoPedido,
+    MovimientoCtaCte,
+    Pedido,
+    PedidoItem,
+    Producto,
+    TipoMovimiento,
+)
+from normalizacion import normalizar_telefono, normalizar_texto
+
+# Volumen de producción aproximado (escala 1)
+VOLUMEN_BASE = {
+    "clientes": 150,
+    "productos": 40,
+    "dias": 365,
+    "pedidos_por_dia": 12,
+}
+ITEMS_POR_PEDIDO = (1, 6)
+# Fracción de lo debitado que cada cliente termina pagando
+FRACCION_PAGADA = 0.9
+# Días hacia atrás con pedidos todavía pendientes (el resto, entregados)
+DIAS_PENDIENTES = 3
+
+TANDA = 5000
+
+_NOMBRES = (
+    "Ana", "José", "María", "Lucía", "Martín", "Sofía", "Tomás", "Valentina",
+    "Joaquín", "Camila", "Nicolás", "Agustina", "Facundo", "Julieta", "Matías",
+    "Florencia", "Ignacio", "Micaela", "Santiago", "Rocío",
+)
+_APELLIDOS = (
+    "Muñoz", "Pérez", "Gómez", "Fernández", "Rodríguez", "López", "Díaz",
+    "Martínez", "Sánchez", "Romero", "Álvarez", "Torres", "Ruiz", "Suárez",
+    "Benítez", "Acosta", "Medina", "Herrera", "Aguirre", "Giménez",
+)
+_CIUDADES = ("CABA", "La Plata", "Quilmes", "Lanús", "Avellaneda", "Tigre", "Pilar")
+_PRODUCTOS = (
+    "Alfajor de maicena", "Torta de ricota", "Budín de limón", "Pan dulce",
+    "Medialunas x12", "Tarta de frutilla", "Brownie", "Cheesecake",
+    "Lemon pie", "Chocotorta", "Pasta frola", "Scones", "Cookies x6",
+    "Rogel", "Tiramisú", "Carrot cake",
+)
+_CONTACTOS = ("WhatsApp", "Instagram", "Teléfono", "Local")
+
+
+def volumen(escala: float) -> dict:
+    """Cantidades para una escala (los días no escalan, sí el volumen diario)."""
+    return {
+        "clientes": max(1, round(VOLUMEN_BASE["clientes"] * escala)),
+        "productos": max(1, round(VOLUMEN_BASE["productos"] * escala)),
+        "dias": VOLUMEN_BASE["dias"],
+        "pedidos_por_dia": max(1, round(VOLUMEN_BASE["pedidos_por_dia"] * escala)),
+    }
+
+
+def _insertar(db: Session, modelo, filas: list[dict]):
+    for i in range(0, len(filas), TANDA):
+        db.execute(insert(modelo), filas[i:i + TANDA])
+
+
+def _ajustar_secuencias(db: Session, modelos):
+    """PostgreSQL: deja la secuencia de cada id en el máximo insertado (SQLite no lo necesita)."""
+    if db.get_bind().dialect.name != "postgresql":
+        return
+    for modelo in modelos:
+        tabla = modelo.__tablename__
+        db.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+            f"(SELECT COALESCE(MAX(id), 0) + 1 FROM {tabla}), false)"
+        ))
+
+
+def _clientes(azar: random.Random, cantidad: int, inicio: datetime) -> list[dict]:
+    filas = []
+    for i in range(1, cantidad + 1):
+        nombre = f"{azar.choice(_NOMBRES)} {azar.choice(_APELLIDOS)} {i}"
+        telefono = f"+54 11 {azar.randint(4000, 6999)}-{azar.randint(1000, 9999)}"
+        filas.append({
+            "id": i,
+            "nombre": nombre,
+            "nombre_norm": normalizar_texto(nombre),
+            "telefono": telefono,
+            "telefono_norm": normalizar_telefono(telefono),
+            "email": f"cliente{i}@example.com",
+            "direccion": f"Calle {azar.randint(1, 200)} nº {azar.randint(100, 9999)}",
+            "ciudad": azar.choice(_CIUDADES),
+            "notas": "",
+            "creado_en": inicio,
+            "saldo": 0.0,
+        })
+    return filas
+
+
+def _productos(azar: random.Random, cantidad: int, inicio: datetime) -> list[dict]:
+    filas = []
+    for i in range(1, cantidad + 1):
+        compra = round(azar.uniform(800, 9000), 2)
+        filas.append({
+            "id": i,
+            "nombre": f"{_PRODUCTOS[(i - 1) % len(_PRODUCTOS)]} {i}",
+            "precio_compra": compra,
+            "precio_venta": round(compra * azar.uniform(1.4, 2.2), 2),
+            "descripcion": "",
+            "contenido": "",
+            "activo": i % 20 != 0,  # algunos inactivos
+            "creado_en": inicio,
+        })
+    return filas
+
+
+def generar(db: Session, escala: float = 1, semilla: int = 2025, hasta: date | None = None) -> dict:
+    """Genera los datos y hace commit. Devuelve las cantidades insertadas."""
+    for modelo in (Cliente, Producto, Pedido):
+        if db.scalar(select(func.count()).select_from(modelo)):
+            raise ValueError(f"La tabla {modelo.__tablename__} no está vacía")
+
+    azar = random.Random(semilla)
+    cantidades = volumen(escala)
+    hasta = hasta or date.today()
+    primer_dia = hasta - timedelta(days=cantidades["dias"] - 1)
+    inicio = datetime.combine(primer_dia, time(8, 0))
+
+    clientes = _clientes(azar, cantidades["clientes"], inicio)
+    productos = _productos(azar, cantidades["productos"], inicio)
+    _insertar(db, Cliente, clientes)
+    _insertar(db, Producto, productos)
+
+    # Unos pocos clientes hacen la mayoría de los pedidos (como en el local)
+    pesos_clientes = [1 / (i ** 0.8) for i in range(1, len(clientes) + 1)]
+    activos = [p for p in productos if p["activo"]] or productos
+
+    pedidos, items, movimientos = [], [], []
+    debitado = [0.0] * (len(clientes) + 1)
+    id_item = 0
+
+    for n_dia in range(cantidades["dias"]):
+        dia = primer_dia + timedelta(days=n_dia)
+        pendiente = (hasta - dia).days < DIAS_PENDIENTES
+        ids_clientes = azar.choices(range(1, len(clientes) + 1), pesos_clientes, k=cantidades["pedidos_por_dia"])
+        horas = sorted(azar.randint(8 * 3600, 20 * 3600) for _ in ids_clientes)
+
+        for cliente_id, segundos in zip(ids_clientes, horas):
+            pedido_id = len(pedidos) + 1
+            fecha = datetime.combine(dia, time()) + timedelta(seconds=segundos)
+            descuento = azar.choice((0.0, 0.0, 0.0, 5.0, 10.0))
+
+            subtotal = 0.0
+            for producto in azar.sample(activos, min(len(activos), azar.randint(*ITEMS_POR_PEDIDO))):
+                id_item += 1
+                cantidad = azar.randint(1, 4)
+                linea = round(cantidad * producto["precio_venta"], 2)
+                subtotal += linea
+                items.append({
+                    "id": id_item,
+                    "pedido_id": pedido_id,
+                    "producto_id": producto["id"],
+                    "descripcion_item": producto["nombre"],
+                    "cantidad": cantidad,
+                    "precio_venta_unitario": producto["precio_venta"],
+                    "costo_unitario": producto["precio_compra"],
+                    "subtotal": linea,
+                })
+
+            total = round(subtotal * (1 - descuento / 100), 2)
+            entrega = fecha + timedelta(days=azar.randint(0, 2))
+            pedidos.append({
+                "id": pedido_id,
+                "cliente_id": cliente_id,
+                "fecha_pedido": fecha,
+                "fecha_entrega": None if pendiente and azar.random() < 0.3 else entrega,
+                "medio_contacto": azar.choice(_CONTACTOS),
+                "observaciones": "",
+                "descuento": descuento,
+                "total": total,
+                "estado": EstadoPedido.pendiente if pendiente else EstadoPedido.entregado,
+            })
+            movimientos.append({
+                "cliente_id": cliente_id,
+                "tipo": TipoMovimiento.debito,
+                "monto": total,
+                "descripcion": f"Pedido #{pedido_id}",
+                "fecha": fecha,
+                "pedido_id": pedido_id,
+            })
+            debitado[cliente_id] += total
+
+        # Pagos: algunos clientes saldan parte de lo que deben al cierre del día
+        for cliente_id in set(ids_clientes):
+            if azar.random() < 0.5:
+                monto = round(debitado[cliente_id] * FRACCION_PAGADA, 2)
+                if monto > 0:
+                    debitado[cliente_id] -= monto
+                    movimientos.append({
+                        "cliente_id": cliente_id,
+                        "tipo": TipoMovimiento.credito,
+                        "monto": monto,
+                        "descripcion": "Pago",
+                        "fecha": datetime.combine(dia, time(21, 0)),
+                        "pedido_id": None,
+                    })
+
+    _insertar(db, Pedido, pedidos)
+    _insertar(db, PedidoItem, items)
+    movimientos.sort(key=lambda m: m["fecha"])
+    _insertar(db, MovimientoCtaCte, movimientos)
+    _ajustar_secuencias(db, (Cliente, Producto, Pedido, PedidoItem))
+
+    # Derivados
+    cta_cte.verificar_saldos(db, reparar=True)
+    versiones.incrementar(db, "productos", "clientes", "pedidos")
+    db.commit()
+    ventas_diarias.reconstruir(db)  # hace commit
+
+    return {
+        "clientes": len(clientes),
+        "productos": len(productos),
+        "pedidos": len(pedidos),
+        "items": len(items),
+        "movimientos": len(movimientos),
+    }
@@ -0,0 +1,64 @@
+# eventos.py
+"""
+Bus de eventos en memoria para avisar cambios a las pantallas abiertas
+(tablero de pedidos por Server-Sent Events).
+
+Cada conexión SSE se suscribe y recibe su propia asyncio.Queue. Los
+handlers que escriben publican después del commit; como los handlers
+sincrónicos corren en el threadpool, la entrega a cada cola se agenda con
+loop.call_soon_threadsafe en el loop de esa conexión.
+
+Es por proceso: con varios workers cada uno avisa solo sus propios cambios.
+"""
+import asyncio
+import threading
+
+# Eventos pendientes por conexión; si un cliente no los consume se le pide recargar
+MAX_PENDIENTES = 100
+
+
+class BusEventos:
+    def __init__(self, max_pendientes: int = MAX_PENDIENTES):
+        self.max_pendientes = max_pendientes
+        self._lock = threading.Lock()
+        self._colas: dict[asyncio.Queue, asyncio.AbstractEventLoop] = {}
+
+    def suscribir(self) -> asyncio.Queue:
+        """Llamar desde el loop de la conexión (handler async)."""
+        cola = asyncio.Queue(maxsize=self.max_pendientes)
+        with self._lock:
+            self._colas[cola] = asyncio.get_running_loop()
+        return cola
+
+    def desuscribir(self, cola: asyncio.Queue):
+        with self._lock:
+            self._colas.pop(cola, None)
+
+    @property
+    def suscriptores(self) -> int:
+        return len(self._colas)
+
+    def publicar(self, tipo: str, datos: dict):
+        """Se puede llamar desde cualquier hilo. No bloquea."""
+        evento = {"tipo": tipo, **datos}
+        with self._lock:
+            destinos = list(self._colas.items())
+        for cola, loop in destinos:
+            try:
+                loop.call_soon_threadsafe(_entregar, cola, evento)
+            except RuntimeError:
+                # El loop ya se cerró
+                self.desuscribir(cola)
+
+
+def _entregar(cola: asyncio.Queue, evento: dict):
+    try:
+        cola.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Cliente atrasado: descarto lo pendiente y le pido recargar la página
+        while not cola.empty():
+            cola.get_nowait()
+        cola.put_nowait({"tipo": "recargar"})
+
+
+bus = BusEventos()
@@ -0,0 +1,176 @@
+# explicar.py
+"""
+Plan de ejecución de las consultas de las rutas más usadas.
+
+`python manage.py explicar` corre EXPLAIN sobre cada una y falla si alguna
+recorre una tabla completa en lugar de usar un índice:
+  - SQLite: EXPLAIN QUERY PLAN, falla con "SCAN tabla" sin índice.
+  - PostgreSQL: EXPLAIN (FORMAT JSON) con enable_seqscan=off (con tablas
+    chicas el planificador elegiría Seq Scan aunque el índice exista), falla
+    si queda algún nodo "Seq Scan".
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.expression import ClauseElement, Executable
+
+from models import (
+    Cliente,
+    EstadoPedido,
+    MovimientoCtaCte,
+    Pedido,
+    PedidoItem,
+    TipoMovimiento,
+)
+from paginacion import POR_PAGINA_DEFECTO, despues_de
+
+
+class Explicar(Executable, ClauseElement):
+    """EXPLAIN de una sentencia, con los parámetros procesados por SQLAlchemy."""
+
+    inherit_cache = False
+
+    def __init__(self, sentencia):
+        self.sentencia = sentencia
+
+
+@compiles(Explicar)
+def _compilar_explicar(elemento, compiler, **kw):
+    if compiler.dialect.name == "postgresql":
+        prefijo = "EXPLAIN (FORMAT JSON) "
+    else:
+        prefijo = "EXPLAIN QUERY PLAN "
+    return prefijo + compiler.process(elemento.sentencia, **kw)
+
+
+# =========================
+# CONSULTAS DE LAS RUTAS
+# =========================
+# Mismas condiciones y orden que los handlers; los valores son de ejemplo.
+
+def _consultas() -> dict:
+    ahora = datetime.combine(date.today(), datetime.min.time())
+    limite = POR_PAGINA_DEFECTO + 1
+    return {
+        "/pedidos (primera página)": (
+            select(Pedido)
+            .order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc())
+            .limit(limite)
+        ),
+        "/pedidos (página siguiente)": (
+            select(Pedido)
+            .where(despues_de(Pedido.fecha_pedido, Pedido.id, ahora, 1000))
+            .order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc())
+            .limit(limite)
+        ),
+        "/pedidos?buscar= (pedidos de un cliente)": (
+            select(Pedido)
+            .where(Pedido.cliente_id == 1)
+            .order_by(Pedido.fecha_pedido.desc())
+            .limit(limite)
+        ),
+        "/pedidos/tablero (hoy)": (
+            select(Pedido)
+            .where(
+                Pedido.estado == EstadoPedido.pendiente,
+                Pedido.fecha_pedido >= ahora,
+                Pedido.fecha_pedido < ahora + timedelta(days=1),
+            )
+        ),
+        "/pedidos/tablero (pendientes)": (
+            select(Pedido)
+            .where(Pedido.estado == EstadoPedido.pendiente, Pedido.fecha_pedido < ahora)
+        ),
+        "/pedidos/tablero (entregados)": (
+            select(Pedido)
+            .where(Pedido.estado == EstadoPedido.entregado, Pedido.fecha_entrega.isnot(None))
+            .order_by(Pedido.fecha_entrega.desc(), Pedido.id.desc())
+            .limit(21)
+        ),
+        "/pedidos/tablero (entregados, tanda siguiente)": (
+            select(Pedido)
+            .where(
+                Pedido.estado == EstadoPedido.entregado,
+                Pedido.fecha_entrega.isnot(None),
+                despues_de(Pedido.fecha_entrega, Pedido.id, ahora, 1000),
+            )
+            .order_by(Pedido.fecha_entrega.desc(), Pedido.id.desc())
+            .limit(21)
+        ),
+        "/pedidos/tablero (entregados sin fecha)": (
+            select(Pedido)
+            .where(Pedido.estado == EstadoPedido.entregado, Pedido.fecha_entrega.is_(None))
+            .order_by(Pedido.id.desc())
+            .limit(21)
+        ),
+        "ítems de un pedido": (
+            select(PedidoItem).where(PedidoItem.pedido_id == 1).order_by(PedidoItem.id)
+        ),
+        "débito de un pedido": (
+            select(MovimientoCtaCte).where(
+                MovimientoCtaCte.pedido_id == 1,
+                MovimientoCtaCte.tipo == TipoMovimiento.debito,
+            )
+        ),
+        "/clientes/{id}/cta-cte": (
+            select(MovimientoCtaCte)
+            .where(MovimientoCtaCte.cliente_id == 1)
+            .order_by(MovimientoCtaCte.fecha.desc(), MovimientoCtaCte.id.desc())
+            .limit(limite)
+        ),
+        "/clientes": select(Cliente).order_by(Cliente.nombre),
+    }
+
+
+# =========================
+# ANÁLISIS DEL PLAN
+# =========================
+
+def _problemas_sqlite(filas) -> tuple[list[str], list[str]]:
+    plan = [f.detail for f in filas]
+    problemas = [
+        d for d in plan
+        if d.startswith("SCAN ") and "USING" not in d
+    ]
+    return plan, problemas
+
+
+def _nodos_pg(nodo: dict):
+    yield nodo
+    for hijo in nodo.get("Plans", []):
+        yield from _nodos_pg(hijo)
+
+
+def _problemas_postgres(filas) -> tuple[list[str], list[str]]:
+    plan_json = filas[0][0]
+    raiz = plan_json[0]["Plan"]
+    plan, problemas = [], []
+    for nodo in _nodos_pg(raiz):
+        detalle = nodo["Node Type"]
+        if nodo.get("Index Name"):
+            detalle += f" using {nodo['Index Name']}"
+        if nodo.get("Relation Name"):
+            detalle += f" on {nodo['Relation Name']}"
+        plan.append(detalle)
+        if nodo["Node Type"] == "Seq Scan":
+            problemas.append(detalle)
+    return plan, problemas
+
+
+def explicar(db: Session) -> list[dict]:
+    """Plan de cada consulta: [{"nombre", "plan", "problemas"}]."""
+    dialecto = db.get_bind().dialect.name
+    resultados = []
+
+    for nombre, sentencia in _consultas().items():
+        if dialecto == "postgresql":
+            db.execute(text("SET LOCAL enable_seqscan = off"))
+            plan, problemas = _problemas_postgres(db.execute(Explicar(sentencia)).all())
+        else:
+            plan, problemas = _problemas_sqlite(db.execute(Explicar(sentencia)).all())
+        resultados.append({"nombre": nombre, "plan": plan, "problemas": problemas})
+
+    db.rollback()
+    return resultados
@@ -0,0 +1,225 @@
+# exportacion.py
+"""
+Exportación CSV en streaming para /reportes/exportar.
+
+Cada formato es un generador que lee de la base con stream_results/yield_per
+(en PostgreSQL, psycopg2 usa un cursor con nombre del lado del servidor) y va
+entregando el CSV de a bloques, así la memoria no depende del rango elegido.
+"""
+import csv
+import io
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select
+
+from database import ReadSessionLocal
+from models import Cliente, MovimientoCtaCte, Pedido, PedidoItem, Producto, TipoMovimiento
+
+# Filas leídas por vuelta del cursor y filas por bloque enviado al cliente
+FILAS_POR_LOTE = 1000
+FILAS_POR_BLOQUE = 200
+
+FORMATOS = {
+    "dias": "Resumen por día",
+    "pedidos": "Un renglón por pedido",
+    "items": "Un renglón por ítem de pedido",
+    "movimientos": "Movimientos de cuenta corriente",
+}
+
+
+def _rango(desde_date: date, hasta_date: date):
+    inicio = datetime.combine(desde_date, datetime.min.time())
+    fin = datetime.combine(hasta_date + timedelta(days=1), datetime.min.time())
+    return inicio, fin
+
+
+def _fmt(valor: float) -> str:
+    return f"{(valor or 0.0):.2f}"
+
+
+def _fmt_fecha(valor, formato="%d/%m/%Y") -> str:
+    return valor.strftime(formato) if valor else ""
+
+
+def _stream(db, stmt):
+    return db.execute(
+        stmt.execution_options(stream_results=True, yield_per=FILAS_POR_LOTE)
+    )
+
+
+# =========================
+# FORMATOS
+# =========================
+
+def _filas_dias(db, desde_date, hasta_date):
+    import ventas_diarias
+
+    yield ["Fecha", "Pedidos", "Ventas", "Descuentos", "Ganancia", "Rentabilidad %"]
+    # El resumen diario tiene a lo sumo una fila por día del rango
+    for d in ventas_diarias.resumen_periodo(db, desde_date, hasta_date)["detalle_dias"]:
+        yield [
+            d["fecha"].strftime("%d/%m/%Y"),
+            d["pedidos"],
+            _fmt(d["ventas"]),
+            _fmt(d["descuentos"]),
+            _fmt(d["ganancia"]),
+            _fmt(d["rentabilidad"]),
+        ]
+
+
+def _filas_pedidos(db, desde_date, hasta_date):
+    import consultas_ventas
+
+    pv = consultas_ventas.pedidos_valorizados(*_rango(desde_date, hasta_date))
+    stmt = (
+        select(
+            Pedido.id,
+            Pedido.fecha_pedido,
+            Pedido.fecha_entrega,
+            Cliente.nombre,
+            Pedido.estado,
+            Pedido.medio_contacto,
+            Pedido.descuento,
+            pv.c.subtotal,
+            pv.c.descuentos,
+            pv.c.ventas,
+            pv.c.costo,
+            pv.c.ganancia,
+        )
+        .join(pv, pv.c.pedido_id == Pedido.id)
+        .join(Cliente, Cliente.id == Pedido.cliente_id)
+        .order_by(Pedido.fecha_pedido, Pedido.id)
+    )
+
+    yield ["Pedido", "Fecha", "Entrega", "Cliente", "Estado", "Medio contacto",
+           "Descuento %", "Subtotal", "Descuento", "Ventas", "Costo", "Ganancia"]
+    for r in _stream(db, stmt):
+        yield [
+            r.id,
+            _fmt_fecha(r.fecha_pedido, "%d/%m/%Y %H:%M"),
+            _fmt_fecha(r.fecha_entrega),
+            r.nombre,
+            r.estado.value if r.estado else "",
+            r.medio_contacto or "",
+            _fmt(r.descuento),
+            _fmt(r.subtotal),
+            _fmt(r.descuentos),
+            _fmt(r.ventas),
+            _fmt(r.costo),
+            _fmt(r.ganancia),
+        ]
+
+
+def _filas_items(db, desde_date, hasta_date):
+    inicio, fin = _rango(desde_date, hasta_date)
+    stmt = (
+        select(
+            PedidoItem.pedido_id,
+            Pedido.fecha_pedido,
+            Cliente.nombre.label("cliente"),
+            Producto.nombre.label("producto"),
+            PedidoItem.descripcion_item,
+            PedidoItem.cantidad,
+            PedidoItem.precio_venta_unitario,
+            PedidoItem.costo_unitario,
+            PedidoItem.subtotal,
+            Pedido.descuento,
+        )
+        .join(Pedido, Pedido.id == PedidoItem.pedido_id)
+        .join(Cliente, Cliente.id == Pedido.cliente_id)
+        .join(Producto, Producto.id == PedidoItem.producto_id)
+        .where(Pedido.fecha_pedido >= inicio, Pedido.fecha_pedido < fin)
+        .order_by(Pedido.fecha_pedido, PedidoItem.pedido_id, PedidoItem.id)
+    )
+
+    yield ["Pedido", "Fecha", "Cliente", "Producto", "Descripción", "Cantidad",
+           "Precio unitario", "Costo unitario", "Subtotal", "Venta neta", "Ganancia"]
+    for r in _stream(db, stmt):
+        subtotal = r.subtotal or (r.precio_venta_unitario * r.cantidad)
+        # El descuento del pedido se reparte proporcional al subtotal del ítem
+        venta_neta = subtotal * (1 - (r.descuento or 0.0) / 100.0)
+        ganancia = venta_neta - (r.costo_unitario or 0) * r.cantidad
+        yield [
+            r.pedido_id,
+            _fmt_fecha(r.fecha_pedido, "%d/%m/%Y %H:%M"),
+            r.cliente,
+            r.producto,
+            r.descripcion_item or "",
+            r.cantidad,
+            _fmt(r.precio_venta_unitario),
+            _fmt(r.costo_unitario),
+            _fmt(subtotal),
+            _fmt(venta_neta),
+            _fmt(ganancia),
+        ]
+
+
+def _filas_movimientos(db, desde_date, hasta_date):
+    inicio, fin = _rango(desde_date, hasta_date)
+    stmt = (
+        select(
+            MovimientoCtaCte.id,
+            MovimientoCtaCte.fecha,
+            Cliente.nombre,
+            MovimientoCtaCte.tipo,
+            MovimientoCtaCte.monto,
+            MovimientoCtaCte.descripcion,
+        )
+        .join(Cliente, Cliente.id == MovimientoCtaCte.cliente_id)
+        .where(MovimientoCtaCte.fecha >= inicio, MovimientoCtaCte.fecha < fin)
+        .order_by(MovimientoCtaCte.fecha, MovimientoCtaCte.id)
+    )
+
+    yield ["Movimiento", "Fecha", "Cliente", "Tipo", "Débito", "Crédito", "Descripción"]
+    for r in _stream(db, stmt):
+        es_debito = r.tipo == TipoMovimiento.debito
+        yield [
+            r.id,
+            _fmt_fecha(r.fecha, "%d/%m/%Y %H:%M"),
+            r.nombre,
+            r.tipo.value if r.tipo else "",
+            _fmt(r.monto) if es_debito else "",
+            "" if es_debito else _fmt(r.monto),
+            r.descripcion,
+        ]
+
+
+_GENERADORES = {
+    "dias": _filas_dias,
+    "pedidos": _filas_pedidos,
+    "items": _filas_items,
+    "movimientos": _filas_movimientos,
+}
+
+
+# =========================
+# CSV
+# =========================
+
+def generar_csv(formato: str, desde_date: date, hasta_date: date):
+    """
+    Generador de bloques de texto CSV (separador ';', como lo abre Excel en
+    español). Abre su propia sesión (de solo lectura) porque se consume
+    después de que el handler devolvió la respuesta.
+    """
+    filas_de = _GENERADORES.get(formato, _filas_dias)
+
+    db = ReadSessionLocal()
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, delimiter=";")
+        pendientes = 0
+
+        for fila in filas_de(db, desde_date, hasta_date):
+            writer.writerow(fila)
+            pendientes += 1
+            if pendientes >= FILAS_POR_BLOQUE:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate(0)
+                pendientes = 0
+
+        if pendientes:
+            yield buffer.getvalue()
+    finally:
+        db.close()
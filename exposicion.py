@@ -0,0 +1,246 @@
+# exposicion.py
+"""
+Métricas del proceso en el formato de texto de Prometheus (GET /metrics).
+
+Sale casi todo de lo que ya está en memoria, así que se puede scrapear cada
+15 s sin cargar la base:
+  sabor_request_duracion_seconds{ruta}       histograma por ruta (instrumentacion.py)
+  sabor_requests_en_curso                    requests HTTP sin terminar
+  sabor_pool_conexiones{pool,estado}         en uso / libres / overflow / tamaño
+  sabor_pool_espera_seconds{pool}            histogramas del pool (database.py)
+  sabor_pool_checkout_seconds{pool}
+  sabor_pool_pings_total{pool,resultado}
+  sabor_plantilla_render_seconds{plantilla}  histograma por plantilla (plantillas.py)
+  sabor_cache_aciertos_total{cache}          catalogo, menu y etag (304)
+  sabor_cache_fallos_total{cache}
+  sabor_cache_proporcion_aciertos{cache}
+  sabor_pedidos_pendientes
+  sabor_tabla_filas_estimadas{tabla}
+
+Los dos últimos tocan la base, pero poco:
+- Pedidos pendientes: COUNT sobre el índice (estado, fecha_pedido), y solo
+  cuando cambió la versión de la tabla pedidos (ver versiones.py).
+- Filas por tabla: estadísticas del planificador (pg_class.reltuples en
+  PostgreSQL, sqlite_stat1 en SQLite, que llena PRAGMA optimize), releídas
+  cada METRICS_ESTIMADAS_SEG segundos. Si todavía no hay estadísticas, la
+  métrica no aparece; nunca se hace COUNT(*) de una tabla entera.
+
+Acceso: sesión de administrador o `Authorization: Bearer <METRICS_TOKEN>`
+(para el scraper). Sin METRICS_TOKEN solo entra la sesión.
+"""
+import hmac
+import os
+import threading
+import time
+
+from sqlalchemy import func, select, text
+
+import catalogo
+import condicional
+import instrumentacion
+import plantillas
+import versiones
+from database import pools, read_engine
+from models import EstadoPedido, Pedido
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+TOKEN = os.getenv("METRICS_TOKEN", "")
+PENDIENTES_CHEQUEO_SEG = float(os.getenv("METRICS_PENDIENTES_SEG", "5"))
+ESTIMADAS_SEG = float(os.getenv("METRICS_ESTIMADAS_SEG", "300"))
+
+TABLAS_ESTIMADAS = ("clientes", "productos", "pedidos", "pedido_items", "movimientos_cta_cte")
+
+
+def token_valido(authorization: str | None) -> bool:
+    if not TOKEN or not authorization:
+        return False
+    return hmac.compare_digest(authorization.encode(), f"Bearer {TOKEN}".encode())
+
+
+# =========================
+# FORMATO
+# =========================
+
+def _escapar(valor) -> str:
+    return str(valor).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _etiquetas(etiquetas: dict) -> str:
+    if not etiquetas:
+        return ""
+    return "{" + ",".join(f'{k}="{_escapar(v)}"' for k, v in etiquetas.items()) + "}"
+
+
+def _numero(valor: float) -> str:
+    if valor == float("inf"):
+        return "+Inf"
+    return repr(float(valor)) if isinstance(valor, float) else str(valor)
+
+
+class _Salida:
+    def __init__(self):
+        self.lineas: list[str] = []
+
+    def familia(self, nombre: str, tipo: str, ayuda: str):
+        self.lineas.append(f"# HELP {nombre} {ayuda}")
+        self.lineas.append(f"# TYPE {nombre} {tipo}")
+
+    def muestra(self, nombre: str, valor, **etiquetas):
+        self.lineas.append(f"{nombre}{_etiquetas(etiquetas)} {_numero(valor)}")
+
+    def histograma(self, nombre: str, histograma, **etiquetas):
+        acumulados = histograma.acumulados()
+        for limite, cantidad in acumulados:
+            self.muestra(f"{nombre}_bucket", cantidad, **etiquetas, le=_numero(limite))
+        self.muestra(f"{nombre}_sum", histograma.suma, **etiquetas)
+        self.muestra(f"{nombre}_count", acumulados[-1][1] if acumulados else 0, **etiquetas)
+
+    def texto(self) -> str:
+        return "\n".join(self.lineas) + "\n"
+
+
+# =========================
+# CONTEOS DE NEGOCIO
+# =========================
+
+_lock = threading.Lock()
+_pendientes: tuple[int, int] | None = None          # (versión de pedidos, cantidad)
+_estimadas: tuple[float, dict[str, int]] | None = None  # (leídas en, tabla -> filas)
+
+
+def pedidos_pendientes(conexion) -> int:
+    global _pendientes
+    version = versiones.recientes(("pedidos",), PENDIENTES_CHEQUEO_SEG, conexion)["pedidos"][0]
+    with _lock:
+        if _pendientes is not None and _pendientes[0] == version:
+            return _pendientes[1]
+    cantidad = conexion.scalar(
+        select(func.count()).select_from(Pedido).where(Pedido.estado == EstadoPedido.pendiente)
+    )
+    with _lock:
+        _pendientes = (version, cantidad)
+    return cantidad
+
+
+def _leer_estimadas(conexion) -> dict[str, int]:
+    dialecto = conexion.dialect.name
+    if dialecto == "postgresql":
+        filas = conexion.execute(
+            text(
+                "SELECT relname, reltuples FROM pg_class "
+                "WHERE relkind = 'r' AND relname = ANY(:tablas) AND reltuples >= 0"
+            ),
+            {"tablas": list(TABLAS_ESTIMADAS)},
+        ).all()
+        return {nombre: int(filas_est) for nombre, filas_est in filas}
+
+    if dialecto == "sqlite":
+        existe = conexion.scalar(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'sqlite_stat1'")
+        )
+        if not existe:
+            return {}
+        estimadas: dict[str, int] = {}
+        # stat empieza con la cantidad de filas de la tabla (una fila por índice)
+        for tabla, stat in conexion.execute(text("SELECT tbl, stat FROM sqlite_stat1")):
+            if tabla in TABLAS_ESTIMADAS and stat:
+                estimadas[tabla] = max(estimadas.get(tabla, 0), int(stat.split()[0]))
+        return estimadas
+
+    return {}
+
+
+def filas_estimadas(conexion) -> dict[str, int]:
+    global _estimadas
+    ahora = time.monotonic()
+    with _lock:
+        if _estimadas is not None and ahora - _estimadas[0] < ESTIMADAS_SEG:
+            return _estimadas[1]
+    estimadas = _leer_estimadas(conexion)
+    with _lock:
+        _estimadas = (ahora, estimadas)
+    return estimadas
+
+
+# =========================
+# EXPOSICIÓN
+# =========================
+
+def _requests(salida: _Salida):
+    salida.familia("sabor_request_duracion_seconds", "histogram", "Duración de los requests HTTP por ruta.")
+    for ruta, histograma in sorted(dict(instrumentacion.histogramas_ruta).items()):
+        salida.histograma("sabor_request_duracion_seconds", histograma, ruta=ruta)
+
+    salida.familia("sabor_requests_en_curso", "gauge", "Requests HTTP empezados y sin terminar.")
+    salida.muestra("sabor_requests_en_curso", instrumentacion.en_curso)
+
+
+def _pools(salida: _Salida):
+    medidos = []
+    salida.familia("sabor_pool_conexiones", "gauge", "Conexiones de cada pool por estado.")
+    for nombre, pool in pools():
+        if hasattr(pool, "checkedout"):
+            salida.muestra("sabor_pool_conexiones", pool.checkedout(), pool=nombre, estado="en_uso")
+            salida.muestra("sabor_pool_conexiones", pool.checkedin(), pool=nombre, estado="libres")
+            salida.muestra("sabor_pool_conexiones", max(pool.overflow(), 0), pool=nombre, estado="overflow")
+            salida.muestra("sabor_pool_conexiones", pool.size(), pool=nombre, estado="tamanio")
+        if getattr(pool, "metricas", None) is not None:
+            medidos.append((nombre, pool.metricas))
+
+    salida.familia("sabor_pool_espera_seconds", "histogram", "Espera dentro del pool por una conexión.")
+    for nombre, m in medidos:
+        salida.histograma("sabor_pool_espera_seconds", m.espera, pool=nombre)
+    salida.familia("sabor_pool_checkout_seconds", "histogram", "Checkout completo, ping incluido.")
+    for nombre, m in medidos:
+        salida.histograma("sabor_pool_checkout_seconds", m.checkout, pool=nombre)
+    salida.familia("sabor_pool_pings_total", "counter", "Pings de conexiones ociosas.")
+    for nombre, m in medidos:
+        salida.muestra("sabor_pool_pings_total", m.pings - m.pings_fallidos, pool=nombre, resultado="ok")
+        salida.muestra("sabor_pool_pings_total", m.pings_fallidos, pool=nombre, resultado="fallido")
+
+
+def _plantillas(salida: _Salida):
+    salida.familia("sabor_plantilla_render_seconds", "histogram", "Render completo de cada plantilla.")
+    for nombre, histograma in sorted(plantillas.histogramas_render().items()):
+        salida.histograma("sabor_plantilla_render_seconds", histograma, plantilla=nombre)
+
+
+def _caches(salida: _Salida):
+    caches = {
+        "catalogo": catalogo.aciertos,
+        "menu": plantillas.aciertos_menu,
+        "etag": condicional.aciertos,
+    }
+    salida.familia("sabor_cache_aciertos_total", "counter", "Aciertos de cada cache (etag: respuestas 304).")
+    for nombre, a in caches.items():
+        salida.muestra("sabor_cache_aciertos_total", a.aciertos, cache=nombre)
+    salida.familia("sabor_cache_fallos_total", "counter", "Fallos de cada cache.")
+    for nombre, a in caches.items():
+        salida.muestra("sabor_cache_fallos_total", a.fallos, cache=nombre)
+    salida.familia("sabor_cache_proporcion_aciertos", "gauge", "Aciertos sobre el total desde el arranque.")
+    for nombre, a in caches.items():
+        salida.muestra("sabor_cache_proporcion_aciertos", round(a.proporcion(), 4), cache=nombre)
+
+
+def _negocio(salida: _Salida):
+    with read_engine.connect() as conexion:
+        pendientes = pedidos_pendientes(conexion)
+        estimadas = filas_estimadas(conexion)
+
+    salida.familia("sabor_pedidos_pendientes", "gauge", "Pedidos en estado pendiente.")
+    salida.muestra("sabor_pedidos_pendientes", pendientes)
+    if estimadas:
+        salida.familia("sabor_tabla_filas_estimadas", "gauge", "Filas por tabla según el planificador.")
+        for tabla, filas in sorted(estimadas.items()):
+            salida.muestra("sabor_tabla_filas_estimadas", filas, tabla=tabla)
+
+
+def generar() -> str:
+    """Texto completo para /metrics. Bloquea (lee la base): llamar desde el threadpool."""
+    salida = _Salida()
+    _requests(salida)
+    _pools(salida)
+    _plantillas(salida)
+    _caches(salida)
+    _negocio(salida)
+    return salida.texto()
@@ -0,0 +1,287 @@
+# instrumentacion.py
+"""
+Instrumentación por request: cuánto tiempo va a SQL, a renderizar plantillas
+y al resto (handler, hidratación del ORM).
+
+- Los eventos before/after_cursor_execute de cada engine suman consultas y
+  tiempo de SQL en la medición del request actual (ContextVar: el objeto se
+  comparte con el threadpool y con las sesiones async).
+- plantillas.PlantillaMedida avisa cuánto tardó el render (solo el de más
+  afuera; el SQL que dispara el render, por lazy loads, se descuenta).
+- El middleware agrega el header Server-Timing (db, render, app, total) y
+  acumula por ruta: un resumen de los últimos RESUMEN_VENTANA_SEG segundos
+  (ruta, requests, consultas y tiempos) y un histograma de duración. Los
+  streams (SIN_MEDIR, el SSE del tablero) no se miden.
+- Las consultas de más de SQL_LENTA_MS se escriben en el log "sabor.sql"
+  como JSON: SQL normalizado (sin valores), forma de los parámetros y ruta.
+  Las últimas quedan también en memoria para /admin/rendimiento.
+
+INSTRUMENTACION=0 no instala nada.
+"""
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime
+
+from sqlalchemy import event
+
+from metricas import Histograma
+
+ACTIVA = os.getenv("INSTRUMENTACION", "1").strip().lower() in ("1", "true", "si", "sí", "yes")
+SQL_LENTA_MS = float(os.getenv("SQL_LENTA_MS", "200"))
+RESUMEN_VENTANA_SEG = int(os.getenv("RESUMEN_VENTANA_SEG", "900"))
+MAX_LENTAS_EN_MEMORIA = 50
+# Conexiones largas (SSE): no son requests a medir y deformarían en_curso,
+# los histogramas y el resumen por ruta
+SIN_MEDIR = {"/pedidos/tablero/eventos"}
+
+log_sql = logging.getLogger("sabor.sql")
+
+
+class MedicionRequest:
+    __slots__ = ("scope", "consultas", "sql_seg", "render_seg", "sql_en_render_seg", "profundidad_render")
+
+    def __init__(self, scope=None):
+        self.scope = scope
+        self.consultas = 0
+        self.sql_seg = 0.0
+        self.render_seg = 0.0
+        self.sql_en_render_seg = 0.0
+        self.profundidad_render = 0
+
+    @property
+    def ruta(self) -> str:
+        return _nombre_ruta(self.scope) if self.scope is not None else "<fuera de request>"
+
+
+_actual: ContextVar[MedicionRequest | None] = ContextVar("medicion_request", default=None)
+
+
+def _nombre_ruta(scope) -> str:
+    ruta = scope.get("route")
+    if ruta is not None and hasattr(ruta, "path"):
+        return f"{scope['method']} {ruta.path}"
+    if scope["path"].startswith("/static/"):
+        return f"{scope['method']} /static"
+    # Sin ruta (404): no usar el path crudo para no abrir una entrada por URL
+    return f"{scope['method']} <sin ruta>"
+
+
+# =========================
+# SQL
+# =========================
+
+_ESPACIOS = re.compile(r"\s+")
+_CADENAS = re.compile(r"'(?:[^']|'')*'")
+_NUMEROS = re.compile(r"\b\d+(?:\.\d+)?\b")
+_MARCADORES = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<!:):[A-Za-z_]\w*")
+_LISTAS = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+
+
+def normalizar_sql(sql: str) -> str:
+    """SQL sin valores ni marcadores propios del driver: 'WHERE id IN (?...)'."""
+    sql = _ESPACIOS.sub(" ", sql).strip()
+    sql = _CADENAS.sub("?", sql)
+    sql = _MARCADORES.sub("?", sql)
+    sql = _NUMEROS.sub("?", sql)
+    return _LISTAS.sub("(?...)", sql)
+
+
+def forma_parametros(parametros, executemany: bool):
+    """Tipos de los parámetros, nunca sus valores."""
+    if executemany:
+        filas = list(parametros or [])
+        return {"filas": len(filas), "fila": forma_parametros(filas[0], False) if filas else None}
+    if isinstance(parametros, dict):
+        return {k: type(v).__name__ for k, v in sorted(parametros.items())}
+    if isinstance(parametros, (list, tuple)):
+        return [type(v).__name__ for v in parametros]
+    return type(parametros).__name__ if parametros is not None else None
+
+
+_lentas: deque = deque(maxlen=MAX_LENTAS_EN_MEMORIA)
+
+
+def _antes(conn, cursor, statement, parameters, context, executemany):
+    # En el contexto de ejecución y no en la conexión: si la consulta falla
+    # no hay after_cursor_execute y el dato se va con el contexto
+    if context is not None:
+        context._inicio_consulta = time.perf_counter()
+
+
+def _despues(conn, cursor, statement, parameters, context, executemany):
+    inicio = getattr(context, "_inicio_consulta", None)
+    if inicio is None:
+        return
+    duracion = time.perf_counter() - inicio
+    medicion = _actual.get()
+    if medicion is not None:
+        medicion.consultas += 1
+        medicion.sql_seg += duracion
+        if medicion.profundidad_render:
+            medicion.sql_en_render_seg += duracion
+
+    if duracion * 1000 >= SQL_LENTA_MS:
+        registro = {
+            "ts": datetime.now().isoformat(timespec="milliseconds"),
+            "ms": round(duracion * 1000, 1),
+            "ruta": medicion.ruta if medicion is not None else "<fuera de request>",
+            "sql": normalizar_sql(statement),
+            "parametros": forma_parametros(parameters, executemany),
+            "filas": cursor.rowcount,
+        }
+        _lentas.appendleft(registro)
+        log_sql.warning(json.dumps(registro, ensure_ascii=False, default=str))
+
+
+def instalar_en_engines(*motores):
+    """Engines sync (para los async, su .sync_engine). Repetidos se ignoran."""
+    if not ACTIVA:
+        return
+    for motor in {id(m): m for m in motores}.values():
+        event.listen(motor, "before_cursor_execute", _antes)
+        event.listen(motor, "after_cursor_execute", _despues)
+
+
+def consultas_lentas() -> list[dict]:
+    return list(_lentas)
+
+
+# =========================
+# RENDER
+# =========================
+
+@contextmanager
+def midiendo_render():
+    """Lo usa plantillas.PlantillaMedida; los renders anidados no suman dos veces."""
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    medicion.profundidad_render += 1
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.profundidad_render -= 1
+        if not medicion.profundidad_render:
+            medicion.render_seg += time.perf_counter() - inicio
+
+
+# =========================
+# RESUMEN POR RUTA
+# =========================
+
+_lock = threading.Lock()
+# minuto (epoch // 60) -> ruta -> [requests, consultas, sql_seg, render_seg, total_seg]
+_ventana: dict[int, dict[str, list]] = {}
+# Desde el arranque, para percentiles y /metrics
+histogramas_ruta: dict[str, Histograma] = {}
+# Requests HTTP empezados y todavía sin terminar
+en_curso = 0
+
+
+def _registrar(ruta: str, medicion: MedicionRequest, total: float, render_neto: float):
+    minuto = int(time.time() // 60)
+    with _lock:
+        por_ruta = _ventana.setdefault(minuto, {})
+        fila = por_ruta.setdefault(ruta, [0, 0, 0.0, 0.0, 0.0])
+        fila[0] += 1
+        fila[1] += medicion.consultas
+        fila[2] += medicion.sql_seg
+        fila[3] += render_neto
+        fila[4] += total
+        for viejo in [m for m in _ventana if m < minuto - RESUMEN_VENTANA_SEG // 60]:
+            del _ventana[viejo]
+        histograma = histogramas_ruta.get(ruta)
+        if histograma is None:
+            histograma = histogramas_ruta[ruta] = Histograma()
+    histograma.observar(total)
+
+
+def resumen_rutas(limite: int = 20) -> list[dict]:
+    """Rutas de la ventana ordenadas por tiempo total en la base."""
+    desde = int(time.time() // 60) - RESUMEN_VENTANA_SEG // 60
+    acumulado: dict[str, list] = {}
+    with _lock:
+        for minuto, por_ruta in _ventana.items():
+            if minuto < desde:
+                continue
+            for ruta, fila in por_ruta.items():
+                total = acumulado.setdefault(ruta, [0, 0, 0.0, 0.0, 0.0])
+                for i, valor in enumerate(fila):
+                    total[i] += valor
+        histogramas = dict(histogramas_ruta)
+
+    filas = []
+    for ruta, (requests, consultas, sql_seg, render_seg, total_seg) in acumulado.items():
+        filas.append({
+            "ruta": ruta,
+            "requests": requests,
+            "consultas_por_request": round(consultas / requests, 1),
+            "db_total_ms": round(sql_seg * 1000, 1),
+            "db_ms": round(sql_seg / requests * 1000, 2),
+            "render_ms": round(render_seg / requests * 1000, 2),
+            "total_ms": round(total_seg / requests * 1000, 2),
+            "p95_ms": round(histogramas[ruta].percentil(95) * 1000, 2) if ruta in histogramas else None,
+        })
+    filas.sort(key=lambda f: f["db_total_ms"], reverse=True)
+    return filas[:limite]
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+
+def _server_timing(medicion: MedicionRequest, total: float) -> tuple[str, float]:
+    render_neto = max(medicion.render_seg - medicion.sql_en_render_seg, 0.0)
+    app = max(total - medicion.sql_seg - render_neto, 0.0)
+    valor = (
+        f'db;dur={medicion.sql_seg * 1000:.1f};desc="{medicion.consultas} consultas", '
+        f"render;dur={render_neto * 1000:.1f}, "
+        f"app;dur={app * 1000:.1f}, "
+        f"total;dur={total * 1000:.1f}"
+    )
+    return valor, render_neto
+
+
+class InstrumentarRequest:
+    """Middleware ASGI; va por fuera de los demás para medir el request entero."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if not ACTIVA or scope["type"] != "http" or scope["path"] in SIN_MEDIR:
+            return await self.app(scope, receive, send)
+
+        global en_curso
+        medicion = MedicionRequest(scope)
+        token = _actual.set(medicion)
+        inicio = time.perf_counter()
+        with _lock:
+            en_curso += 1
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                valor, _ = _server_timing(medicion, time.perf_counter() - inicio)
+                mensaje = {**mensaje, "headers": list(mensaje.get("headers", [])) + [
+                    (b"server-timing", valor.encode("latin-1"))
+                ]}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            with _lock:
+                en_curso -= 1
+            _actual.reset(token)
+            total = time.perf_counter() - inicio
+            _, render_neto = _server_timing(medicion, total)
+            _registrar(medicion.ruta, medicion, total, render_neto)
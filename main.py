@@ -1,13 +1,18 @@
 # main.py
+import arranque  # primero: marca el inicio para medir el import
+
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta, date
 from typing import List
-import hashlib
-import io
-import csv
+from urllib.parse import urlencode
+import asyncio
+import json
+import os
+import time
 
 from fastapi import FastAPI, Request, Depends, Form
-from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, HTMLResponse, PlainTextResponse, RedirectResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 
 from sqlalchemy import Column, Integer, String, Float, Boolean, DateTime, ForeignKey, Enum
@@ -16,12 +21,25 @@ from sqlalchemy.orm import Session, relationship
 from sqlalchemy.orm import joinedload  # <-- Y ESTO
 
 
-from sqlalchemy import asc, desc
+from sqlalchemy import asc, case, desc, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
 
 
 from starlette.middleware.sessions import SessionMiddleware
 
-from database import Base, engine, get_db, SessionLocal
+from database import (
+    LEER_PRIMARIO_SEG,
+    READ_DATABASE_URL,
+    async_engine,
+    engine,
+    estadisticas_pool,
+    get_async_db,
+    get_db,
+    get_read_db,
+    iniciar_mantenimiento_sqlite,
+    leer_del_primario,
+    read_engine,
+)
 from models import (
     Producto,
     Cliente,
@@ -32,29 +50,106 @@ from models import (
     EstadoPedido,
     Usuario,
 )
+from paginacion import (
+    POR_PAGINA_DEFECTO,
+    CLAVE_FECHA_ID,
+    CLAVE_FECHA_NULA_ID,
+    codificar_cursor,
+    contar_total,
+    decodificar_cursor,
+    despues_de,
+    por_pagina_valido,
+)
+import busqueda
+import cta_cte
+import ventas_diarias
+import servicio_pedidos
+import catalogo
+import versiones
+import eventos
+import plantillas
+import activos
+import condicional
+import instrumentacion
+import exposicion
+import perfiles
+from arranque import hash_password
 
 # =========================
 # CONFIGURACIÓN BÁSICA
 # =========================
 
-Base.metadata.create_all(bind=engine)
-
-app = FastAPI(title="Sabor de Autor - Gestión")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # La base se prepara acá (no al importar) y solo si corresponde; en
+    # producción se usa `python manage.py init-db` (ver arranque.py)
+    init_db_ms = None
+    if arranque.init_al_arrancar():
+        inicio = time.perf_counter()
+        for nombre in await run_in_threadpool(arranque.inicializar_base):
+            print(f"Migración aplicada: {nombre}")
+        init_db_ms = (time.perf_counter() - inicio) * 1000
+    iniciar_mantenimiento_sqlite()  # solo hace algo con la base SQLite local
+    await run_in_threadpool(plantillas.precompilar, templates.env)
+    arranque.fin_arranque(init_db_ms)
+    yield
+    # Cerrar las conexiones del pool: con aiosqlite cada conexión tiene su
+    # hilo y, si queda abierta, el proceso no termina
+    await async_engine.dispose()
+
+
+app = FastAPI(title="Sabor de Autor - Gestión", lifespan=lifespan)
 
 # Static y templates
-app.mount("/static", StaticFiles(directory="static"), name="static")
-templates = Jinja2Templates(directory="templates")
+# /static: archivos con huella del build (`manage.py assets`) con cache
+# immutable y variantes .br/.gz; ver activos.py
+app.mount("/static", activos.StaticActivos(directory="static"), name="static")
+# Entorno con bytecode cache, render medido y menú cacheado (ver plantillas.py)
+templates = Jinja2Templates(env=plantillas.crear_entorno())
 templates.env.globals["now"] = datetime.now  # helper para plantillas
 
+# Perfilador de requests a pedido (ver perfiles.py). Apagado no se instala.
+# Es el más interno: un 304 no tiene nada para perfilar.
+if perfiles.ACTIVO:
+    app.add_middleware(perfiles.Perfilar, router=app.router)
+
+# ETag / 304 para listados y tablero (ver condicional.py). Se registra
+# antes que la sesión y "leer lo que escribí" para quedar adentro de ambos.
+app.add_middleware(condicional.GetCondicional)
+
+# Leer lo que escribí: con una réplica de lectura, durante unos segundos
+# después de un POST las rutas de lectura de ese usuario van al primario.
+# Se registra antes que SessionMiddleware para quedar adentro y ver la sesión.
+if READ_DATABASE_URL:
+    @app.middleware("http")
+    async def leer_del_primario_tras_escribir(request: Request, call_next):
+        ahora = time.time()
+        token = leer_del_primario.set(request.session.get("primario_hasta", 0) > ahora)
+        try:
+            response = await call_next(request)
+        finally:
+            leer_del_primario.reset(token)
+        if request.method != "GET" and response.status_code < 400:
+            request.session["primario_hasta"] = ahora + LEER_PRIMARIO_SEG
+        return response
+
+
 # Sesiones (usuario logueado)
 app.add_middleware(
     SessionMiddleware,
     secret_key="SABOR_DE_AUTOR_SECRET_2025",  # podés cambiarlo
 )
 
+# Gzip de las respuestas HTML/JSON (lo estático ya viene comprimido)
+app.add_middleware(activos.GZipDinamico, minimum_size=1000, compresslevel=6)
+
+# Tiempo hasta el primer request (ver arranque.py)
+app.add_middleware(arranque.MedirPrimerRequest)
 
-def hash_password(password: str) -> str:
-    return hashlib.sha256(password.encode("utf-8")).hexdigest()
+# SQL / render / total por request y header Server-Timing (ver
+# instrumentacion.py). Último en registrarse: envuelve a todos los demás.
+instrumentacion.instalar_en_engines(engine, read_engine, async_engine.sync_engine)
+app.add_middleware(instrumentacion.InstrumentarRequest)
 
 
 def is_logged_in(request: Request) -> bool:
@@ -62,27 +157,6 @@ def is_logged_in(request: Request) -> bool:
     return bool(request.session.get("user"))
 
 
-def ensure_admin_user():
-    """Crea el usuario admin por defecto si no existe."""
-    db = SessionLocal()
-    try:
-        admin = db.query(Usuario).filter(Usuario.username == "admin").first()
-        if not admin:
-            admin = Usuario(
-                username="admin",
-                nombre="Administrador",
-                es_admin=True,
-                password_hash=hash_password("sda2025"),
-                activo=True,
-            )
-            db.add(admin)
-            db.commit()
-    finally:
-        db.close()
-
-
-ensure_admin_user()
-
 # =========================
 # LOGIN / LOGOUT
 # =========================
@@ -108,13 +182,13 @@ async def login_submit(
     request: Request,
     username: str = Form(...),
     password: str = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     user = (
-        db.query(Usuario)
-        .filter(Usuario.username == username, Usuario.activo == True)
-        .first()
-    )
+        await db.execute(
+            select(Usuario).where(Usuario.username == username, Usuario.activo == True)
+        )
+    ).scalars().first()
 
     if user and user.password_hash == hash_password(password):
         request.session["user"] = {
@@ -166,7 +240,7 @@ def home(request: Request, db: Session = Depends(get_db)):
 # PRODUCTOS
 # =========================
 @app.get("/productos", response_class=HTMLResponse)
-def listar_productos(request: Request, db: Session = Depends(get_db)):
+def listar_productos(request: Request, db: Session = Depends(get_read_db)):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
@@ -213,7 +287,9 @@ def guardar_producto(
         contenido=contenido,
     )
     db.add(producto)
+    versiones.incrementar(db, "productos")
     db.commit()
+    catalogo.invalidar("productos")
     return RedirectResponse("/productos", status_code=303)
 
 
@@ -257,7 +333,9 @@ def actualizar_producto(
     producto.contenido = contenido
     producto.activo = activo
 
+    versiones.incrementar(db, "productos")
     db.commit()
+    catalogo.invalidar("productos")
     return RedirectResponse("/productos", status_code=303)
 
 
@@ -268,21 +346,16 @@ def actualizar_producto(
 def listar_clientes(
     request: Request,
     q: str | None = None,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
-    query = db.query(Cliente)
-
     if q:
-        patron = f"%{q}%"
-        query = query.filter(
-            Cliente.nombre.ilike(patron) |
-            Cliente.telefono.ilike(patron)
-        )
-
-    clientes = query.order_by(asc(Cliente.nombre)).all()
+        # Búsqueda indexada, sin acentos, de mejor a peor coincidencia
+        clientes = busqueda.buscar_clientes(db, q)
+    else:
+        clientes = db.query(Cliente).order_by(asc(Cliente.nombre)).all()
 
     return templates.TemplateResponse(
         "clientes/lista.html",
@@ -329,7 +402,9 @@ def guardar_cliente(
         notas=notas,
     )
     db.add(cliente)
+    versiones.incrementar(db, "clientes")
     db.commit()
+    catalogo.invalidar("clientes")
     return RedirectResponse("/clientes", status_code=303)
 
 
@@ -373,7 +448,9 @@ def actualizar_cliente(
     cliente.ciudad = ciudad
     cliente.notas = notas
 
+    versiones.incrementar(db, "clientes")
     db.commit()
+    catalogo.invalidar("clientes")
     return RedirectResponse("/clientes", status_code=303)
 
 
@@ -384,46 +461,32 @@ def actualizar_cliente(
 def ver_cta_cte(
     cliente_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    cursor: str = "",
+    dir: str = "sig",
+    por_pagina: int = POR_PAGINA_DEFECTO,
+    db: Session = Depends(get_read_db),
 ):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
     cliente = db.get(Cliente, cliente_id)
+    if not cliente:
+        return RedirectResponse("/clientes", status_code=303)
 
-    movimientos_db = (
-        db.query(MovimientoCtaCte)
-        .filter(MovimientoCtaCte.cliente_id == cliente_id)
-        .order_by(asc(MovimientoCtaCte.fecha))
-        .all()
-    )
-
-    mov_rows = []
-    saldo = 0.0
-
-    for m in movimientos_db:
-        if m.tipo == TipoMovimiento.debito:
-            saldo += m.monto
-            es_debito = True
-        else:
-            saldo -= m.monto
-            es_debito = False
-
-        mov_rows.append(
-            {
-                "mov": m,
-                "saldo": saldo,
-                "es_debito": es_debito,
-            }
-        )
+    # Página de movimientos (más nuevos primero) con saldo acumulado
+    por_pagina = por_pagina_valido(por_pagina)
+    pagina = cta_cte.pagina_movimientos(db, cliente, cursor, dir, por_pagina)
 
     return templates.TemplateResponse(
         "clientes/cta_cte.html",
         {
             "request": request,
             "cliente": cliente,
-            "mov_rows": mov_rows,
-            "saldo_final": saldo,
+            "mov_rows": pagina["filas"],
+            "cursor_sig": pagina["cursor_sig"],
+            "cursor_ant": pagina["cursor_ant"],
+            "por_pagina": por_pagina,
+            "saldo_final": cliente.saldo or 0.0,
             "active_page": "clientes",
         }
     )
@@ -436,13 +499,13 @@ def registrar_pago(
     descripcion: str = Form("Pago"),
     db: Session = Depends(get_db),
 ):
-    pago = MovimientoCtaCte(
-        cliente_id=cliente_id,
-        tipo=TipoMovimiento.credito,
-        monto=monto,
-        descripcion=descripcion,
+    cta_cte.registrar_movimiento(
+        db,
+        cliente_id,
+        TipoMovimiento.credito,
+        monto,
+        descripcion,
     )
-    db.add(pago)
     db.commit()
     return RedirectResponse(
         f"/clientes/{cliente_id}/cta-cte",
@@ -460,34 +523,37 @@ def listar_pedidos(
     estado: str = "todos",
     desde: str = "",
     hasta: str = "",
-    db: Session = Depends(get_db),
+    cursor: str = "",
+    dir: str = "sig",
+    por_pagina: int = POR_PAGINA_DEFECTO,
+    total: bool = False,
+    db: Session = Depends(get_read_db),
 ):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
-    query = (
-        db.query(Pedido)
-        .options(joinedload(Pedido.cliente))
-    )
+    query = db.query(Pedido)
+    sin_filtros = True
 
-    # 🔍 Filtro por cliente (texto)
-    if buscar:
-        patron = f"%{buscar.strip()}%"
-        query = query.filter(
-            Pedido.cliente.has(Cliente.nombre.ilike(patron))
-        )
+    # 🔍 Filtro por cliente (texto, usa el índice de búsqueda de clientes)
+    if buscar.strip():
+        query = query.filter(busqueda.filtro_cliente(db, buscar, Pedido.cliente_id))
+        sin_filtros = False
 
     # ✅ Filtro por estado
     if estado == "pendiente":
         query = query.filter(Pedido.estado == EstadoPedido.pendiente)
+        sin_filtros = False
     elif estado == "entregado":
         query = query.filter(Pedido.estado == EstadoPedido.entregado)
+        sin_filtros = False
 
     # 📅 Filtro por fechas
     if desde:
         try:
             f_desde = datetime.strptime(desde, "%Y-%m-%d")
             query = query.filter(Pedido.fecha_pedido >= f_desde)
+            sin_filtros = False
         except ValueError:
             pass
 
@@ -495,10 +561,61 @@ def listar_pedidos(
         try:
             f_hasta = datetime.strptime(hasta, "%Y-%m-%d") + timedelta(days=1)
             query = query.filter(Pedido.fecha_pedido < f_hasta)
+            sin_filtros = False
         except ValueError:
             pass
 
-    pedidos = query.order_by(Pedido.fecha_pedido.desc()).all()
+    # 📄 Página por clave (fecha_pedido DESC, id DESC), sin OFFSET ni COUNT
+    por_pagina = por_pagina_valido(por_pagina)
+    filtrada = query
+    clave = decodificar_cursor(cursor, CLAVE_FECHA_ID)
+    pagina_q = query.options(joinedload(Pedido.cliente))
+
+    if clave and dir == "ant":
+        pedidos = (
+            pagina_q
+            .filter(despues_de(Pedido.fecha_pedido, Pedido.id, *clave, descendente=False))
+            .order_by(Pedido.fecha_pedido, Pedido.id)
+            .limit(por_pagina + 1)
+            .all()
+        )
+        hay_mas_nuevos = len(pedidos) > por_pagina
+        pedidos = pedidos[:por_pagina][::-1]
+        hay_mas_viejos = True
+    else:
+        if clave:
+            pagina_q = pagina_q.filter(despues_de(Pedido.fecha_pedido, Pedido.id, *clave))
+        pedidos = (
+            pagina_q
+            .order_by(Pedido.fecha_pedido.desc(), Pedido.id.desc())
+            .limit(por_pagina + 1)
+            .all()
+        )
+        hay_mas_viejos = len(pedidos) > por_pagina
+        pedidos = pedidos[:por_pagina]
+        hay_mas_nuevos = clave is not None
+
+    cursor_sig = cursor_ant = None
+    if pedidos:
+        if hay_mas_viejos:
+            cursor_sig = codificar_cursor(pedidos[-1].fecha_pedido, pedidos[-1].id)
+        if hay_mas_nuevos:
+            cursor_ant = codificar_cursor(pedidos[0].fecha_pedido, pedidos[0].id)
+
+    # Total solo a pedido (?total=1); sin filtros es una estimación barata
+    total_pedidos = total_aproximado = None
+    if total:
+        total_pedidos, total_aproximado = contar_total(
+            db, filtrada, Pedido.__table__, sin_filtros
+        )
+
+    filtros_qs = urlencode({
+        "buscar": buscar,
+        "estado": estado,
+        "desde": desde,
+        "hasta": hasta,
+        "por_pagina": por_pagina,
+    })
 
     return templates.TemplateResponse(
         "pedidos/lista.html",
@@ -509,25 +626,135 @@ def listar_pedidos(
             "estado": estado,
             "desde": desde,
             "hasta": hasta,
+            "cursor_sig": cursor_sig,
+            "cursor_ant": cursor_ant,
+            "filtros_qs": filtros_qs,
+            "total_pedidos": total_pedidos,
+            "total_aproximado": total_aproximado,
             "active_page": "pedidos",
         },
     )
 
 
+# Entregados que se muestran de entrada y por cada "Cargar más"
+ENTREGADOS_POR_TANDA = 20
+
+
+def _rango_hoy() -> tuple[datetime, datetime]:
+    """[inicio de hoy, inicio de mañana): comparable directo contra fecha_pedido."""
+    inicio = datetime.combine(date.today(), datetime.min.time())
+    return inicio, inicio + timedelta(days=1)
+
+
+def _tanda_entregados(db: Session, cursor: str | None = None) -> tuple[list, str | None]:
+    """
+    Entregados por fecha de entrega, la más reciente primero y los que no la
+    tienen al final; cursor por (fecha_entrega, id).
+
+    Se piden por separado los que tienen fecha y los que no, así las dos
+    consultas recorren el índice (estado, fecha_entrega, id) desde el cursor
+    en cualquier motor (un OR con IS NULL obliga a recorrerlo desde el principio).
+    """
+    base = (
+        db.query(Pedido)
+        .options(joinedload(Pedido.cliente))
+        .filter(Pedido.estado == EstadoPedido.entregado)
+    )
+    clave = decodificar_cursor(cursor, CLAVE_FECHA_NULA_ID)
+    limite = ENTREGADOS_POR_TANDA + 1
+
+    pedidos = []
+    if not clave or clave[0] is not None:
+        con_fecha = base.filter(Pedido.fecha_entrega.isnot(None))
+        if clave:
+            con_fecha = con_fecha.filter(despues_de(Pedido.fecha_entrega, Pedido.id, *clave))
+        pedidos = (
+            con_fecha.order_by(Pedido.fecha_entrega.desc(), Pedido.id.desc())
+            .limit(limite)
+            .all()
+        )
+    if len(pedidos) < limite:
+        sin_fecha = base.filter(Pedido.fecha_entrega.is_(None))
+        if clave and clave[0] is None:
+            sin_fecha = sin_fecha.filter(Pedido.id < clave[1])
+        pedidos += sin_fecha.order_by(Pedido.id.desc()).limit(limite - len(pedidos)).all()
+
+    cursor_sig = None
+    if len(pedidos) > ENTREGADOS_POR_TANDA:
+        pedidos = pedidos[:ENTREGADOS_POR_TANDA]
+        cursor_sig = codificar_cursor(pedidos[-1].fecha_entrega, pedidos[-1].id)
+    return pedidos, cursor_sig
+
+
+def _conteos_tablero(db: Session) -> dict:
+    """Cantidades por columna en una sola consulta agrupada."""
+    inicio_hoy, inicio_manana = _rango_hoy()
+    es_de_hoy = case((Pedido.fecha_pedido >= inicio_hoy, True), else_=False)
+    conteos = {"hoy": 0, "pendientes": 0, "entregados": 0}
+    for estado, de_hoy, cantidad in (
+        db.query(Pedido.estado, es_de_hoy, func.count())
+        .filter(or_(Pedido.estado == EstadoPedido.entregado, Pedido.fecha_pedido < inicio_manana))
+        .group_by(Pedido.estado, es_de_hoy)
+    ):
+        if estado == EstadoPedido.entregado:
+            conteos["entregados"] += cantidad
+        elif estado == EstadoPedido.pendiente:
+            conteos["hoy" if de_hoy else "pendientes"] += cantidad
+    return conteos
+
+
+def _columna_tablero(pedido: Pedido) -> str | None:
+    """Columna del tablero en la que va el pedido (None si no se muestra)."""
+    if pedido.estado == EstadoPedido.entregado:
+        return "entregados"
+    if pedido.estado == EstadoPedido.pendiente:
+        inicio_hoy, inicio_manana = _rango_hoy()
+        if pedido.fecha_pedido >= inicio_manana:
+            return None
+        return "hoy" if pedido.fecha_pedido >= inicio_hoy else "pendientes"
+    return None
+
+
+def avisar_tablero(accion: str, pedido_id: int, antes: str | None, despues: str | None):
+    """
+    Publica el cambio de un pedido para los tableros abiertos. Llamar después
+    del commit con la columna en la que estaba y en la que queda (None si no
+    se muestra o se eliminó). En vez de recontar, los conteos viajan como
+    deltas (-1 / +1) y solo si cambió la columna; al reconectarse el tablero
+    recarga la página y vuelve a tomar los conteos de ahí.
+    """
+    versiones.olvidar("pedidos")  # el próximo GET del tablero relee la versión
+    deltas = {}
+    if antes != despues:
+        if antes:
+            deltas[antes] = -1
+        if despues:
+            deltas[despues] = 1
+    eventos.bus.publicar("pedido", {
+        "accion": accion,
+        "id": pedido_id,
+        "columna": despues,
+        "deltas": deltas,
+    })
+
+
 @app.get("/pedidos/tablero", response_class=HTMLResponse)
-def tablero_pedidos(request: Request, db: Session = Depends(get_db)):
+def tablero_pedidos(request: Request, db: Session = Depends(get_read_db)):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
     hoy = date.today()
+    inicio_hoy, inicio_manana = _rango_hoy()
 
     base_q = db.query(Pedido).options(joinedload(Pedido.cliente))
 
+    # Rangos semiabiertos sobre fecha_pedido: usan el índice (estado, fecha_pedido)
     realizados_hoy = (
         base_q
         .filter(
             Pedido.estado == EstadoPedido.pendiente,
-            func.date(Pedido.fecha_pedido) == hoy,
+            Pedido.fecha_pedido >= inicio_hoy,
+            Pedido.fecha_pedido < inicio_manana,
         )
         .order_by(Pedido.fecha_pedido.desc())
         .all()
@@ -537,7 +764,7 @@ def tablero_pedidos(request: Request, db: Session = Depends(get_db)):
         base_q
         .filter(
             Pedido.estado == EstadoPedido.pendiente,
-            func.date(Pedido.fecha_pedido) < hoy,
+            Pedido.fecha_pedido < inicio_hoy,
         )
         .order_by(
             Pedido.fecha_entrega.is_(None).desc(),
@@ -547,15 +774,8 @@ def tablero_pedidos(request: Request, db: Session = Depends(get_db)):
         .all()
     )
 
-    entregados = (
-        base_q
-        .filter(Pedido.estado == EstadoPedido.entregado)
-        .order_by(
-            Pedido.fecha_entrega.desc().nullslast(),
-            Pedido.fecha_pedido.desc(),
-        )
-        .all()
-    )
+    entregados, cursor_entregados = _tanda_entregados(db)
+    conteos = _conteos_tablero(db)
 
     return templates.TemplateResponse(
         "pedidos/tablero.html",
@@ -565,11 +785,96 @@ def tablero_pedidos(request: Request, db: Session = Depends(get_db)):
             "realizados_hoy": realizados_hoy,
             "pendientes": pendientes,
             "entregados": entregados,
+            "cursor_entregados": cursor_entregados,
+            "conteos": conteos,
             "hoy": hoy,  # <- se usa en la plantilla para marcar atrasados, etc.
         },
     )
 
 
+@app.get("/pedidos/tablero/entregados", response_class=HTMLResponse)
+def tablero_entregados(
+    request: Request,
+    cursor: str = "",
+    db: Session = Depends(get_read_db),
+):
+    """Siguiente tanda de entregados (HTML parcial para el botón "Cargar más")."""
+    if not is_logged_in(request):
+        return HTMLResponse("", status_code=401)
+
+    entregados, cursor_entregados = _tanda_entregados(db, cursor)
+    return templates.TemplateResponse(
+        "pedidos/_entregados.html",
+        {
+            "request": request,
+            "entregados": entregados,
+            "cursor_entregados": cursor_entregados,
+        },
+    )
+
+
+@app.get("/pedidos/tablero/tarjeta/{pedido_id}", response_class=HTMLResponse)
+def tablero_tarjeta(
+    pedido_id: int,
+    request: Request,
+    db: Session = Depends(get_db),
+):
+    """Tarjeta de un pedido (HTML parcial) para actualizar el tablero en el lugar."""
+    if not is_logged_in(request):
+        return HTMLResponse("", status_code=401)
+
+    pedido = (
+        db.query(Pedido)
+        .options(joinedload(Pedido.cliente))
+        .filter(Pedido.id == pedido_id)
+        .first()
+    )
+    columna = _columna_tablero(pedido) if pedido else None
+    if columna is None:
+        return HTMLResponse("", status_code=404)
+
+    return templates.TemplateResponse(
+        "pedidos/_tarjeta.html",
+        {"request": request, "p": pedido, "columna": columna},
+    )
+
+
+# Cada cuánto se manda un comentario para mantener viva la conexión SSE
+SSE_KEEPALIVE_SEG = 20
+
+
+@app.get("/pedidos/tablero/eventos")
+async def tablero_eventos(request: Request):
+    """
+    Server-Sent Events con los cambios de pedidos. Cada pantalla abierta
+    mantiene una conexión ociosa y recibe solo eventos chicos; el tablero
+    pide la tarjeta del pedido afectado y la reemplaza en el lugar.
+    """
+    if not is_logged_in(request):
+        return HTMLResponse("", status_code=401)
+
+    cola = eventos.bus.suscribir()
+
+    async def flujo():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=SSE_KEEPALIVE_SEG)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        break
+                    yield ": ping\n\n"
+                    continue
+                yield f"event: {evento['tipo']}\ndata: {json.dumps(evento)}\n\n"
+        finally:
+            eventos.bus.desuscribir(cola)
+
+    return StreamingResponse(
+        flujo(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.post("/pedidos/{pedido_id}/marcar-entregado")
@@ -581,11 +886,14 @@ def marcar_pedido_entregado(
     if not pedido:
         return RedirectResponse("/pedidos/tablero", status_code=303)
 
+    antes = _columna_tablero(pedido)
     pedido.estado = EstadoPedido.entregado
     # Si no tiene fecha de entrega, le ponemos hoy
     if not pedido.fecha_entrega:
         pedido.fecha_entrega = datetime.utcnow().date()
+    versiones.incrementar(db, "pedidos")
     db.commit()
+    avisar_tablero("entregado", pedido_id, antes, "entregados")
 
     return RedirectResponse("/pedidos/tablero", status_code=303)
 
@@ -599,20 +907,20 @@ def eliminar_pedido(
     if not pedido:
         return RedirectResponse("/pedidos/tablero", status_code=303)
 
+    antes = _columna_tablero(pedido)
+
+    # Descontar el pedido del resumen diario de ventas
+    ventas_diarias.aplicar_pedido(db, pedido, -1)
+
     # Borrar movimiento de cuenta corriente asociado (débito del pedido)
-    movs = (
-        db.query(MovimientoCtaCte)
-        .filter(
-            MovimientoCtaCte.descripcion == f"Pedido #{pedido.id}",
-            MovimientoCtaCte.tipo == TipoMovimiento.debito,
-        )
-        .all()
-    )
-    for m in movs:
-        db.delete(m)
+    for m in cta_cte.debitos_de_pedido(db, pedido.id):
+        cta_cte.eliminar_movimiento(db, m)
 
+    # Borrar ítems y pedido (cascade ya maneja los ítems)
     db.delete(pedido)
+    versiones.incrementar(db, "pedidos")
     db.commit()
+    avisar_tablero("eliminado", pedido_id, antes, None)
 
     return RedirectResponse("/pedidos/tablero", status_code=303)
 
@@ -625,13 +933,9 @@ def nuevo_pedido(
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
 
-    clientes = db.query(Cliente).order_by(asc(Cliente.nombre)).all()
-    productos = (
-        db.query(Producto)
-        .filter(Producto.activo == True)
-        .order_by(asc(Producto.nombre))
-        .all()
-    )
+    # Datos de referencia desde el cache en memoria (ver catalogo.py)
+    clientes = catalogo.clientes(db)
+    productos = catalogo.productos_activos(db)
 
     return templates.TemplateResponse(
         "pedidos/form.html",
@@ -655,13 +959,9 @@ def editar_pedido(
         return RedirectResponse("/login", status_code=303)
 
     pedido = db.get(Pedido, pedido_id)
-    clientes = db.query(Cliente).order_by(asc(Cliente.nombre)).all()
-    productos = (
-        db.query(Producto)
-        .filter(Producto.activo == True)
-        .order_by(asc(Producto.nombre))
-        .all()
-    )
+    # Datos de referencia desde el cache en memoria (ver catalogo.py)
+    clientes = catalogo.clientes(db)
+    productos = catalogo.productos_activos(db)
 
     return templates.TemplateResponse(
         "pedidos/form.html",
@@ -690,7 +990,7 @@ async def guardar_pedido(
     descripcion_item: List[str] = Form(...),
     cantidad: List[int] = Form(...),
     precio_unitario: List[float] = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
     # Fecha de entrega
     fecha_entrega_dt = None
@@ -716,56 +1016,15 @@ async def guardar_pedido(
         estado=EstadoPedido.pendiente,
     )
 
-    db.add(pedido)
-    db.flush()  # para tener pedido.id
-
-    subtotal_pedido = 0.0
-
-    # Ítems
-    for idx, prod_id in enumerate(producto_id):
-        if not prod_id:
-            continue
-
-        prod = db.get(Producto, int(prod_id))
-        if not prod:
-            continue
-
-        cant = int(cantidad[idx]) if cantidad[idx] else 1
-        pv = float(precio_unitario[idx]) if precio_unitario[idx] else prod.precio_venta
-
-        costo = prod.precio_compra
-        subtotal = pv * cant
-        subtotal_pedido += subtotal
-
-        item = PedidoItem(
-            pedido_id=pedido.id,
-            producto_id=prod.id,
-            descripcion_item=descripcion_item[idx] or prod.nombre,
-            cantidad=cant,
-            precio_venta_unitario=pv,
-            costo_unitario=costo,
-            subtotal=subtotal,
-        )
-        db.add(item)
-
-    if pedido.descuento is None:
-        pedido.descuento = 0.0
-
-    # Descuento en monto a partir del porcentaje
-    descuento_monto = subtotal_pedido * (pedido.descuento / 100.0)
-    pedido.total = max(subtotal_pedido - descuento_monto, 0.0)
-
-    # Movimiento cta cte por el TOTAL NETO
-    if pedido.total > 0:
-        mov = MovimientoCtaCte(
-            cliente_id=pedido.cliente_id,
-            tipo=TipoMovimiento.debito,
-            monto=pedido.total,
-            descripcion=f"Pedido #{pedido.id}",
-        )
-        db.add(mov)
+    # Ítems, resumen diario y débito en cta cte (ver servicio_pedidos.py).
+    # El servicio es sincrónico: run_sync lo corre sobre la conexión async.
+    lineas = await db.run_sync(
+        servicio_pedidos.armar_lineas, producto_id, descripcion_item, cantidad, precio_unitario
+    )
+    await db.run_sync(servicio_pedidos.crear_pedido, pedido, lineas)
 
-    db.commit()
+    await db.commit()
+    avisar_tablero("creado", pedido.id, None, _columna_tablero(pedido))
 
     return RedirectResponse("/pedidos", status_code=303)
 
@@ -774,7 +1033,7 @@ async def guardar_pedido(
 def ver_pedido(
     pedido_id: int,
     request: Request,
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
@@ -813,35 +1072,6 @@ def ver_pedido(
     )
 
 
-@app.post("/pedidos/{pedido_id}/eliminar")
-def eliminar_pedido(
-    pedido_id: int,
-    db: Session = Depends(get_db),
-):
-    pedido = db.get(Pedido, pedido_id)
-    if not pedido:
-        return RedirectResponse("/pedidos/tablero", status_code=303)
-
-    # Borrar movimiento de cuenta corriente asociado (el débito del pedido)
-    movs = (
-        db.query(MovimientoCtaCte)
-        .filter(
-            MovimientoCtaCte.descripcion == f"Pedido #{pedido.id}",
-            MovimientoCtaCte.tipo == TipoMovimiento.debito,
-        )
-        .all()
-    )
-    for m in movs:
-        db.delete(m)
-
-    # Borrar ítems y pedido (cascade ya maneja los ítems)
-    db.delete(pedido)
-    db.commit()
-
-    return RedirectResponse("/pedidos/tablero", status_code=303)
-
-
-
 @app.post("/pedidos/actualizar/{pedido_id}")
 async def actualizar_pedido(
     pedido_id: int,
@@ -854,9 +1084,11 @@ async def actualizar_pedido(
     descripcion_item: List[str] = Form(...),
     cantidad: List[int] = Form(...),
     precio_unitario: List[float] = Form(...),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
 ):
-    pedido = db.get(Pedido, pedido_id)
+    pedido = await db.get(Pedido, pedido_id)
+    if not pedido:
+        return RedirectResponse("/pedidos", status_code=303)
 
     # Fecha
     fecha_entrega_dt = None
@@ -872,99 +1104,29 @@ async def actualizar_pedido(
     except ValueError:
         descuento_pct = 0.0
 
-    pedido.cliente_id = cliente_id
-    pedido.fecha_entrega = fecha_entrega_dt
-    pedido.medio_contacto = medio_contacto
-    pedido.observaciones = observaciones
-    pedido.descuento = descuento_pct
-
-    # Borrar ítems anteriores
-    for item in list(pedido.items):
-        db.delete(item)
-    db.flush()
-
-    subtotal_pedido = 0.0
-
-    # Re-crear ítems
-    for idx, prod_id in enumerate(producto_id):
-        if not prod_id:
-            continue
-
-        prod = db.get(Producto, int(prod_id))
-        if not prod:
-            continue
-
-        cant = int(cantidad[idx]) if cantidad[idx] else 1
-        pv = float(precio_unitario[idx]) if precio_unitario[idx] else prod.precio_venta
-
-        costo = prod.precio_compra
-        subtotal = pv * cant
-        subtotal_pedido += subtotal
-
-        item = PedidoItem(
-            pedido_id=pedido.id,
-            producto_id=prod.id,
-            descripcion_item=descripcion_item[idx] or prod.nombre,
-            cantidad=cant,
-            precio_venta_unitario=pv,
-            costo_unitario=costo,
-            subtotal=subtotal,
-        )
-        db.add(item)
-
-    if pedido.descuento is None:
-        pedido.descuento = 0.0
-
-    descuento_monto = subtotal_pedido * (pedido.descuento / 100.0)
-    pedido.total = max(subtotal_pedido - descuento_monto, 0.0)
+    antes = _columna_tablero(pedido)
 
-    # Actualizar movimiento de cta cte
-    mov = (
-        db.query(MovimientoCtaCte)
-        .filter(
-            MovimientoCtaCte.descripcion == f"Pedido #{pedido.id}",
-            MovimientoCtaCte.tipo == TipoMovimiento.debito,
-        )
-        .order_by(desc(MovimientoCtaCte.fecha))
-        .first()
+    # Solo se escriben los ítems que cambiaron (ver servicio_pedidos.py)
+    lineas = await db.run_sync(
+        servicio_pedidos.armar_lineas, producto_id, descripcion_item, cantidad, precio_unitario
+    )
+    await db.run_sync(
+        servicio_pedidos.actualizar_pedido,
+        pedido,
+        lineas,
+        cliente_id=cliente_id,
+        fecha_entrega=fecha_entrega_dt,
+        medio_contacto=medio_contacto,
+        observaciones=observaciones,
+        descuento=descuento_pct,
     )
 
-    if pedido.total > 0:
-        if mov:
-            mov.cliente_id = pedido.cliente_id
-            mov.monto = pedido.total
-        else:
-            mov = MovimientoCtaCte(
-                cliente_id=pedido.cliente_id,
-                tipo=TipoMovimiento.debito,
-                monto=pedido.total,
-                descripcion=f"Pedido #{pedido.id}",
-            )
-            db.add(mov)
-    else:
-        if mov:
-            db.delete(mov)
-
-    db.commit()
+    await db.commit()
+    avisar_tablero("actualizado", pedido.id, antes, _columna_tablero(pedido))
 
     return RedirectResponse("/pedidos", status_code=303)
 
 
-
-@app.post("/pedidos/{pedido_id}/marcar-entregado")
-def marcar_pedido_entregado(
-    pedido_id: int,
-    db: Session = Depends(get_db),
-):
-    pedido = db.get(Pedido, pedido_id)
-    if pedido:
-        pedido.estado = EstadoPedido.entregado
-        pedido.fecha_entrega = datetime.utcnow()
-        db.commit()
-
-    return RedirectResponse("/pedidos/tablero", status_code=303)
-
-
 # =========================
 # USUARIOS (ADMIN)
 # =========================
@@ -1116,26 +1278,6 @@ def actualizar_usuario(
 
     return RedirectResponse("/usuarios", status_code=303)
 
-@app.post("/clientes/{cliente_id}/registrar-pago")
-def registrar_pago(
-    cliente_id: int,
-    monto: float = Form(...),
-    descripcion: str = Form("Pago"),
-    db: Session = Depends(get_db),
-):
-    pago = MovimientoCtaCte(
-        cliente_id=cliente_id,
-        tipo=TipoMovimiento.credito,
-        monto=monto,
-        descripcion=descripcion,
-    )
-    db.add(pago)
-    db.commit()
-    return RedirectResponse(
-        f"/clientes/{cliente_id}/cta-cte",
-        status_code=303,
-    )
-
 
 # =========================
 # REPORTES
@@ -1146,7 +1288,7 @@ def reportes(
     request: Request,
     desde: str = "",
     hasta: str = "",
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_read_db),
 ):
     if not is_logged_in(request):
         return RedirectResponse("/login", status_code=303)
@@ -1170,141 +1312,10 @@ def reportes(
         except ValueError:
             hasta_date = hoy
 
-    # Para comparar con DateTime
-    inicio = datetime.combine(desde_date, datetime.min.time())
-    fin = datetime.combine(hasta_date + timedelta(days=1), datetime.min.time())
-
-    # Traigo pedidos con items y cliente
-    pedidos = (
-        db.query(Pedido)
-        .options(
-            joinedload(Pedido.items).joinedload(PedidoItem.producto),
-            joinedload(Pedido.cliente),
-        )
-        .filter(Pedido.fecha_pedido >= inicio,
-                Pedido.fecha_pedido < fin)
-        .all()
-    )
+    import exportacion  # import diferido: solo lo usan reportes
 
-    # Acumuladores globales
-    total_ventas = 0.0
-    total_descuentos = 0.0
-    total_ganancia = 0.0
-
-    # Detalle por día: {fecha: {pedidos, ventas, descuentos, ganancia}}
-    detalle_dias: dict[date, dict] = {}
-
-    # Ranking clientes: {cliente_id: {nombre, ventas, ganancia, pedidos}}
-    ranking_clientes: dict[int, dict] = {}
-
-    # Ranking productos: {producto_id: {nombre, unidades, ventas, ganancia}}
-    ranking_productos: dict[int, dict] = {}
-
-    for p in pedidos:
-        # Subtotal del pedido y costo
-        subtotal = 0.0
-        costo_total = 0.0
-
-        for item in p.items:
-            # Por las dudas, recalculo subtotal si está en None
-            item_sub = item.subtotal or (item.precio_venta_unitario * item.cantidad)
-            subtotal += item_sub
-            costo_total += (item.costo_unitario or 0) * item.cantidad
-
-        # Descuento en porcentaje guardado en el pedido
-        desc_pct = p.descuento or 0.0
-        desc_monto = subtotal * (desc_pct / 100.0)
-        venta_neta = subtotal - desc_monto
-        ganancia = venta_neta - costo_total
-
-        total_ventas += venta_neta
-        total_descuentos += desc_monto
-        total_ganancia += ganancia
-
-        # ---------------- DETALLE POR DÍA ----------------
-        f = p.fecha_pedido.date()
-        if f not in detalle_dias:
-            detalle_dias[f] = {
-                "pedidos": 0,
-                "ventas": 0.0,
-                "descuentos": 0.0,
-                "ganancia": 0.0,
-            }
-        detalle_dias[f]["pedidos"] += 1
-        detalle_dias[f]["ventas"] += venta_neta
-        detalle_dias[f]["descuentos"] += desc_monto
-        detalle_dias[f]["ganancia"] += ganancia
-
-        # ---------------- RANKING CLIENTES ----------------
-        if p.cliente:
-            cid = p.cliente.id
-            if cid not in ranking_clientes:
-                ranking_clientes[cid] = {
-                    "nombre": p.cliente.nombre,
-                    "ventas": 0.0,
-                    "ganancia": 0.0,
-                    "pedidos": 0,
-                }
-            ranking_clientes[cid]["ventas"] += venta_neta
-            ranking_clientes[cid]["ganancia"] += ganancia
-            ranking_clientes[cid]["pedidos"] += 1
-
-        # ---------------- RANKING PRODUCTOS ----------------
-        # Reparto el descuento del pedido proporcional a cada item
-        for item in p.items:
-            item_sub = item.subtotal or (item.precio_venta_unitario * item.cantidad)
-            if subtotal > 0:
-                item_desc = desc_monto * (item_sub / subtotal)
-            else:
-                item_desc = 0.0
-
-            item_venta_neta = item_sub - item_desc
-            item_ganancia = item_venta_neta - (item.costo_unitario or 0) * item.cantidad
-
-            if item.producto:
-                pid = item.producto.id
-                if pid not in ranking_productos:
-                    ranking_productos[pid] = {
-                        "nombre": item.producto.nombre,
-                        "unidades": 0,
-                        "ventas": 0.0,
-                        "ganancia": 0.0,
-                    }
-                ranking_productos[pid]["unidades"] += item.cantidad
-                ranking_productos[pid]["ventas"] += item_venta_neta
-                ranking_productos[pid]["ganancia"] += item_ganancia
-
-    # Rentabilidad global
-    rentabilidad_pct = (total_ganancia / total_ventas * 100.0) if total_ventas > 0 else 0.0
-
-    # Transformo detalle_dias en lista ordenada por fecha descendente
-    detalle_dias_lista = []
-    for f, datos in detalle_dias.items():
-        ventas_dia = datos["ventas"]
-        ganancia_dia = datos["ganancia"]
-        rentab_dia = (ganancia_dia / ventas_dia * 100.0) if ventas_dia > 0 else 0.0
-        detalle_dias_lista.append({
-            "fecha": f,
-            "pedidos": datos["pedidos"],
-            "ventas": ventas_dia,
-            "descuentos": datos["descuentos"],
-            "ganancia": ganancia_dia,
-            "rentabilidad": rentab_dia,
-        })
-    detalle_dias_lista.sort(key=lambda x: x["fecha"], reverse=True)
-
-    # Top 5 clientes y productos
-    top_clientes = sorted(
-        ranking_clientes.values(),
-        key=lambda x: x["ventas"],
-        reverse=True
-    )[:5]
-
-    top_productos = sorted(
-        ranking_productos.values(),
-        key=lambda x: x["ventas"],
-        reverse=True
-    )[:5]
+    # Totales, detalle por día y rankings salen del resumen diario de ventas
+    resumen = ventas_diarias.resumen_periodo(db, desde_date, hasta_date)
 
     return templates.TemplateResponse(
         "reportes/dashboard.html",
@@ -1312,13 +1323,14 @@ def reportes(
             "request": request,
             "desde": desde_date.strftime("%Y-%m-%d"),
             "hasta": hasta_date.strftime("%Y-%m-%d"),
-            "total_ventas": total_ventas,
-            "total_descuentos": total_descuentos,
-            "total_ganancia": total_ganancia,
-            "rentabilidad_pct": rentabilidad_pct,
-            "detalle_dias": detalle_dias_lista,
-            "top_clientes": top_clientes,
-            "top_productos": top_productos,
+            "total_ventas": resumen["total_ventas"],
+            "total_descuentos": resumen["total_descuentos"],
+            "total_ganancia": resumen["total_ganancia"],
+            "rentabilidad_pct": resumen["rentabilidad_pct"],
+            "detalle_dias": resumen["detalle_dias"],
+            "top_clientes": resumen["top_clientes"],
+            "top_productos": resumen["top_productos"],
+            "formatos_exportacion": exportacion.FORMATOS,
             "active_page": "reportes",
         },
     )
@@ -1329,8 +1341,11 @@ def exportar_reportes(
     request: Request,
     desde: str = "",
     hasta: str = "",
-    db: Session = Depends(get_db),
+    formato: str = "dias",
 ):
+    if not is_logged_in(request):
+        return RedirectResponse("/login", status_code=303)
+
     hoy = date.today()
 
     if not desde:
@@ -1349,76 +1364,18 @@ def exportar_reportes(
         except ValueError:
             hasta_date = hoy
 
-    inicio = datetime.combine(desde_date, datetime.min.time())
-    fin = datetime.combine(hasta_date + timedelta(days=1), datetime.min.time())
+    import exportacion
 
-    pedidos = (
-        db.query(Pedido)
-        .options(joinedload(Pedido.items))
-        .filter(Pedido.fecha_pedido >= inicio,
-                Pedido.fecha_pedido < fin)
-        .all()
+    if formato not in exportacion.FORMATOS:
+        formato = "dias"
+
+    filename = (
+        f"reportes_{formato}_{desde_date.strftime('%Y%m%d')}_{hasta_date.strftime('%Y%m%d')}.csv"
     )
 
-    # Armo detalle por día igual que en el dashboard
-    detalle_dias = {}
-
-    for p in pedidos:
-        subtotal = 0.0
-        costo_total = 0.0
-        for item in p.items:
-            item_sub = item.subtotal or (item.precio_venta_unitario * item.cantidad)
-            subtotal += item_sub
-            costo_total += (item.costo_unitario or 0) * item.cantidad
-
-        desc_pct = p.descuento or 0.0
-        desc_monto = subtotal * (desc_pct / 100.0)
-        venta_neta = subtotal - desc_monto
-        ganancia = venta_neta - costo_total
-
-        f = p.fecha_pedido.date()
-        if f not in detalle_dias:
-            detalle_dias[f] = {
-                "pedidos": 0,
-                "ventas": 0.0,
-                "descuentos": 0.0,
-                "ganancia": 0.0,
-            }
-        detalle_dias[f]["pedidos"] += 1
-        detalle_dias[f]["ventas"] += venta_neta
-        detalle_dias[f]["descuentos"] += desc_monto
-        detalle_dias[f]["ganancia"] += ganancia
-
-    filas = []
-    for f, datos in detalle_dias.items():
-        ventas = datos["ventas"]
-        gan = datos["ganancia"]
-        rent = (gan / ventas * 100.0) if ventas > 0 else 0.0
-        filas.append([
-            f.strftime("%d/%m/%Y"),
-            datos["pedidos"],
-            f"{ventas:.2f}",
-            f"{datos['descuentos']:.2f}",
-            f"{gan:.2f}",
-            f"{rent:.2f}",
-        ])
-
-    filas.sort(key=lambda r: datetime.strptime(r[0], "%d/%m/%Y"), reverse=True)
-
-    # Genero CSV en memoria
-    output = io.StringIO()
-    writer = csv.writer(output, delimiter=';')
-    writer.writerow(["Fecha", "Pedidos", "Ventas", "Descuentos", "Ganancia", "Rentabilidad %"])
-    for row in filas:
-        writer.writerow(row)
-
-    output.seek(0)
-
-    filename = f"reportes_{desde_date.strftime('%Y%m%d')}_{hasta_date.strftime('%Y%m%d')}.csv"
-
-    from fastapi.responses import StreamingResponse
+    # El CSV se genera a medida que se envía (ver exportacion.py)
     return StreamingResponse(
-        output,
+        exportacion.generar_csv(formato, desde_date, hasta_date),
         media_type="text/csv",
         headers={"Content-Disposition": f"attachment; filename={filename}"}
     )
@@ -1429,27 +1386,83 @@ from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from fastapi import Depends
 
-# Debug: ver qué base está usando Render realmente
-@app.get("/debug-db")
-def debug_db(db: Session = Depends(get_db)):
-    url = str(db.bind.url)
-
-    result = {}
-    for model, name in [
-        (Usuario, "usuarios"),
-        (Producto, "productos"),
-        (Pedido, "pedidos"),
-    ]:
-        try:
-            count = db.query(model).count()
-        except Exception as e:
-            count = f"error: {e!r}"
-        result[name] = count
 
-    return JSONResponse(
+# =========================
+# ADMIN: DIAGNÓSTICO
+# =========================
+@app.get("/admin/pool")
+def admin_pool(request: Request):
+    """Estado del pool de conexiones y tiempos de espera/checkout (JSON)."""
+    if not require_admin(request):
+        return JSONResponse({"error": "solo administradores"}, status_code=403)
+    return JSONResponse(estadisticas_pool())
+
+
+@app.get("/admin/plantillas")
+def admin_plantillas(request: Request):
+    """Tiempo de render por plantilla, de la más lenta a la más rápida (JSON)."""
+    if not require_admin(request):
+        return JSONResponse({"error": "solo administradores"}, status_code=403)
+    return JSONResponse(plantillas.resumen_render())
+
+
+@app.get("/admin/rendimiento", response_class=HTMLResponse)
+def admin_rendimiento(request: Request):
+    """Rutas que más tiempo pasan en la base y últimas consultas lentas."""
+    if not require_admin(request):
+        return RedirectResponse("/", status_code=303)
+
+    return templates.TemplateResponse(
+        "admin/rendimiento.html",
         {
-            "db_url": url,
-            "tablas": result
+            "request": request,
+            "rutas": instrumentacion.resumen_rutas(),
+            "lentas": instrumentacion.consultas_lentas(),
+            "ventana_min": instrumentacion.RESUMEN_VENTANA_SEG // 60,
+            "umbral_ms": instrumentacion.SQL_LENTA_MS,
+            "active_page": "rendimiento",
         }
     )
 
+
+@app.get("/admin/perfiles", response_class=HTMLResponse)
+def admin_perfiles(request: Request):
+    """Últimas capturas del perfilador."""
+    if not require_admin(request):
+        return RedirectResponse("/", status_code=303)
+
+    return templates.TemplateResponse(
+        "admin/perfiles.html",
+        {
+            "request": request,
+            "capturas": perfiles.capturas(),
+            "activo": perfiles.ACTIVO,
+            "muestreo": perfiles.MUESTREO,
+            "max_capturas": perfiles.MAX_CAPTURAS,
+            "active_page": "rendimiento",
+        }
+    )
+
+
+@app.get("/admin/perfiles/{nombre}/{formato}")
+def admin_perfil_archivo(nombre: str, formato: str, request: Request):
+    """Descarga de una captura: formato 'collapsed' o 'speedscope'."""
+    if not require_admin(request):
+        return RedirectResponse("/", status_code=303)
+
+    encontrado = perfiles.archivo(nombre, formato)
+    if encontrado is None:
+        return PlainTextResponse("Captura no encontrada", status_code=404)
+    ruta, media_type = encontrado
+    return FileResponse(ruta, media_type=media_type, filename=os.path.basename(ruta))
+
+
+@app.get("/metrics")
+def metrics(request: Request):
+    """Métricas en formato Prometheus: sesión de admin o token del scraper (ver exposicion.py)."""
+    if not (require_admin(request) or exposicion.token_valido(request.headers.get("authorization"))):
+        return PlainTextResponse("solo administradores\n", status_code=403)
+    return PlainTextResponse(exposicion.generar(), media_type=exposicion.CONTENT_TYPE)
+
+
+arranque.fin_import()
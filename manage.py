@@ -0,0 +1,218 @@
+# manage.py
+"""
+Comandos de mantenimiento.
+
+Uso:
+    python manage.py init-db
+    python manage.py migrar
+    python manage.py verificar-saldos [--reparar]
+    python manage.py reconstruir-ventas
+    python manage.py verificar-ventas --desde 2025-01-01 --hasta 2025-12-31 [--contra sql]
+    python manage.py explicar [--detalle]
+    python manage.py assets [--actualizar] [--sin-descarga] [--parcial]
+    python manage.py datos-prueba [--escala 10] [--semilla 2025] [--hasta 2025-12-31]
+
+Benchmark de rutas: python benchmark.py --help
+"""
+import argparse
+import sys
+from datetime import date, datetime, timedelta
+
+import arranque
+from database import SessionLocal
+
+
+def _fecha(valor: str) -> date:
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+def cmd_init_db(args) -> int:
+    # Esquema y migraciones ya se aplicaron en main() antes del comando
+    arranque.ensure_admin_user()
+    print("Base inicializada (esquema, migraciones y usuario admin).")
+    return 0
+
+
+def cmd_migrar(args) -> int:
+    # Las migraciones pendientes ya se aplicaron en main() antes del comando
+    print("Esquema al día.")
+    return 0
+
+
+def cmd_verificar_saldos(args) -> int:
+    import cta_cte
+
+    db = SessionLocal()
+    try:
+        diferencias = cta_cte.verificar_saldos(db, reparar=args.reparar)
+        if args.reparar:
+            db.commit()
+    finally:
+        db.close()
+
+    if not diferencias:
+        print("Los saldos guardados coinciden con los movimientos.")
+        return 0
+
+    print(f"{len(diferencias)} clientes con saldo distinto al de sus movimientos:")
+    for d in diferencias:
+        print(f"  - #{d['cliente_id']} {d['nombre']}: guardado={d['guardado']:.2f} "
+              f"esperado={d['esperado']:.2f}")
+    if args.reparar:
+        print("Saldos corregidos.")
+        return 0
+    return 1
+
+
+def cmd_reconstruir_ventas(args) -> int:
+    import ventas_diarias
+
+    db = SessionLocal()
+    try:
+        n = ventas_diarias.reconstruir(db)
+    finally:
+        db.close()
+    print(f"Resumen de ventas reconstruido a partir de {n} pedidos.")
+    return 0
+
+
+def cmd_verificar_ventas(args) -> int:
+    import ventas_diarias
+
+    db = SessionLocal()
+    try:
+        diferencias = ventas_diarias.verificar(db, args.desde, args.hasta, args.contra)
+    finally:
+        db.close()
+
+    if diferencias:
+        print(f"El resumen NO coincide ({len(diferencias)} diferencias):")
+        for d in diferencias:
+            print(f"  - {d}")
+        return 1
+
+    print(f"El resumen coincide entre {args.desde} y {args.hasta}.")
+    return 0
+
+
+def cmd_explicar(args) -> int:
+    import explicar
+
+    db = SessionLocal()
+    try:
+        resultados = explicar.explicar(db)
+    finally:
+        db.close()
+
+    fallas = 0
+    for r in resultados:
+        estado = "FALLA" if r["problemas"] else "ok"
+        print(f"[{estado}] {r['nombre']}")
+        for paso in (r["plan"] if args.detalle or r["problemas"] else []):
+            print(f"    {paso}")
+        fallas += bool(r["problemas"])
+
+    if fallas:
+        print(f"{fallas} consultas recorren tablas completas.")
+        return 1
+    print("Todas las consultas usan índices.")
+    return 0
+
+
+def cmd_assets(args) -> int:
+    import activos
+
+    faltan = []
+    if activos.brotli is None:
+        faltan.append("`brotli` (variantes .br)")
+    if activos.Image is None:
+        faltan.append("Pillow (variantes WebP del logo)")
+    if faltan and not args.parcial:
+        # Un build sin variantes se sirve igual, pero más pesado: que no pase callado
+        print("Falta " + " y ".join(faltan) + ": pip install -r requirements.txt, "
+              "o --parcial para armar sin esas variantes.", file=sys.stderr)
+        return 1
+
+    if not args.sin_descarga:
+        try:
+            for nombre in activos.vendorizar(actualizar=args.actualizar):
+                print(f"Bajado: static/{nombre}")
+        except OSError as e:
+            # Sin red se arma igual; lo que no esté vendorizado sale del CDN
+            print(f"No se pudo vendorizar ({e}); se sigue con lo que hay en static/.")
+
+    resumen = activos.construir()
+    print(f"{resumen['archivos']} archivos en static/dist/ ({resumen['bytes'] / 1024:.0f} KB), "
+          f"{resumen['comprimidos']} variantes comprimidas, {resumen['webp']} WebP.")
+    for falta in faltan:
+        print(f"ATENCIÓN: build parcial, sin {falta}.", file=sys.stderr)
+    return 0
+
+
+def cmd_datos_prueba(args) -> int:
+    import datos_prueba
+
+    db = SessionLocal()
+    try:
+        cantidades = datos_prueba.generar(db, args.escala, args.semilla, args.hasta)
+    except ValueError as e:
+        print(f"No se generaron datos: {e}")
+        return 1
+    finally:
+        db.close()
+    print("Datos generados: " + ", ".join(f"{k}={v}" for k, v in cantidades.items()))
+    return 0
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Sabor de Autor - mantenimiento")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("init-db", help="Crea tablas, aplica migraciones y el usuario admin")
+    p.set_defaults(func=cmd_init_db)
+
+    p = sub.add_parser("migrar", help="Aplica las migraciones pendientes")
+    p.set_defaults(func=cmd_migrar)
+
+    p = sub.add_parser("verificar-saldos", help="Compara clientes.saldo con los movimientos")
+    p.add_argument("--reparar", action="store_true", help="Corrige los saldos distintos")
+    p.set_defaults(func=cmd_verificar_saldos)
+
+    p = sub.add_parser("reconstruir-ventas", help="Regenera el resumen diario de ventas")
+    p.set_defaults(func=cmd_reconstruir_ventas)
+
+    hoy = date.today()
+    p = sub.add_parser("verificar-ventas", help="Compara el resumen contra los pedidos")
+    p.add_argument("--desde", type=_fecha, default=hoy - timedelta(days=365))
+    p.add_argument("--hasta", type=_fecha, default=hoy)
+    p.add_argument("--contra", choices=["python", "sql"], default="python",
+                   help="Cálculo de referencia: recorrido en Python o agregados SQL")
+    p.set_defaults(func=cmd_verificar_ventas)
+
+    p = sub.add_parser("explicar", help="EXPLAIN de las consultas de las rutas más usadas")
+    p.add_argument("--detalle", action="store_true", help="Muestra el plan de todas")
+    p.set_defaults(func=cmd_explicar)
+
+    p = sub.add_parser("assets", help="Vendoriza, pone huellas y precomprime static/")
+    p.add_argument("--actualizar", action="store_true", help="Vuelve a bajar lo vendorizado")
+    p.add_argument("--sin-descarga", action="store_true", help="Solo el build, sin bajar nada")
+    p.add_argument("--parcial", action="store_true", help="Arma igual si falta brotli o Pillow")
+    p.set_defaults(func=cmd_assets, sin_base=True)
+
+    p = sub.add_parser("datos-prueba", help="Llena la base con datos de prueba determinísticos")
+    p.add_argument("--escala", type=float, default=1, help="Volumen respecto de producción (1, 10, 100)")
+    p.add_argument("--semilla", type=int, default=2025)
+    p.add_argument("--hasta", type=_fecha, default=None, help="Último día de datos (defecto: hoy)")
+    p.set_defaults(func=cmd_datos_prueba)
+
+    args = parser.parse_args(argv)
+
+    if getattr(args, "sin_base", False):
+        return args.func(args)
+    for nombre in arranque.preparar_esquema():
+        print(f"Migración aplicada: {nombre}")
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
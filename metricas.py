@@ -0,0 +1,94 @@
+# metricas.py
+"""
+Métricas en memoria del proceso: histogramas de duraciones con buckets
+fijos y contadores de aciertos de cache, seguros para usar desde varios
+hilos.
+
+Los percentiles se estiman con el límite superior del bucket donde caen,
+que alcanza para dimensionar (pool, tiempos de respuesta) sin guardar cada
+muestra.
+"""
+import threading
+
+# Límites superiores de los buckets, en segundos
+LIMITES_SEG = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, float("inf"),
+)
+
+
+class Histograma:
+    def __init__(self, limites=LIMITES_SEG):
+        self.limites = tuple(limites)
+        self._lock = threading.Lock()
+        self.reiniciar()
+
+    def reiniciar(self):
+        with self._lock:
+            self.cuentas = [0] * len(self.limites)
+            self.cantidad = 0
+            self.suma = 0.0
+            self.maximo = 0.0
+
+    def observar(self, valor: float):
+        with self._lock:
+            for i, limite in enumerate(self.limites):
+                if valor <= limite:
+                    self.cuentas[i] += 1
+                    break
+            self.cantidad += 1
+            self.suma += valor
+            if valor > self.maximo:
+                self.maximo = valor
+
+    def percentil(self, p: float) -> float:
+        """Límite superior del bucket que contiene el percentil p (0-100)."""
+        with self._lock:
+            if not self.cantidad:
+                return 0.0
+            objetivo = self.cantidad * p / 100.0
+            acumulado = 0
+            for limite, cuenta in zip(self.limites, self.cuentas):
+                acumulado += cuenta
+                if acumulado >= objetivo:
+                    return self.maximo if limite == float("inf") else min(limite, self.maximo)
+            return self.maximo
+
+    def acumulados(self) -> list[tuple[float, int]]:
+        """[(límite, cantidad <= límite)], como los buckets de Prometheus."""
+        with self._lock:
+            salida, acumulado = [], 0
+            for limite, cuenta in zip(self.limites, self.cuentas):
+                acumulado += cuenta
+                salida.append((limite, acumulado))
+            return salida
+
+    def resumen(self) -> dict:
+        return {
+            "cantidad": self.cantidad,
+            "promedio_ms": round(self.suma / self.cantidad * 1000, 3) if self.cantidad else 0.0,
+            "p50_ms": round(self.percentil(50) * 1000, 3),
+            "p95_ms": round(self.percentil(95) * 1000, 3),
+            "p99_ms": round(self.percentil(99) * 1000, 3),
+            "max_ms": round(self.maximo * 1000, 3),
+        }
+
+
+class Aciertos:
+    """Aciertos y fallos de un cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+
+    def anotar(self, acierto: bool):
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def proporcion(self) -> float:
+        total = self.aciertos + self.fallos
+        return self.aciertos / total if total else 0.0
@@ -0,0 +1,275 @@
+# migraciones.py
+"""
+Migraciones de esquema y datos, numeradas y aplicadas una sola vez.
+
+Base.metadata.create_all crea las tablas nuevas, pero no agrega columnas a
+tablas existentes ni llena datos derivados. Eso se hace acá: cada migración
+se registra con @migracion(version, nombre), corre en su propia transacción
+y queda anotada en la tabla schema_migraciones.
+
+Las que crean índices sobre tablas grandes se declaran con
+transaccional=False y usan crear_indice(): en PostgreSQL el índice se arma
+CONCURRENTLY (sin bloquear escrituras), lo que no se puede hacer dentro de
+una transacción.
+"""
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, text
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+
+_metadata = MetaData()
+
+schema_migraciones = Table(
+    "schema_migraciones",
+    _metadata,
+    Column("version", Integer, primary_key=True),
+    Column("nombre", String(100), nullable=False),
+    Column("aplicada_en", DateTime, nullable=False),
+)
+
+# version -> (nombre, función que recibe la Connection, transaccional)
+MIGRACIONES: dict[int, tuple] = {}
+
+
+def migracion(version: int, nombre: str, transaccional: bool = True):
+    def registrar(funcion):
+        if version in MIGRACIONES:
+            raise ValueError(f"Migración {version} duplicada")
+        MIGRACIONES[version] = (nombre, funcion, transaccional)
+        return funcion
+    return registrar
+
+
+def tiene_columna(conn: Connection, tabla: str, columna: str) -> bool:
+    return any(c["name"] == columna for c in inspect(conn).get_columns(tabla))
+
+
+def agregar_columna(conn: Connection, tabla: str, columna: str, definicion: str):
+    """ALTER TABLE ... ADD COLUMN solo si la columna no existe (create_all ya pudo crearla)."""
+    if not tiene_columna(conn, tabla, columna):
+        conn.execute(text(f"ALTER TABLE {tabla} ADD COLUMN {columna} {definicion}"))
+
+
+def crear_indice(conn: Connection, nombre: str, tabla: str, columnas: str, metodo: str | None = None):
+    """
+    CREATE INDEX si no existe. En PostgreSQL usa CONCURRENTLY (la migración
+    tiene que ser transaccional=False); si un intento anterior falló a mitad
+    de camino el índice queda inválido, así que se borra y se vuelve a crear.
+    `metodo` (p. ej. "gin") solo se usa en PostgreSQL.
+    """
+    if conn.dialect.name == "postgresql":
+        invalido = conn.execute(text(
+            "SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid "
+            "WHERE c.relname = :nombre AND NOT i.indisvalid"
+        ), {"nombre": nombre}).first()
+        if invalido:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {nombre}"))
+        usando = f" USING {metodo}" if metodo else ""
+        conn.execute(text(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {nombre} ON {tabla}{usando} ({columnas})"))
+    else:
+        conn.execute(text(f"CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} ({columnas})"))
+
+
+def versiones_aplicadas(conn: Connection) -> set[int]:
+    return set(conn.execute(schema_migraciones.select().with_only_columns(
+        schema_migraciones.c.version
+    )).scalars())
+
+
+def aplicar_migraciones(engine: Engine) -> list[str]:
+    """Aplica las migraciones pendientes en orden. Devuelve sus nombres."""
+    _metadata.create_all(bind=engine)
+
+    with engine.connect() as conn:
+        aplicadas = versiones_aplicadas(conn)
+
+    hechas = []
+    for version in sorted(MIGRACIONES):
+        if version in aplicadas:
+            continue
+        nombre, funcion, transaccional = MIGRACIONES[version]
+        if transaccional:
+            with engine.begin() as conn:
+                funcion(conn)
+                conn.execute(schema_migraciones.insert().values(
+                    version=version, nombre=nombre, aplicada_en=datetime.utcnow()
+                ))
+        else:
+            # Cada sentencia se confirma sola; la migración tiene que poder
+            # repetirse si se corta a mitad de camino (IF NOT EXISTS).
+            with engine.connect() as conn:
+                funcion(conn.execution_options(isolation_level="AUTOCOMMIT"))
+            with engine.begin() as conn:
+                conn.execute(schema_migraciones.insert().values(
+                    version=version, nombre=nombre, aplicada_en=datetime.utcnow()
+                ))
+        hechas.append(f"{version:03d}_{nombre}")
+    return hechas
+
+
+# =========================
+# MIGRACIONES
+# =========================
+
+@migracion(1, "resumen_ventas")
+def _m001_resumen_ventas(conn: Connection):
+    """Llena el resumen diario de ventas con los pedidos existentes."""
+    import consultas_ventas
+    from models import VentaDiaria, VentaDiariaCliente, VentaDiariaProducto
+
+    db = Session(bind=conn)
+    for modelo in (VentaDiariaProducto, VentaDiariaCliente, VentaDiaria):
+        db.execute(modelo.__table__.delete())
+    consultas_ventas.insertar_resumen(db)
+    db.close()
+
+
+@migracion(2, "saldo_clientes")
+def _m002_saldo_clientes(conn: Connection):
+    """Agrega clientes.saldo y lo calcula a partir de los movimientos."""
+    import cta_cte
+
+    agregar_columna(conn, "clientes", "saldo", "FLOAT NOT NULL DEFAULT 0")
+    db = Session(bind=conn)
+    cta_cte.verificar_saldos(db, reparar=True)
+    db.close()
+
+
+@migracion(3, "busqueda_clientes")
+def _m003_busqueda_clientes(conn: Connection):
+    """
+    Columnas normalizadas de clientes y su índice de búsqueda: FTS5 trigram
+    en SQLite, pg_trgm en PostgreSQL (ver busqueda.py). Los índices GIN de
+    PostgreSQL se arman aparte, sin bloquear escrituras (migración 7).
+    """
+    from normalizacion import normalizar_telefono, normalizar_texto
+
+    agregar_columna(conn, "clientes", "nombre_norm", "VARCHAR")
+    agregar_columna(conn, "clientes", "telefono_norm", "VARCHAR")
+
+    filas = conn.execute(text("SELECT id, nombre, telefono FROM clientes")).all()
+    if filas:
+        conn.execute(
+            text("UPDATE clientes SET nombre_norm = :n, telefono_norm = :t WHERE id = :id"),
+            [
+                {"id": f.id, "n": normalizar_texto(f.nombre), "t": normalizar_telefono(f.telefono)}
+                for f in filas
+            ],
+        )
+
+    dialecto = conn.dialect.name
+
+    if dialecto == "sqlite":
+        # El tokenizer trigram existe desde SQLite 3.34; si no está, la
+        # búsqueda usa LIKE sobre las columnas normalizadas.
+        try:
+            conn.execute(text("SAVEPOINT fts"))
+            conn.execute(text(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS clientes_fts USING fts5("
+                "nombre_norm, telefono_norm, "
+                "content='clientes', content_rowid='id', tokenize='trigram')"
+            ))
+            conn.execute(text("RELEASE SAVEPOINT fts"))
+        except Exception:
+            conn.execute(text("ROLLBACK TO SAVEPOINT fts"))
+            return
+
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS clientes_fts_ai AFTER INSERT ON clientes BEGIN
+                INSERT INTO clientes_fts(rowid, nombre_norm, telefono_norm)
+                VALUES (new.id, new.nombre_norm, new.telefono_norm);
+            END
+        """))
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS clientes_fts_ad AFTER DELETE ON clientes BEGIN
+                INSERT INTO clientes_fts(clientes_fts, rowid, nombre_norm, telefono_norm)
+                VALUES ('delete', old.id, old.nombre_norm, old.telefono_norm);
+            END
+        """))
+        # Solo cuando cambian las columnas indexadas (no en cada cambio de saldo)
+        conn.execute(text("""
+            CREATE TRIGGER IF NOT EXISTS clientes_fts_au
+            AFTER UPDATE OF nombre_norm, telefono_norm ON clientes BEGIN
+                INSERT INTO clientes_fts(clientes_fts, rowid, nombre_norm, telefono_norm)
+                VALUES ('delete', old.id, old.nombre_norm, old.telefono_norm);
+                INSERT INTO clientes_fts(rowid, nombre_norm, telefono_norm)
+                VALUES (new.id, new.nombre_norm, new.telefono_norm);
+            END
+        """))
+        conn.execute(text("INSERT INTO clientes_fts(clientes_fts) VALUES ('rebuild')"))
+
+    elif dialecto == "postgresql":
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+
+
+@migracion(4, "movimientos_pedido_id")
+def _m004_movimientos_pedido_id(conn: Connection):
+    """
+    Agrega movimientos_cta_cte.pedido_id y lo completa en los débitos
+    existentes a partir de la descripción "Pedido #N" (el índice, en la 5).
+    """
+    import re
+
+    agregar_columna(conn, "movimientos_cta_cte", "pedido_id", "INTEGER REFERENCES pedidos(id)")
+
+    patron = re.compile(r"^Pedido #(\d+)$")
+    pedidos = set(conn.execute(text("SELECT id FROM pedidos")).scalars())
+    cambios = []
+    for mov_id, descripcion in conn.execute(text(
+        "SELECT id, descripcion FROM movimientos_cta_cte "
+        "WHERE tipo = 'debito' AND pedido_id IS NULL AND descripcion LIKE 'Pedido #%'"
+    )):
+        m = patron.match(descripcion.strip())
+        if m and int(m.group(1)) in pedidos:
+            cambios.append({"id": mov_id, "pedido_id": int(m.group(1))})
+
+    if cambios:
+        conn.execute(
+            text("UPDATE movimientos_cta_cte SET pedido_id = :pedido_id WHERE id = :id"),
+            cambios,
+        )
+
+
+@migracion(5, "indices_tablero_movimientos", transaccional=False)
+def _m005_indices_tablero_movimientos(conn: Connection):
+    """
+    Índice (estado, fecha_pedido) para las columnas del tablero de pedidos y
+    el de movimientos_cta_cte.pedido_id (débitos de un pedido).
+    """
+    crear_indice(conn, "ix_pedidos_estado_fecha_pedido", "pedidos", "estado, fecha_pedido")
+    crear_indice(conn, "ix_movimientos_cta_cte_pedido_id", "movimientos_cta_cte", "pedido_id")
+
+
+@migracion(6, "indices_rutas", transaccional=False)
+def _m006_indices_rutas(conn: Connection):
+    """
+    Índices compuestos para las consultas de las rutas más usadas (se
+    comprueban con `python manage.py explicar`).
+    """
+    # /pedidos: orden y cursor por (fecha_pedido, id)
+    crear_indice(conn, "ix_pedidos_fecha_pedido_id", "pedidos", "fecha_pedido, id")
+    # pedidos de un cliente
+    crear_indice(conn, "ix_pedidos_cliente_fecha", "pedidos", "cliente_id, fecha_pedido")
+    # ítems de un pedido (ver, editar, eliminar)
+    crear_indice(conn, "ix_pedido_items_pedido_id", "pedido_items", "pedido_id")
+    # libro de cuenta corriente por cliente, paginado por (fecha, id)
+    crear_indice(conn, "ix_movimientos_cta_cte_cliente_fecha", "movimientos_cta_cte",
+                 "cliente_id, fecha, id")
+    # listado de clientes por nombre
+    crear_indice(conn, "ix_clientes_nombre", "clientes", "nombre")
+
+
+@migracion(7, "indices_busqueda_clientes", transaccional=False)
+def _m007_indices_busqueda_clientes(conn: Connection):
+    """Índices GIN pg_trgm de la búsqueda de clientes (solo PostgreSQL; ver migración 3)."""
+    if conn.dialect.name != "postgresql":
+        return
+    crear_indice(conn, "ix_clientes_nombre_norm_trgm", "clientes", "nombre_norm gin_trgm_ops", metodo="gin")
+    crear_indice(conn, "ix_clientes_telefono_norm_trgm", "clientes", "telefono_norm gin_trgm_ops", metodo="gin")
+
+
+@migracion(8, "indice_tablero_entregados", transaccional=False)
+def _m008_indice_tablero_entregados(conn: Connection):
+    """Columna de entregados del tablero: orden y cursor por (fecha_entrega, id)."""
+    crear_indice(conn, "ix_pedidos_estado_fecha_entrega_id", "pedidos", "estado, fecha_entrega, id")
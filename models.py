@@ -7,13 +7,16 @@ from sqlalchemy import (
     String,
     Float,
     Boolean,
+    Date,
     DateTime,
     ForeignKey,
     Enum,
+    Index,
 )
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 
 from database import Base
+from normalizacion import normalizar_telefono, normalizar_texto
 
 
 # =============================
@@ -38,7 +41,7 @@ class Cliente(Base):
     __tablename__ = "clientes"
 
     id = Column(Integer, primary_key=True, index=True)
-    nombre = Column(String, nullable=False)
+    nombre = Column(String, nullable=False, index=True)   # listado ordenado por nombre
     telefono = Column(String)
     email = Column(String)
     direccion = Column(String)
@@ -46,19 +49,27 @@ class Cliente(Base):
     notas = Column(String)
     creado_en = Column(DateTime, default=datetime.utcnow)
 
+    # Copias normalizadas para la búsqueda (ver busqueda.py). Se mantienen
+    # solas al asignar nombre/telefono.
+    nombre_norm = Column(String, index=True)
+    telefono_norm = Column(String, index=True)
+
+    # Saldo de cuenta corriente (débitos - créditos). Se actualiza en la misma
+    # transacción que cada movimiento; ver cta_cte.py.
+    saldo = Column(Float, nullable=False, default=0.0, server_default="0")
+
     movimientos = relationship("MovimientoCtaCte", back_populates="cliente")
     pedidos = relationship("Pedido", back_populates="cliente")
-    @property
-    def saldo(self) -> float:
-        """Saldo calculado en base a los movimientos de cuenta corriente."""
-        saldo = 0.0
-        for m in self.movimientos or []:
-            # Importante: TipoMovimiento se define más abajo en este mismo archivo
-            if m.tipo == TipoMovimiento.debito:
-                saldo += m.monto
-            else:
-                saldo -= m.monto
-        return saldo
+
+    @validates("nombre")
+    def _normalizar_nombre(self, key, valor):
+        self.nombre_norm = normalizar_texto(valor)
+        return valor
+
+    @validates("telefono")
+    def _normalizar_telefono(self, key, valor):
+        self.telefono_norm = normalizar_telefono(valor)
+        return valor
 
 
 # =============================
@@ -89,6 +100,10 @@ class TipoMovimiento(PyEnum):
 
 class MovimientoCtaCte(Base):
     __tablename__ = "movimientos_cta_cte"
+    # Libro de cuenta corriente paginado por (fecha, id) de cada cliente
+    __table_args__ = (
+        Index("ix_movimientos_cta_cte_cliente_fecha", "cliente_id", "fecha", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"))
@@ -96,6 +111,8 @@ class MovimientoCtaCte(Base):
     monto = Column(Float, nullable=False)
     descripcion = Column(String, nullable=False)
     fecha = Column(DateTime, default=datetime.utcnow)
+    # Pedido que originó el débito (None para pagos y movimientos manuales)
+    pedido_id = Column(Integer, ForeignKey("pedidos.id"), index=True)
 
     cliente = relationship("Cliente", back_populates="movimientos")
 
@@ -110,6 +127,16 @@ class EstadoPedido(PyEnum):
 
 class Pedido(Base):
     __tablename__ = "pedidos"
+    __table_args__ = (
+        # Columnas del tablero: estado + rango de fecha_pedido
+        Index("ix_pedidos_estado_fecha_pedido", "estado", "fecha_pedido"),
+        # Listado /pedidos, paginado por (fecha_pedido, id)
+        Index("ix_pedidos_fecha_pedido_id", "fecha_pedido", "id"),
+        # Pedidos de un cliente (filtro por cliente, cuenta corriente)
+        Index("ix_pedidos_cliente_fecha", "cliente_id", "fecha_pedido"),
+        # Columna de entregados del tablero, paginada por (fecha_entrega, id)
+        Index("ix_pedidos_estado_fecha_entrega_id", "estado", "fecha_entrega", "id"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     cliente_id = Column(Integer, ForeignKey("clientes.id"), nullable=False)
@@ -137,7 +164,7 @@ class PedidoItem(Base):
     __tablename__ = "pedido_items"
 
     id = Column(Integer, primary_key=True, index=True)
-    pedido_id = Column(Integer, ForeignKey("pedidos.id"), nullable=False)
+    pedido_id = Column(Integer, ForeignKey("pedidos.id"), nullable=False, index=True)
     producto_id = Column(Integer, ForeignKey("productos.id"), nullable=False)
 
     descripcion_item = Column(String, nullable=False)
@@ -152,3 +179,55 @@ class PedidoItem(Base):
     @property
     def ganancia(self) -> float:
         return (self.precio_venta_unitario - self.costo_unitario) * self.cantidad
+
+
+# =============================
+# RESUMEN DE VENTAS (ROLLUP DIARIO)
+# =============================
+# Tablas mantenidas incrementalmente por los handlers de pedidos (ver
+# ventas_diarias.py). Los reportes leen de acá en lugar de recorrer pedidos.
+class VentaDiaria(Base):
+    __tablename__ = "ventas_diarias"
+
+    fecha = Column(Date, primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    subtotal = Column(Float, nullable=False, default=0.0)
+    descuentos = Column(Float, nullable=False, default=0.0)
+    ventas = Column(Float, nullable=False, default=0.0)
+    costo = Column(Float, nullable=False, default=0.0)
+    ganancia = Column(Float, nullable=False, default=0.0)
+
+
+class VentaDiariaProducto(Base):
+    __tablename__ = "ventas_diarias_producto"
+
+    fecha = Column(Date, primary_key=True)
+    producto_id = Column(Integer, ForeignKey("productos.id"), primary_key=True)
+    lineas = Column(Integer, nullable=False, default=0)
+    unidades = Column(Integer, nullable=False, default=0)
+    ventas = Column(Float, nullable=False, default=0.0)
+    ganancia = Column(Float, nullable=False, default=0.0)
+
+
+class VentaDiariaCliente(Base):
+    __tablename__ = "ventas_diarias_cliente"
+
+    fecha = Column(Date, primary_key=True)
+    cliente_id = Column(Integer, ForeignKey("clientes.id"), primary_key=True)
+    pedidos = Column(Integer, nullable=False, default=0)
+    ventas = Column(Float, nullable=False, default=0.0)
+    ganancia = Column(Float, nullable=False, default=0.0)
+
+
+# =============================
+# VERSIONES DE TABLAS
+# =============================
+# Un contador por tabla de referencia, incrementado en cada escritura (ver
+# versiones.py). Los caches en memoria lo comparan para saber si siguen
+# vigentes.
+class VersionTabla(Base):
+    __tablename__ = "versiones_tablas"
+
+    tabla = Column(String(50), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    actualizado_en = Column(DateTime, nullable=False, default=datetime.utcnow)
@@ -0,0 +1,26 @@
+# normalizacion.py
+"""
+Formas normalizadas de texto para búsquedas: minúsculas y sin acentos
+("Muñoz" -> "munoz"), y teléfonos solo con dígitos.
+"""
+import re
+import unicodedata
+
+_NO_DIGITOS = re.compile(r"\D+")
+_ESPACIOS = re.compile(r"\s+")
+
+
+def normalizar_texto(valor: str | None) -> str:
+    if not valor:
+        return ""
+    sin_marcas = "".join(
+        c for c in unicodedata.normalize("NFKD", valor)
+        if not unicodedata.combining(c)
+    )
+    return _ESPACIOS.sub(" ", sin_marcas.casefold()).strip()
+
+
+def normalizar_telefono(valor: str | None) -> str:
+    if not valor:
+        return ""
+    return _NO_DIGITOS.sub("", valor)
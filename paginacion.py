@@ -0,0 +1,102 @@
+# paginacion.py
+"""
+Paginación por clave (keyset) para listados largos.
+
+En lugar de OFFSET, cada página se pide "a partir de" la clave de la última
+fila mostrada, así el costo no depende de cuán atrás esté la página. Los
+cursores viajan en la URL como texto opaco (JSON en base64 url-safe).
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select, text
+
+POR_PAGINA_DEFECTO = 50
+POR_PAGINA_MAXIMO = 200
+
+
+def por_pagina_valido(valor: int | None) -> int:
+    if not valor or valor < 1:
+        return POR_PAGINA_DEFECTO
+    return min(valor, POR_PAGINA_MAXIMO)
+
+
+def codificar_cursor(*valores) -> str:
+    """Convierte los valores (datetime, int, float, str) en un cursor para la URL."""
+    datos = [v.isoformat() if isinstance(v, datetime) else v for v in valores]
+    crudo = json.dumps(datos, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(crudo).decode("ascii").rstrip("=")
+
+
+def decodificar_cursor(cursor: str | None, tipos: tuple) -> list | None:
+    """
+    Devuelve la lista de valores del cursor, o None si falta, está mal
+    formado o algún valor no es del tipo esperado (en ese caso se muestra la
+    primera página). `tipos` tiene un tipo (o una tupla de tipos) por valor:
+    datetime se lee del texto ISO y None solo pasa si se incluye type(None).
+    El chequeo es por tipo exacto: True no pasa por int.
+    """
+    if not cursor:
+        return None
+    try:
+        relleno = "=" * (-len(cursor) % 4)
+        datos = json.loads(base64.urlsafe_b64decode(cursor + relleno))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(datos, list) or len(datos) != len(tipos):
+        return None
+
+    valores = []
+    for valor, tipo in zip(datos, tipos):
+        aceptados = tipo if isinstance(tipo, tuple) else (tipo,)
+        if datetime in aceptados and isinstance(valor, str):
+            try:
+                valor = datetime.fromisoformat(valor)
+            except ValueError:
+                return None
+        elif type(valor) not in aceptados:
+            return None
+        valores.append(valor)
+    return valores
+
+
+# Cursor de los listados por (fecha, id)
+CLAVE_FECHA_ID = (datetime, int)
+# Igual, con una fecha que puede faltar (None)
+CLAVE_FECHA_NULA_ID = ((datetime, type(None)), int)
+
+
+def despues_de(col_fecha, col_id, fecha, id_, descendente: bool = True):
+    """
+    Condición "viene después de (fecha, id)" en el orden del listado.
+    Se escribe expandida (a < x OR (a = x AND b < y)) para que ambos motores
+    puedan usar el índice sobre (fecha, id).
+    """
+    if descendente:
+        return or_(col_fecha < fecha, and_(col_fecha == fecha, col_id < id_))
+    return or_(col_fecha > fecha, and_(col_fecha == fecha, col_id > id_))
+
+
+def contar_total(db, query, tabla, sin_filtros: bool) -> tuple[int, bool]:
+    """
+    Total de filas para mostrar junto a la paginación: (total, es_aproximado).
+
+    Sin filtros se evita el COUNT(*) completo: en PostgreSQL se usa la
+    estimación del planificador (pg_class.reltuples) y en SQLite el id más
+    alto, que coincide con la cantidad de filas salvo por las borradas.
+    Con filtros se cuenta exacto sobre la consulta filtrada.
+    """
+    if sin_filtros:
+        dialecto = db.get_bind().dialect.name
+        if dialecto == "postgresql":
+            estimado = db.execute(
+                text("SELECT reltuples FROM pg_class WHERE relname = :tabla"),
+                {"tabla": tabla.name},
+            ).scalar()
+            if estimado is not None and estimado >= 0:
+                return int(estimado), True
+        elif dialecto == "sqlite":
+            return db.execute(select(func.max(tabla.c.id))).scalar() or 0, True
+
+    return query.order_by(None).with_entities(func.count()).scalar(), False
@@ -0,0 +1,315 @@
+# perfiles.py
+"""
+Perfilador por muestreo de requests puntuales, para cuando un reporte o una
+cuenta corriente en particular anda lenta en producción.
+
+Se activa con PERFILADOR=1. Apagado (defecto) el middleware ni se instala:
+costo cero. Encendido, un request se perfila si:
+- lo pide un administrador: `?perfilar=1` o header `X-Perfilar: 1`;
+- le toca por muestreo: PERFILADOR_MUESTREO="GET /reportes=0.05,GET /clientes/{cliente_id}/cta-cte=0.2"
+  (ruta como en /admin/rendimiento = probabilidad).
+
+Mientras dura el request, un hilo mira cada PERFILADOR_INTERVALO_MS las
+pilas de todos los hilos (sys._current_frames) y se queda con las que pasan
+por la función del endpoint, desde ese frame hacia adentro. Así sirve igual
+para endpoints sync (threadpool) y async (loop); lo que el endpoint pasa
+esperando I/O en un await no aparece. Si otro request concurrente corre el
+mismo endpoint, sus muestras se mezclan.
+
+Cada captura deja en PERFILADOR_DIR (defecto "perfiles"):
+  <nombre>.collapsed.txt    pilas colapsadas ("a;b;c 12"), para flamegraph.pl
+  <nombre>.speedscope.json  para https://www.speedscope.app
+  <nombre>.meta.json        ruta, duración, muestras, estado
+Se guardan las últimas PERFILADOR_MAX capturas; las más viejas se borran.
+La respuesta perfilada lleva el header X-Perfil con el nombre de la captura.
+"""
+import json
+import logging
+import math
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from urllib.parse import parse_qs
+
+from starlette.routing import Match
+
+ACTIVO = os.getenv("PERFILADOR", "0").strip().lower() in ("1", "true", "si", "sí", "yes")
+DIRECTORIO = os.getenv("PERFILADOR_DIR", "perfiles")
+INTERVALO_MS = float(os.getenv("PERFILADOR_INTERVALO_MS", "2"))
+MAX_CAPTURAS = int(os.getenv("PERFILADOR_MAX", "50"))
+# Capturas en curso a la vez; el resto de los requests pasa sin perfilar
+MAX_SIMULTANEAS = int(os.getenv("PERFILADOR_SIMULTANEAS", "2"))
+
+FORMATOS = {
+    "collapsed": (".collapsed.txt", "text/plain"),
+    "speedscope": (".speedscope.json", "application/json"),
+}
+_NOMBRE_VALIDO = re.compile(r"^\d{8}-\d{6}-\d{6}$")
+
+log = logging.getLogger("sabor.perfiles")
+
+
+def _leer_muestreo(valor: str) -> dict[str, float]:
+    """
+    'GET /reportes=0.05,GET /x=1' -> {'GET /reportes': 0.05, 'GET /x': 1.0}.
+    Una entrada mal escrita se avisa en el log y queda con la tasa por
+    defecto (sin muestreo): no impide arrancar la app.
+    """
+    tasas = {}
+    for parte in valor.split(","):
+        if not parte.strip():
+            continue
+        ruta, _, tasa = parte.rpartition("=")
+        try:
+            if not ruta.strip():
+                raise ValueError("falta la ruta")
+            numero = float(tasa)
+            if not math.isfinite(numero):
+                raise ValueError(f"tasa inválida: {tasa}")
+            tasas[ruta.strip()] = min(max(numero, 0.0), 1.0)
+        except ValueError as e:
+            log.warning("PERFILADOR_MUESTREO: se ignora %r (%s)", parte.strip(), e)
+    return tasas
+
+
+MUESTREO = _leer_muestreo(os.getenv("PERFILADOR_MUESTREO", ""))
+
+_cupos = threading.BoundedSemaphore(MAX_SIMULTANEAS)
+_lock_disco = threading.Lock()
+
+
+# =========================
+# CAPTURA
+# =========================
+
+_nombres_frame: dict = {}
+
+
+def _nombre_frame(codigo) -> str:
+    nombre = _nombres_frame.get(codigo)
+    if nombre is None:
+        archivo = codigo.co_filename
+        if "site-packages" in archivo:
+            archivo = archivo.split("site-packages" + os.sep, 1)[-1]
+        elif archivo.startswith(os.getcwd()):
+            archivo = os.path.relpath(archivo)
+        nombre = _nombres_frame[codigo] = f"{codigo.co_qualname} ({archivo}:{codigo.co_firstlineno})"
+    return nombre
+
+
+class _Captura(threading.Thread):
+    def __init__(self, scope, motivo: str):
+        super().__init__(name="perfilador", daemon=True)
+        self.scope = scope
+        self.motivo = motivo
+        self.nombre = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        self.detener = threading.Event()
+        self.estado: int | None = None
+        # pila (de afuera hacia adentro) -> [muestras, segundos]
+        self.pilas: dict[tuple[str, ...], list] = {}
+        self.muestras = 0
+        self.duracion = 0.0
+
+    def run(self):
+        try:
+            inicio = ultimo = time.perf_counter()
+            while not self.detener.wait(INTERVALO_MS / 1000):
+                ahora = time.perf_counter()
+                self._muestrear(ahora - ultimo)
+                ultimo = ahora
+            self.duracion = time.perf_counter() - inicio
+            _guardar(self)
+        except Exception:
+            log.exception("No se pudo guardar el perfil %s", self.nombre)
+        finally:
+            _cupos.release()
+
+    def _muestrear(self, peso: float):
+        codigo = getattr(self.scope.get("endpoint"), "__code__", None)
+        if codigo is None:
+            return  # todavía no se resolvió la ruta
+        propio = threading.get_ident()
+        for ident, frame in sys._current_frames().items():
+            if ident == propio:
+                continue
+            pila = []
+            while frame is not None:
+                pila.append(frame.f_code)
+                if frame.f_code is codigo:
+                    break
+                frame = frame.f_back
+            else:
+                continue  # este hilo no está en el endpoint
+            clave = tuple(_nombre_frame(c) for c in reversed(pila))
+            acumulado = self.pilas.setdefault(clave, [0, 0.0])
+            acumulado[0] += 1
+            acumulado[1] += peso
+            self.muestras += 1
+
+    @property
+    def ruta(self) -> str:
+        ruta = self.scope.get("route")
+        return f"{self.scope['method']} {ruta.path}" if ruta is not None else f"{self.scope['method']} {self.scope['path']}"
+
+
+# =========================
+# DISCO
+# =========================
+
+def _speedscope(captura: _Captura) -> dict:
+    indices: dict[str, int] = {}
+    frames, muestras, pesos = [], [], []
+    for pila, (_, segundos) in captura.pilas.items():
+        fila = []
+        for nombre in pila:
+            if nombre not in indices:
+                indices[nombre] = len(frames)
+                frames.append({"name": nombre})
+            fila.append(indices[nombre])
+        muestras.append(fila)
+        pesos.append(round(segundos * 1000, 3))
+    titulo = f"{captura.ruta} {captura.nombre}"
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": titulo,
+        "exporter": "sabor-de-autor perfiles.py",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": [{
+            "type": "sampled",
+            "name": titulo,
+            "unit": "milliseconds",
+            "startValue": 0,
+            "endValue": round(sum(pesos), 3),
+            "samples": muestras,
+            "weights": pesos,
+        }],
+    }
+
+
+def _guardar(captura: _Captura):
+    base = os.path.join(DIRECTORIO, captura.nombre)
+    colapsadas = "".join(
+        f"{';'.join(pila)} {cuenta}\n"
+        for pila, (cuenta, _) in sorted(captura.pilas.items(), key=lambda kv: -kv[1][0])
+    )
+    meta = {
+        "nombre": captura.nombre,
+        "ruta": captura.ruta,
+        "url": captura.scope["path"] + ("?" + captura.scope["query_string"].decode("latin-1") if captura.scope.get("query_string") else ""),
+        "motivo": captura.motivo,
+        "estado": captura.estado,
+        "duracion_ms": round(captura.duracion * 1000, 1),
+        "muestras": captura.muestras,
+        "intervalo_ms": INTERVALO_MS,
+    }
+
+    with _lock_disco:
+        os.makedirs(DIRECTORIO, exist_ok=True)
+        with open(base + FORMATOS["collapsed"][0], "w", encoding="utf-8") as f:
+            f.write(colapsadas)
+        with open(base + FORMATOS["speedscope"][0], "w", encoding="utf-8") as f:
+            json.dump(_speedscope(captura), f, ensure_ascii=False)
+        # La meta va última: capturas() solo lista las que están completas
+        with open(base + ".meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False)
+        _recortar()
+
+
+def _recortar():
+    """Deja solo las últimas MAX_CAPTURAS (el nombre empieza con la fecha)."""
+    nombres = sorted({a.split(".", 1)[0] for a in os.listdir(DIRECTORIO) if _NOMBRE_VALIDO.match(a.split(".", 1)[0])})
+    for viejo in nombres[:-MAX_CAPTURAS] if MAX_CAPTURAS > 0 else nombres:
+        for sufijo in [s for s, _ in FORMATOS.values()] + [".meta.json"]:
+            try:
+                os.remove(os.path.join(DIRECTORIO, viejo + sufijo))
+            except FileNotFoundError:
+                pass
+
+
+def capturas() -> list[dict]:
+    """Metadatos de las capturas guardadas, la más nueva primero."""
+    if not os.path.isdir(DIRECTORIO):
+        return []
+    salida = []
+    for archivo in sorted(os.listdir(DIRECTORIO), reverse=True):
+        if not archivo.endswith(".meta.json"):
+            continue
+        try:
+            with open(os.path.join(DIRECTORIO, archivo), encoding="utf-8") as f:
+                salida.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    return salida
+
+
+def archivo(nombre: str, formato: str) -> tuple[str, str] | None:
+    """(ruta del archivo, media type) de una captura, o None si no existe."""
+    if not _NOMBRE_VALIDO.match(nombre) or formato not in FORMATOS:
+        return None
+    sufijo, media_type = FORMATOS[formato]
+    ruta = os.path.join(DIRECTORIO, nombre + sufijo)
+    return (ruta, media_type) if os.path.exists(ruta) else None
+
+
+# =========================
+# MIDDLEWARE
+# =========================
+
+class Perfilar:
+    """
+    Middleware ASGI. Va adentro de SessionMiddleware (para saber si el que
+    pide el perfil es admin). Solo se instala con PERFILADOR=1.
+    """
+
+    def __init__(self, app, router):
+        self.app = app
+        self.router = router
+
+    def _ruta(self, scope) -> str | None:
+        for ruta in self.router.routes:
+            coincide, _ = ruta.matches(scope)
+            if coincide == Match.FULL and hasattr(ruta, "path"):
+                return f"{scope['method']} {ruta.path}"
+        return None
+
+    def _motivo(self, scope) -> str | None:
+        usuario = scope.get("session", {}).get("user")
+        if usuario and usuario.get("es_admin"):
+            pedido = dict(scope["headers"]).get(b"x-perfilar") == b"1"
+            if not pedido and scope.get("query_string"):
+                pedido = parse_qs(scope["query_string"].decode("latin-1")).get("perfilar") == ["1"]
+            if pedido:
+                return "pedido"
+        if MUESTREO:
+            tasa = MUESTREO.get(self._ruta(scope))
+            if tasa and random.random() < tasa:
+                return "muestreo"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        motivo = self._motivo(scope)
+        if motivo is None or not _cupos.acquire(blocking=False):
+            return await self.app(scope, receive, send)
+
+        captura = _Captura(scope, motivo)
+        captura.start()
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                captura.estado = mensaje["status"]
+                mensaje = {**mensaje, "headers": list(mensaje.get("headers", [])) + [
+                    (b"x-perfil", captura.nombre.encode())
+                ]}
+            await send(mensaje)
+
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            captura.detener.set()
@@ -0,0 +1,134 @@
+# plantillas.py
+"""
+Entorno Jinja de la app.
+
+- Bytecode cache en disco (PLANTILLAS_CACHE_DIR, por defecto .jinja_cache):
+  cada worker nuevo carga las plantillas ya compiladas en lugar de volver a
+  parsearlas. Con PLANTILLAS_CACHE_DIR vacío se desactiva.
+- precompilar(): compila todas las plantillas al arrancar (lifespan), así el
+  primer request a cada pantalla no paga la compilación.
+- Menú de navegación cacheado: el <ul> del navbar solo depende de la página
+  activa y del rol, así que se renderiza una vez por combinación.
+- Tiempo de render por plantilla (histograma), ver resumen_render().
+
+PLANTILLAS_RECARGAR=0 evita el chequeo de fecha del archivo en cada uso;
+dejarlo en 1 (defecto) mientras se editan plantillas.
+"""
+import os
+import threading
+import time
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+from markupsafe import Markup
+
+import activos
+import instrumentacion
+from metricas import Aciertos, Histograma
+
+DIRECTORIO = "templates"
+CACHE_DIR = os.getenv("PLANTILLAS_CACHE_DIR", ".jinja_cache")
+RECARGAR = os.getenv("PLANTILLAS_RECARGAR", "1").strip().lower() in ("1", "true", "si", "sí", "yes")
+
+_lock = threading.Lock()
+_render: dict[str, Histograma] = {}
+# (active_page, rol) -> (plantilla con la que se renderizó, Markup)
+_menus: dict[tuple[str | None, str], tuple[Template, Markup]] = {}
+aciertos_menu = Aciertos()
+
+
+# =========================
+# RENDER MEDIDO
+# =========================
+
+def _histograma(nombre: str) -> Histograma:
+    with _lock:
+        histograma = _render.get(nombre)
+        if histograma is None:
+            histograma = _render[nombre] = Histograma()
+        return histograma
+
+
+class PlantillaMedida(Template):
+    """Template que anota cuánto tarda cada render completo (con base.html)."""
+
+    def render(self, *args, **kwargs) -> str:
+        inicio = time.perf_counter()
+        try:
+            with instrumentacion.midiendo_render():
+                return super().render(*args, **kwargs)
+        finally:
+            _histograma(self.name or "<string>").observar(time.perf_counter() - inicio)
+
+
+def histogramas_render() -> dict[str, Histograma]:
+    """{plantilla: histograma de render} (copia del dict; los histogramas son los vivos)."""
+    with _lock:
+        return dict(_render)
+
+
+def resumen_render() -> dict[str, dict]:
+    """{plantilla: resumen del histograma}, de la más lenta (p95) a la más rápida."""
+    resumenes = {nombre: h.resumen() for nombre, h in histogramas_render().items()}
+    return dict(sorted(resumenes.items(), key=lambda kv: kv[1]["p95_ms"], reverse=True))
+
+
+# =========================
+# ENTORNO
+# =========================
+
+def _bytecode_cache():
+    if not CACHE_DIR:
+        return None
+    try:
+        os.makedirs(CACHE_DIR, exist_ok=True)
+    except OSError as e:
+        # Disco de solo lectura: se sigue sin cache
+        print(f"Sin bytecode cache de plantillas ({CACHE_DIR}): {e}")
+        return None
+    return FileSystemBytecodeCache(CACHE_DIR)
+
+
+def crear_entorno() -> Environment:
+    env = Environment(
+        loader=FileSystemLoader(DIRECTORIO),
+        autoescape=True,
+        auto_reload=RECARGAR,
+        bytecode_cache=_bytecode_cache(),
+    )
+    env.template_class = PlantillaMedida
+    env.globals["static_url"] = activos.static_url
+    env.globals["static_srcset"] = activos.static_srcset
+    env.globals["menu_nav"] = lambda active_page, usuario: menu_nav(env, active_page, usuario)
+    return env
+
+
+def precompilar(env: Environment) -> int:
+    """Carga (y compila) todas las plantillas. Devuelve cuántas."""
+    nombres = [n for n in env.list_templates() if n.endswith(".html")]
+    for nombre in nombres:
+        env.get_template(nombre)
+    return len(nombres)
+
+
+# =========================
+# FRAGMENTOS CACHEADOS
+# =========================
+
+def _rol(usuario: dict | None) -> str:
+    if not usuario:
+        return "anonimo"
+    return "admin" if usuario.get("es_admin") else "usuario"
+
+
+def menu_nav(env: Environment, active_page: str | None, usuario: dict | None) -> Markup:
+    """Menú del navbar (templates/_menu.html) para esa página y ese rol."""
+    clave = (active_page, _rol(usuario))
+    # get_template devuelve la misma instancia mientras el archivo no cambie
+    # (con auto_reload), así que editar _menu.html invalida el fragmento
+    plantilla = env.get_template("_menu.html")
+    entrada = _menus.get(clave)
+    aciertos_menu.anotar(entrada is not None and entrada[0] is plantilla)
+    if entrada is None or entrada[0] is not plantilla:
+        html = plantilla.render(active_page=active_page, rol=clave[1])
+        entrada = _menus[clave] = (plantilla, Markup(html))
+    return entrada[1]
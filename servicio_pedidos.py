@@ -0,0 +1,195 @@
+# servicio_pedidos.py
+"""
+Alta y edición de pedidos con una cantidad fija de idas y vueltas a la base.
+
+- Los productos de todas las líneas se leen en una sola consulta IN (...).
+- Los ítems nuevos se insertan en un único executemany (insertmanyvalues).
+- Al editar, las líneas anteriores se comparan con las nuevas por posición:
+  solo se actualizan las que cambiaron, las sobrantes se borran con un DELETE
+  y las que faltan se insertan juntas.
+
+El resumen diario, la cuenta corriente y la versión de la tabla "pedidos"
+(ETags del tablero) se actualizan en la misma transacción. Ninguna función
+hace commit.
+"""
+from itertools import zip_longest
+
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.orm import Session
+
+import cta_cte
+import ventas_diarias
+import versiones
+from models import Pedido, PedidoItem, Producto, TipoMovimiento
+
+# Columnas de pedido_items que vienen del formulario (además de pedido_id)
+CAMPOS_ITEM = (
+    "producto_id",
+    "descripcion_item",
+    "cantidad",
+    "precio_venta_unitario",
+    "costo_unitario",
+    "subtotal",
+)
+
+
+# =========================
+# LÍNEAS DEL FORMULARIO
+# =========================
+
+def armar_lineas(
+    db: Session,
+    producto_id: list,
+    descripcion_item: list,
+    cantidad: list,
+    precio_unitario: list,
+) -> list[dict]:
+    """
+    Convierte las listas del formulario en líneas valorizadas (dicts con
+    CAMPOS_ITEM). Se descartan las líneas sin producto o con un producto
+    inexistente.
+    """
+    ids = {int(p) for p in producto_id if p}
+    productos = {}
+    if ids:
+        productos = {
+            p.id: p
+            for p in db.execute(
+                select(Producto.id, Producto.nombre, Producto.precio_venta, Producto.precio_compra)
+                .where(Producto.id.in_(ids))
+            )
+        }
+
+    lineas = []
+    for idx, prod_id in enumerate(producto_id):
+        prod = productos.get(int(prod_id)) if prod_id else None
+        if not prod:
+            continue
+
+        cant = int(cantidad[idx]) if cantidad[idx] else 1
+        pv = float(precio_unitario[idx]) if precio_unitario[idx] else prod.precio_venta
+
+        lineas.append({
+            "producto_id": prod.id,
+            "descripcion_item": descripcion_item[idx] or prod.nombre,
+            "cantidad": cant,
+            "precio_venta_unitario": pv,
+            "costo_unitario": prod.precio_compra,
+            "subtotal": pv * cant,
+        })
+    return lineas
+
+
+def total_neto(lineas: list[dict], descuento_pct: float) -> float:
+    subtotal = sum(l["subtotal"] for l in lineas)
+    return max(subtotal - subtotal * (descuento_pct / 100.0), 0.0)
+
+
+def _items_transitorios(pedido_id: int, lineas: list[dict]) -> list[PedidoItem]:
+    # Objetos sin agregar a la sesión: solo para calcular la contribución
+    return [PedidoItem(pedido_id=pedido_id, **l) for l in lineas]
+
+
+def _insertar_items(db: Session, pedido_id: int, lineas: list[dict]):
+    if lineas:
+        db.execute(insert(PedidoItem), [{"pedido_id": pedido_id, **l} for l in lineas])
+
+
+def items_guardados(db: Session, pedido_id: int) -> list:
+    """Ítems actuales del pedido como filas (id + CAMPOS_ITEM), en orden de alta."""
+    columnas = [PedidoItem.id] + [getattr(PedidoItem, c) for c in CAMPOS_ITEM]
+    return db.execute(
+        select(*columnas).where(PedidoItem.pedido_id == pedido_id).order_by(PedidoItem.id)
+    ).all()
+
+
+# =========================
+# ALTA / EDICIÓN
+# =========================
+
+def crear_pedido(db: Session, pedido: Pedido, lineas: list[dict]) -> Pedido:
+    """Inserta el pedido con sus ítems, lo suma al resumen y registra el débito."""
+    if pedido.descuento is None:
+        pedido.descuento = 0.0
+    pedido.total = total_neto(lineas, pedido.descuento)
+
+    db.add(pedido)
+    db.flush()  # para tener pedido.id
+
+    _insertar_items(db, pedido.id, lineas)
+    ventas_diarias.aplicar_pedido(db, pedido, items=_items_transitorios(pedido.id, lineas))
+    versiones.incrementar(db, "pedidos")
+
+    # Movimiento cta cte por el TOTAL NETO
+    if pedido.total > 0:
+        cta_cte.registrar_movimiento(
+            db,
+            pedido.cliente_id,
+            TipoMovimiento.debito,
+            pedido.total,
+            f"Pedido #{pedido.id}",
+            pedido_id=pedido.id,
+        )
+    return pedido
+
+
+def actualizar_pedido(db: Session, pedido: Pedido, lineas: list[dict], **campos) -> Pedido:
+    """
+    Aplica `campos` (cliente_id, fecha_entrega, descuento, ...) y las nuevas
+    líneas al pedido, escribiendo solo los ítems que cambiaron.
+    """
+    anteriores = items_guardados(db, pedido.id)
+
+    # Restar la versión anterior del resumen ANTES de tocar el pedido
+    ventas_diarias.aplicar_pedido(db, pedido, -1, items=anteriores)
+
+    for campo, valor in campos.items():
+        setattr(pedido, campo, valor)
+    if pedido.descuento is None:
+        pedido.descuento = 0.0
+    pedido.total = total_neto(lineas, pedido.descuento)
+
+    cambiadas, bajas, nuevas = [], [], []
+    for anterior, linea in zip_longest(anteriores, lineas):
+        if linea is None:
+            bajas.append(anterior.id)
+        elif anterior is None:
+            nuevas.append(linea)
+        elif any(getattr(anterior, c) != linea[c] for c in CAMPOS_ITEM):
+            cambiadas.append({"id": anterior.id, **linea})
+
+    if cambiadas:
+        # UPDATE por clave primaria en un solo executemany
+        db.execute(update(PedidoItem), cambiadas)
+    if bajas:
+        db.execute(
+            delete(PedidoItem)
+            .where(PedidoItem.id.in_(bajas))
+            .execution_options(synchronize_session=False)
+        )
+    _insertar_items(db, pedido.id, nuevas)
+    db.expire(pedido, ["items"])
+
+    ventas_diarias.aplicar_pedido(db, pedido, items=_items_transitorios(pedido.id, lineas))
+    versiones.incrementar(db, "pedidos")
+
+    # Débito de cta cte por el nuevo total
+    debitos = cta_cte.debitos_de_pedido(db, pedido.id)
+    mov = debitos[0] if debitos else None
+
+    if pedido.total > 0:
+        if mov:
+            cta_cte.modificar_movimiento(db, mov, pedido.cliente_id, pedido.total)
+        else:
+            cta_cte.registrar_movimiento(
+                db,
+                pedido.cliente_id,
+                TipoMovimiento.debito,
+                pedido.total,
+                f"Pedido #{pedido.id}",
+                pedido_id=pedido.id,
+            )
+    elif mov:
+        cta_cte.eliminar_movimiento(db, mov)
+
+    return pedido
@@ -0,0 +1,105 @@
+# tests/test_cursores.py
+"""
+Cursores de paginación: los editados a mano tienen que mostrar la primera
+página (200), nunca un 500; los buenos recorren el listado sin saltos.
+"""
+import base64
+import json
+import os
+import tempfile
+from datetime import datetime, timedelta
+
+# La base se elige al importar database.py: antes de importar main
+_BASE = os.path.join(tempfile.mkdtemp(prefix="sabor_test_"), "test.db")
+os.environ["DATABASE_URL"] = f"sqlite:///{_BASE}"
+os.environ.pop("READ_DATABASE_URL", None)
+os.environ["INIT_DB_AL_ARRANCAR"] = "1"
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from database import SessionLocal
+from models import EstadoPedido, Pedido
+from paginacion import CLAVE_FECHA_ID, codificar_cursor, decodificar_cursor
+
+
+def _cursor(valores) -> str:
+    return base64.urlsafe_b64encode(json.dumps(valores).encode()).decode().rstrip("=")
+
+
+MALFORMADOS = [
+    _cursor(["2025-01-01T10:00:00", [1]]),
+    _cursor(["2025-01-01T10:00:00", {"a": 1}]),
+    _cursor(["2025-01-01T10:00:00", "1"]),
+    _cursor(["2025-01-01T10:00:00", True]),
+    _cursor(["no es fecha", 1]),
+    _cursor([1, 1]),
+    _cursor(["2025-01-01T10:00:00"]),
+    _cursor({"fecha": "2025-01-01"}),
+    "%%%no-es-base64",
+]
+
+
+@pytest.fixture(scope="module")
+def cliente():
+    with TestClient(main.app) as c:
+        r = c.post("/login", data={"username": "admin", "password": "sda2025"}, follow_redirects=False)
+        assert r.status_code == 303
+        r = c.post("/clientes/guardar", data={"nombre": "Cliente test"}, follow_redirects=False)
+        assert r.status_code == 303
+        yield c
+
+
+def test_decodificar_valida_tipos():
+    valido = codificar_cursor(datetime(2025, 1, 1, 10), 7)
+    assert decodificar_cursor(valido, CLAVE_FECHA_ID) == [datetime(2025, 1, 1, 10), 7]
+    for cursor in MALFORMADOS:
+        assert decodificar_cursor(cursor, CLAVE_FECHA_ID) is None
+
+
+@pytest.mark.parametrize("cursor", MALFORMADOS)
+@pytest.mark.parametrize("url", ["/pedidos", "/pedidos/tablero/entregados"])
+def test_cursor_malformado_muestra_primera_pagina(cliente, url, cursor):
+    for direccion in ("sig", "ant"):
+        r = cliente.get(url, params={"cursor": cursor, "dir": direccion})
+        assert r.status_code == 200, r.text[:500]
+
+
+@pytest.mark.parametrize("cursor", MALFORMADOS)
+def test_cursor_malformado_cuenta_corriente(cliente, cursor):
+    for direccion in ("sig", "ant"):
+        r = cliente.get("/clientes/1/cta-cte", params={"cursor": cursor, "dir": direccion})
+        assert r.status_code == 200, r.text[:500]
+
+
+def test_tandas_entregados_por_fecha_de_entrega(cliente):
+    inicio = datetime(2025, 3, 1)
+    db = SessionLocal()
+    try:
+        for i in range(45):
+            # Fechas repetidas (desempata el id) y algunos sin fecha de entrega
+            entrega = None if i % 7 == 0 else inicio + timedelta(days=i % 10)
+            db.add(Pedido(
+                cliente_id=1,
+                fecha_pedido=inicio - timedelta(days=i),
+                fecha_entrega=entrega,
+                estado=EstadoPedido.entregado,
+            ))
+        db.commit()
+
+        todos = db.query(Pedido).filter(Pedido.estado == EstadoPedido.entregado).all()
+        esperado = [
+            p.id for p in sorted(
+                todos, key=lambda p: (p.fecha_entrega is not None, p.fecha_entrega or inicio, p.id), reverse=True
+            )
+        ]
+        vistos, cursor = [], None
+        while True:
+            tanda, cursor = main._tanda_entregados(db, cursor)
+            vistos += [p.id for p in tanda]
+            if cursor is None:
+                break
+        assert vistos == esperado
+    finally:
+        db.close()
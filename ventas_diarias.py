@@ -0,0 +1,413 @@
+# ventas_diarias.py
+"""
+Resumen de ventas por día (rollup) mantenido en forma incremental.
+
+Cada alta, edición o baja de un pedido suma o resta su "contribución" en las
+tablas ventas_diarias*, dentro de la misma transacción que el pedido. Así los
+reportes leen unas pocas filas ya agregadas en vez de recorrer todos los
+pedidos con sus ítems.
+"""
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import delete, desc, func, select
+from sqlalchemy.orm import Session, joinedload
+
+from models import (
+    Cliente,
+    Pedido,
+    PedidoItem,
+    Producto,
+    VentaDiaria,
+    VentaDiariaCliente,
+    VentaDiariaProducto,
+)
+
+# Diferencia máxima aceptada al comparar el rollup contra el cálculo original
+TOLERANCIA = 0.01
+
+
+# =========================
+# CONTRIBUCIÓN DE UN PEDIDO
+# =========================
+
+def _subtotal_item(item) -> float:
+    # Por las dudas, recalculo subtotal si está en None
+    return item.subtotal or (item.precio_venta_unitario * item.cantidad)
+
+
+def contribucion_pedido(pedido: Pedido, items=None) -> dict:
+    """
+    Calcula lo que un pedido aporta al resumen diario.
+
+    `items` permite pasar los ítems explícitamente cuando todavía no están
+    cargados en `pedido.items` (por ejemplo, recién agregados con db.add).
+    """
+    if items is None:
+        items = pedido.items
+    items = list(items)
+
+    subtotal = 0.0
+    costo_total = 0.0
+    for item in items:
+        subtotal += _subtotal_item(item)
+        costo_total += (item.costo_unitario or 0) * item.cantidad
+
+    # Descuento en porcentaje guardado en el pedido
+    desc_pct = pedido.descuento or 0.0
+    desc_monto = subtotal * (desc_pct / 100.0)
+    venta_neta = subtotal - desc_monto
+    ganancia = venta_neta - costo_total
+
+    # Reparto el descuento del pedido proporcional a cada item
+    productos: dict[int, dict] = {}
+    for item in items:
+        item_sub = _subtotal_item(item)
+        item_desc = desc_monto * (item_sub / subtotal) if subtotal > 0 else 0.0
+        item_venta_neta = item_sub - item_desc
+        item_ganancia = item_venta_neta - (item.costo_unitario or 0) * item.cantidad
+
+        datos = productos.setdefault(
+            item.producto_id,
+            {"lineas": 0, "unidades": 0, "ventas": 0.0, "ganancia": 0.0},
+        )
+        datos["lineas"] += 1
+        datos["unidades"] += item.cantidad
+        datos["ventas"] += item_venta_neta
+        datos["ganancia"] += item_ganancia
+
+    return {
+        "fecha": pedido.fecha_pedido.date(),
+        "cliente_id": pedido.cliente_id,
+        "dia": {
+            "pedidos": 1,
+            "subtotal": subtotal,
+            "descuentos": desc_monto,
+            "ventas": venta_neta,
+            "costo": costo_total,
+            "ganancia": ganancia,
+        },
+        "productos": productos,
+    }
+
+
+# =========================
+# ESCRITURA (UPSERT CON DELTAS)
+# =========================
+
+def _upsert_sumando(db: Session, modelo, claves: list[str], filas: list[dict]):
+    """
+    INSERT ... ON CONFLICT DO UPDATE sumando los deltas a la fila existente.
+    Todas las filas van en un solo executemany.
+    """
+    if not filas:
+        return
+    dialecto = db.get_bind().dialect.name
+
+    if dialecto in ("postgresql", "sqlite"):
+        if dialecto == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        tabla = modelo.__table__
+        deltas = [k for k in filas[0] if k not in claves]
+        stmt = insert(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=claves,
+            set_={k: tabla.c[k] + stmt.excluded[k] for k in deltas},
+        )
+        db.execute(stmt, filas)
+        return
+
+    # Otros motores: leo y actualizo por ORM
+    for datos in filas:
+        pk = tuple(datos[k] for k in claves)
+        fila = db.get(modelo, pk if len(pk) > 1 else pk[0])
+        if fila is None:
+            fila = modelo(**{k: datos[k] for k in claves}, **{k: 0 for k in datos if k not in claves})
+            db.add(fila)
+        for k, v in datos.items():
+            if k not in claves:
+                setattr(fila, k, (getattr(fila, k) or 0) + v)
+
+
+def aplicar_pedido(db: Session, pedido: Pedido, signo: int = 1, items=None):
+    """
+    Suma (signo=1) o resta (signo=-1) la contribución del pedido al resumen.
+
+    No hace commit: se ejecuta dentro de la transacción del handler que
+    guarda, edita o elimina el pedido. Para una edición hay que restar ANTES
+    de modificar el pedido y sumar después. Son tres sentencias sin importar
+    cuántos productos tenga el pedido.
+    """
+    contrib = contribucion_pedido(pedido, items)
+    fecha = contrib["fecha"]
+    dia = contrib["dia"]
+
+    _upsert_sumando(
+        db,
+        VentaDiaria,
+        ["fecha"],
+        [{"fecha": fecha, **{k: signo * v for k, v in dia.items()}}],
+    )
+
+    _upsert_sumando(
+        db,
+        VentaDiariaCliente,
+        ["fecha", "cliente_id"],
+        [{
+            "fecha": fecha,
+            "cliente_id": contrib["cliente_id"],
+            "pedidos": signo,
+            "ventas": signo * dia["ventas"],
+            "ganancia": signo * dia["ganancia"],
+        }],
+    )
+
+    _upsert_sumando(
+        db,
+        VentaDiariaProducto,
+        ["fecha", "producto_id"],
+        [
+            {"fecha": fecha, "producto_id": producto_id, **{k: signo * v for k, v in datos.items()}}
+            for producto_id, datos in contrib["productos"].items()
+        ],
+    )
+
+
+# =========================
+# LECTURA PARA REPORTES
+# =========================
+
+def resumen_periodo(db: Session, desde_date: date, hasta_date: date, top: int = 5) -> dict:
+    """Totales, detalle por día y rankings del período [desde, hasta]."""
+    dias = db.execute(
+        select(
+            VentaDiaria.fecha,
+            VentaDiaria.pedidos,
+            VentaDiaria.ventas,
+            VentaDiaria.descuentos,
+            VentaDiaria.ganancia,
+        )
+        .where(
+            VentaDiaria.fecha >= desde_date,
+            VentaDiaria.fecha <= hasta_date,
+            VentaDiaria.pedidos > 0,
+        )
+        .order_by(desc(VentaDiaria.fecha))
+    ).all()
+
+    total_ventas = 0.0
+    total_descuentos = 0.0
+    total_ganancia = 0.0
+    detalle_dias = []
+    for f in dias:
+        total_ventas += f.ventas
+        total_descuentos += f.descuentos
+        total_ganancia += f.ganancia
+        detalle_dias.append({
+            "fecha": f.fecha,
+            "pedidos": f.pedidos,
+            "ventas": f.ventas,
+            "descuentos": f.descuentos,
+            "ganancia": f.ganancia,
+            "rentabilidad": (f.ganancia / f.ventas * 100.0) if f.ventas > 0 else 0.0,
+        })
+
+    ventas_c = func.sum(VentaDiariaCliente.ventas)
+    top_clientes = [
+        {"nombre": r.nombre, "pedidos": r.pedidos, "ventas": r.ventas, "ganancia": r.ganancia}
+        for r in db.execute(
+            select(
+                Cliente.nombre,
+                func.sum(VentaDiariaCliente.pedidos).label("pedidos"),
+                ventas_c.label("ventas"),
+                func.sum(VentaDiariaCliente.ganancia).label("ganancia"),
+            )
+            .join(Cliente, Cliente.id == VentaDiariaCliente.cliente_id)
+            .where(
+                VentaDiariaCliente.fecha >= desde_date,
+                VentaDiariaCliente.fecha <= hasta_date,
+            )
+            .group_by(VentaDiariaCliente.cliente_id, Cliente.nombre)
+            .having(func.sum(VentaDiariaCliente.pedidos) > 0)
+            .order_by(desc(ventas_c))
+            .limit(top)
+        )
+    ]
+
+    ventas_p = func.sum(VentaDiariaProducto.ventas)
+    top_productos = [
+        {"nombre": r.nombre, "unidades": r.unidades, "ventas": r.ventas, "ganancia": r.ganancia}
+        for r in db.execute(
+            select(
+                Producto.nombre,
+                func.sum(VentaDiariaProducto.unidades).label("unidades"),
+                ventas_p.label("ventas"),
+                func.sum(VentaDiariaProducto.ganancia).label("ganancia"),
+            )
+            .join(Producto, Producto.id == VentaDiariaProducto.producto_id)
+            .where(
+                VentaDiariaProducto.fecha >= desde_date,
+                VentaDiariaProducto.fecha <= hasta_date,
+            )
+            .group_by(VentaDiariaProducto.producto_id, Producto.nombre)
+            .having(func.sum(VentaDiariaProducto.lineas) > 0)
+            .order_by(desc(ventas_p))
+            .limit(top)
+        )
+    ]
+
+    return {
+        "total_ventas": total_ventas,
+        "total_descuentos": total_descuentos,
+        "total_ganancia": total_ganancia,
+        "rentabilidad_pct": (total_ganancia / total_ventas * 100.0) if total_ventas > 0 else 0.0,
+        "detalle_dias": detalle_dias,
+        "top_clientes": top_clientes,
+        "top_productos": top_productos,
+    }
+
+
+# =========================
+# RECONSTRUCCIÓN Y VERIFICACIÓN
+# =========================
+
+def _rango(desde_date: date, hasta_date: date):
+    inicio = datetime.combine(desde_date, datetime.min.time())
+    fin = datetime.combine(hasta_date + timedelta(days=1), datetime.min.time())
+    return inicio, fin
+
+
+def _pedidos_con_items(db: Session, inicio=None, fin=None):
+    query = (
+        db.query(Pedido)
+        .options(joinedload(Pedido.items).joinedload(PedidoItem.producto),
+                 joinedload(Pedido.cliente))
+    )
+    if inicio is not None:
+        query = query.filter(Pedido.fecha_pedido >= inicio, Pedido.fecha_pedido < fin)
+    return query.all()
+
+
+def reconstruir(db: Session) -> int:
+    """
+    Vacía y vuelve a generar el resumen completo a partir de los pedidos,
+    con INSERT ... SELECT agrupado en la base (ver consultas_ventas).
+    Devuelve la cantidad de pedidos procesados. Hace commit.
+    """
+    import consultas_ventas
+
+    db.execute(delete(VentaDiariaProducto))
+    db.execute(delete(VentaDiariaCliente))
+    db.execute(delete(VentaDiaria))
+    consultas_ventas.insertar_resumen(db)
+    db.commit()
+
+    return db.scalar(select(func.coalesce(func.sum(VentaDiaria.pedidos), 0)))
+
+
+def calcular_desde_pedidos(db: Session, desde_date: date, hasta_date: date, top: int = 5) -> dict:
+    """
+    Cálculo original de los reportes, recorriendo pedidos e ítems en Python.
+    Se conserva como referencia para verificar el resumen.
+    """
+    inicio, fin = _rango(desde_date, hasta_date)
+
+    detalle_dias: dict[date, dict] = {}
+    ranking_clientes: dict[int, dict] = {}
+    ranking_productos: dict[int, dict] = {}
+
+    for p in _pedidos_con_items(db, inicio, fin):
+        contrib = contribucion_pedido(p)
+        dia = contrib["dia"]
+
+        acc = detalle_dias.setdefault(
+            contrib["fecha"], {"pedidos": 0, "ventas": 0.0, "descuentos": 0.0, "ganancia": 0.0}
+        )
+        acc["pedidos"] += 1
+        acc["ventas"] += dia["ventas"]
+        acc["descuentos"] += dia["descuentos"]
+        acc["ganancia"] += dia["ganancia"]
+
+        if p.cliente:
+            acc = ranking_clientes.setdefault(
+                p.cliente.id,
+                {"nombre": p.cliente.nombre, "ventas": 0.0, "ganancia": 0.0, "pedidos": 0},
+            )
+            acc["ventas"] += dia["ventas"]
+            acc["ganancia"] += dia["ganancia"]
+            acc["pedidos"] += 1
+
+        nombres = {item.producto_id: item.producto.nombre for item in p.items if item.producto}
+        for producto_id, datos in contrib["productos"].items():
+            if producto_id not in nombres:
+                continue
+            acc = ranking_productos.setdefault(
+                producto_id,
+                {"nombre": nombres[producto_id], "unidades": 0, "ventas": 0.0, "ganancia": 0.0},
+            )
+            acc["unidades"] += datos["unidades"]
+            acc["ventas"] += datos["ventas"]
+            acc["ganancia"] += datos["ganancia"]
+
+    total_ventas = sum(d["ventas"] for d in detalle_dias.values())
+    total_descuentos = sum(d["descuentos"] for d in detalle_dias.values())
+    total_ganancia = sum(d["ganancia"] for d in detalle_dias.values())
+
+    return {
+        "total_ventas": total_ventas,
+        "total_descuentos": total_descuentos,
+        "total_ganancia": total_ganancia,
+        "rentabilidad_pct": (total_ganancia / total_ventas * 100.0) if total_ventas > 0 else 0.0,
+        "detalle_dias": sorted(
+            ({"fecha": f, **d} for f, d in detalle_dias.items()),
+            key=lambda x: x["fecha"],
+            reverse=True,
+        ),
+        "top_clientes": sorted(ranking_clientes.values(), key=lambda x: x["ventas"], reverse=True)[:top],
+        "top_productos": sorted(ranking_productos.values(), key=lambda x: x["ventas"], reverse=True)[:top],
+    }
+
+
+def verificar(db: Session, desde_date: date, hasta_date: date, contra: str = "python") -> list[str]:
+    """
+    Compara el resumen contra el cálculo original para el período:
+    `contra="python"` recorre los pedidos en Python, `contra="sql"` usa los
+    agregados de consultas_ventas. Devuelve la lista de diferencias (vacía si
+    coincide).
+    """
+    rollup = resumen_periodo(db, desde_date, hasta_date)
+    if contra == "sql":
+        import consultas_ventas
+        esperado = consultas_ventas.resumen(db, desde_date, hasta_date)
+    else:
+        esperado = calcular_desde_pedidos(db, desde_date, hasta_date)
+    diferencias = []
+
+    for clave in ("total_ventas", "total_descuentos", "total_ganancia"):
+        if abs(rollup[clave] - esperado[clave]) > TOLERANCIA:
+            diferencias.append(f"{clave}: resumen={rollup[clave]:.2f} esperado={esperado[clave]:.2f}")
+
+    por_fecha = {d["fecha"]: d for d in rollup["detalle_dias"]}
+    for d in esperado["detalle_dias"]:
+        r = por_fecha.pop(d["fecha"], None)
+        if r is None:
+            diferencias.append(f"{d['fecha']}: falta en el resumen")
+            continue
+        for clave in ("pedidos", "ventas", "descuentos", "ganancia"):
+            if abs(r[clave] - d[clave]) > TOLERANCIA:
+                diferencias.append(
+                    f"{d['fecha']} {clave}: resumen={r[clave]:.2f} esperado={d[clave]:.2f}"
+                )
+    for f in por_fecha:
+        diferencias.append(f"{f}: sobra en el resumen")
+
+    for ranking in ("top_clientes", "top_productos"):
+        # Ordeno las tuplas para no marcar como diferencia un empate en ventas
+        obtenido = sorted((x["nombre"], round(x["ventas"], 2)) for x in rollup[ranking])
+        calculado = sorted((x["nombre"], round(x["ventas"], 2)) for x in esperado[ranking])
+        if obtenido != calculado:
+            diferencias.append(f"{ranking}: resumen={obtenido} esperado={calculado}")
+
+    return diferencias
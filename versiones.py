@@ -0,0 +1,119 @@
+# versiones.py
+"""
+Contadores de versión por tabla (tabla versiones_tablas).
+
+Cada escritura que cambia datos de referencia (productos, clientes, ...)
+incrementa la versión de su tabla dentro de la misma transacción. Quien
+guarde algo derivado de esas tablas (el catálogo en memoria, un ETag) lo
+compara contra este número: leerlo es una consulta por clave primaria, así
+cualquier proceso se entera de un cambio hecho por otro.
+
+recientes() guarda en memoria lo último leído: quien pueda tolerar unos
+segundos de atraso respecto de otros procesos (catálogo, ETags) no consulta
+la base en cada uso. Después del commit, olvidar() hace que el mismo proceso
+relea enseguida.
+"""
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from models import VersionTabla
+
+_lock = threading.Lock()
+# tabla -> (version, actualizado_en, leida_en)
+_leidas: dict[str, tuple[int, datetime | None, float]] = {}
+
+
+def incrementar(db: Session, *tablas: str):
+    """Suma 1 a la versión de cada tabla (la crea si no existe). No hace commit."""
+    ahora = datetime.utcnow()
+    dialecto = db.get_bind().dialect.name
+
+    for tabla in tablas:
+        if dialecto in ("postgresql", "sqlite"):
+            if dialecto == "postgresql":
+                from sqlalchemy.dialects.postgresql import insert
+            else:
+                from sqlalchemy.dialects.sqlite import insert
+
+            stmt = insert(VersionTabla).values(tabla=tabla, version=1, actualizado_en=ahora)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["tabla"],
+                set_={"version": VersionTabla.version + 1, "actualizado_en": ahora},
+            )
+            db.execute(stmt)
+            continue
+
+        # Otros motores: UPDATE y, si no había fila, INSERT
+        resultado = db.execute(
+            update(VersionTabla)
+            .where(VersionTabla.tabla == tabla)
+            .values(version=VersionTabla.version + 1, actualizado_en=ahora)
+            .execution_options(synchronize_session=False)
+        )
+        if not resultado.rowcount:
+            db.add(VersionTabla(tabla=tabla, version=1, actualizado_en=ahora))
+
+
+def obtener(db: Session, *tablas: str) -> dict[str, int]:
+    """Versión actual de cada tabla; 0 si nunca se incrementó."""
+    filas = db.execute(
+        select(VersionTabla.tabla, VersionTabla.version).where(VersionTabla.tabla.in_(tablas))
+    ).all()
+    versiones = {t: 0 for t in tablas}
+    versiones.update({f.tabla: f.version for f in filas})
+    return versiones
+
+
+
+# =========================
+# LECTURA CACHEADA
+# =========================
+
+def en_cache(tablas, antiguedad_seg: float) -> dict[str, tuple[int, datetime | None]] | None:
+    """(versión, actualizado_en) de cada tabla si se leyó hace menos de antiguedad_seg; si no, None."""
+    limite = time.monotonic() - antiguedad_seg
+    with _lock:
+        conocidas = [_leidas.get(t) for t in tablas]
+    if any(c is None or c[2] < limite for c in conocidas):
+        return None
+    return {t: (c[0], c[1]) for t, c in zip(tablas, conocidas)}
+
+
+def recientes(tablas, antiguedad_seg: float, db=None) -> dict[str, tuple[int, datetime | None]]:
+    """
+    Como en_cache(), pero si hace falta lee de la base: con `db` (Session o
+    Connection) o con una conexión de la base de lectura.
+    """
+    vigentes = en_cache(tablas, antiguedad_seg)
+    if vigentes is not None:
+        return vigentes
+
+    consulta = select(
+        VersionTabla.tabla, VersionTabla.version, VersionTabla.actualizado_en
+    ).where(VersionTabla.tabla.in_(tablas))
+    if db is None:
+        from database import read_engine
+
+        with read_engine.connect() as conexion:
+            filas = conexion.execute(consulta).all()
+    else:
+        filas = db.execute(consulta).all()
+
+    leidas = {t: (0, None) for t in tablas}
+    leidas.update({f.tabla: (f.version, f.actualizado_en) for f in filas})
+    ahora = time.monotonic()
+    with _lock:
+        for tabla, (version, actualizado_en) in leidas.items():
+            _leidas[tabla] = (version, actualizado_en, ahora)
+    return leidas
+
+
+def olvidar(*tablas: str):
+    """Descarta lo leído de esas tablas (todas si no se indica ninguna). Llamar después del commit."""
+    with _lock:
+        for tabla in tablas or list(_leidas):
+            _leidas.pop(tabla, None)